@@ -3,6 +3,7 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
 from flask_migrate import Migrate
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 from back.config import Config
 
 # imports from back
@@ -15,19 +16,30 @@ from back.condition.routes import condition
 from back.notes.routes import notes
 from back.relationship.routes import relationship
 from back.misc.routes import misc
+from back.archive.routes import archive
 from back.models import db
+from back import cache
+from back.auth import passwords, throttle, revocation
 
 jwt = JWTManager()
+jwt.token_in_blocklist_loader(revocation.token_in_blocklist)
 migrate = Migrate()
 
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
+    if app.config['PROXY_FIX_X_FOR']:
+        # request.remote_addr pasa a ser la IP del cliente que indica X-Forwarded-For
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'])
 
     db.init_app(app)
     jwt.init_app(app)
     migrate.init_app(app, db)
     CORS(app)
+    cache.init_app(app)
+    passwords.init_app(app)
+    throttle.init_app(app)
+    revocation.init_app(app)
 
     app.register_blueprint(auth, url_prefix='/api')
     app.register_blueprint(character, url_prefix='/api')
@@ -38,5 +50,6 @@ def create_app():
     app.register_blueprint(notes, url_prefix='/api')
     app.register_blueprint(relationship, url_prefix='/api')
     app.register_blueprint(misc, url_prefix='/api')
+    app.register_blueprint(archive, url_prefix='/api')
 
     return app
@@ -1,7 +1,8 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from back.models import db, Character, Ability
-from back.utils import validate_required_fields
+from back.models import db, Character, Ability, bump_character_versions
+from sqlalchemy import update, select
+from back.utils import validate_required_fields, owned_character_id, get_owned, parse_batch, owned_batch_character_ids, bulk_insert, claim_if_match
 
 ability = Blueprint("ability", __name__)
 
@@ -11,11 +12,11 @@ def get_abilities(character_id):
     response = {}
     user_id = get_jwt_identity()
 
-    character = Character.query.filter_by(id=character_id, user_id=user_id).first()
-    if not character:
+    character_id = owned_character_id(user_id, character_id)
+    if not character_id:
         return jsonify({'error': 'Personaje no encontrado'}), 404
 
-    abilities = Ability.query.filter_by(character_id=character.id).all()
+    abilities = Ability.query.filter_by(character_id=character_id).all()
     response['message'] = 'Habilidades obtenidas correctamente'
     response['abilities'] = [a.to_dict() for a in abilities]
     return jsonify(response), 200
@@ -33,12 +34,12 @@ def create_ability():
         response['error'] = error
         return jsonify(response), 400
 
-    character = Character.query.filter_by(id=data['character_id'], user_id=user_id).first()
-    if not character:
+    character_id = owned_character_id(user_id, data['character_id'])
+    if not character_id:
         return jsonify({'error': 'Personaje no encontrado'}), 404
 
     ability = Ability(
-        character_id=character.id,
+        character_id=character_id,
         name=data['name'],
         description=data['description'],
         image_url=data.get('image_url'),
@@ -52,18 +53,47 @@ def create_ability():
     return jsonify(response), 201
 
 
+@ability.route('/ability/bulk', methods=['POST'])
+@jwt_required()
+def create_abilities_bulk():
+    response = {}
+    user_id = get_jwt_identity()
+
+    abilities, error = parse_batch(request.get_json(), 'character_id', 'name', 'description', 'uses_per_session')
+    if error:
+        response['error'] = error
+        return jsonify(response), 400
+
+    character_ids = owned_batch_character_ids(user_id, abilities)
+    if character_ids is None:
+        return jsonify({'error': 'Personaje no encontrado'}), 404
+
+    rows = [{
+        'character_id': character_id,
+        'name': data['name'],
+        'description': data['description'],
+        'image_url': data.get('image_url'),
+        'uses_per_session': data['uses_per_session'],
+        'used': data.get('used', False)
+    } for character_id, data in zip(character_ids, abilities)]
+
+    response['message'] = 'Habilidades creadas correctamente'
+    response['ability_ids'] = bulk_insert(Ability, rows)
+    return jsonify(response), 201
+
+
 @ability.route('/ability/<int:ability_id>', methods=['PUT'])
 @jwt_required()
 def update_ability(ability_id):
     response = {}
     user_id = get_jwt_identity()
-    ability = Ability.query.get(ability_id)
-    if not ability:
-        return jsonify({'error': 'Habilidad no encontrada'}), 404
+    ability, error = get_owned(Ability, ability_id, user_id, 'Habilidad no encontrada')
+    if error:
+        return error
 
-    character = Character.query.filter_by(id=ability.character_id, user_id=user_id).first()
-    if not character:
-        return jsonify({'error': 'No autorizado'}), 403
+    error = claim_if_match(ability.character_id)
+    if error:
+        return error
 
     data = request.get_json() or {}
     for field in ['name', 'description', 'image_url', 'uses_per_session', 'used']:
@@ -81,13 +111,9 @@ def update_ability(ability_id):
 def delete_ability(ability_id):
     response = {}
     user_id = get_jwt_identity()
-    ability = Ability.query.get(ability_id)
-    if not ability:
-        return jsonify({'error': 'Habilidad no encontrada'}), 404
-
-    character = Character.query.filter_by(id=ability.character_id, user_id=user_id).first()
-    if not character:
-        return jsonify({'error': 'No autorizado'}), 403
+    ability, error = get_owned(Ability, ability_id, user_id, 'Habilidad no encontrada')
+    if error:
+        return error
 
     db.session.delete(ability)
     db.session.commit()
@@ -102,15 +128,44 @@ def reset_abilities(character_id):
     response = {}
     user_id = get_jwt_identity()
 
-    character = Character.query.filter_by(id=character_id, user_id=user_id).first()
-    if not character:
+    character_id = owned_character_id(user_id, character_id)
+    if not character_id:
         return jsonify({'error': 'Personaje no encontrado'}), 404
 
-    abilities = Ability.query.filter_by(character_id=character.id).all()
-    for ability in abilities:
-        ability.used = False
-
+    db.session.execute(
+        update(Ability).where(Ability.character_id == character_id).values(used=False),
+        execution_options={'synchronize_session': False}
+    )
+    bump_character_versions(db.session, [character_id])
     db.session.commit()
     response['message'] = 'Habilidades reiniciadas correctamente'
     response['character_id'] = character_id
     return jsonify(response), 200
+
+
+@ability.route('/ability/use/<int:ability_id>', methods=['POST'])
+@jwt_required()
+def use_ability(ability_id):
+    response = {}
+    user_id = get_jwt_identity()
+
+    owned = select(Character.id).where(Character.user_id == user_id)
+    row = db.session.execute(
+        update(Ability)
+        .where(Ability.id == ability_id, Ability.character_id.in_(owned), Ability.used.is_(False))
+        .values(used=True)
+        .returning(Ability.character_id),
+        execution_options={'synchronize_session': False}
+    ).first()
+    if row is None:
+        db.session.rollback()
+        ability, error = get_owned(Ability, ability_id, user_id, 'Habilidad no encontrada')
+        if error:
+            return error
+        return jsonify({'error': 'La habilidad ya fue usada'}), 400
+
+    bump_character_versions(db.session, [row.character_id])
+    db.session.commit()
+    response['message'] = 'Habilidad usada correctamente'
+    response['ability_id'] = ability_id
+    return jsonify(response), 200
@@ -0,0 +1,96 @@
+import json
+import zlib
+from datetime import datetime, timezone
+from sqlalchemy import select
+from back.models import (db, STAT_COLUMNS, Character, InventoryItem, Ability, Spell, Condition, JournalEntry,
+                         Decision, CharacterRelationship)
+
+FORMAT_VERSION = 1
+
+# Orden de las secciones: los personajes van primero para que un importador pueda remapear sus ids
+# antes de leer los hijos. Las relaciones son las que salen de personajes del usuario, como en el grafo
+SECTIONS = (
+    ('character', Character, Character.id),
+    ('inventory_item', InventoryItem, InventoryItem.character_id),
+    ('ability', Ability, Ability.character_id),
+    ('spell', Spell, Spell.character_id),
+    ('condition', Condition, Condition.character_id),
+    ('journal_entry', JournalEntry, JournalEntry.character_id),
+    ('decision', Decision, Decision.character_id),
+    ('relationship', CharacterRelationship, CharacterRelationship.source_id),
+)
+
+# Columnas que no salen en la copia: el propietario lo decide quien importa y la versión es interna
+_SKIPPED = {'character': {'user_id', 'version', *STAT_COLUMNS.values()}}
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} no es serializable')
+
+# Un único codificador: json.dumps con argumentos crearía uno nuevo por línea
+_encode = json.JSONEncoder(default=_default, ensure_ascii=False, separators=(',', ':')).encode
+
+def _line(record):
+    return _encode(record) + '\n'
+
+def _section_query(kind, model, owner_column, user_id):
+    columns = [column for column in model.__table__.columns if column.key not in _SKIPPED.get(kind, ())]
+    if kind == 'character':
+        columns += [getattr(Character, column).label(name) for name, column in STAT_COLUMNS.items()]
+        return select(*columns).where(Character.user_id == user_id).order_by(Character.id)
+    return (
+        select(*columns)
+        .join(Character, Character.id == owner_column)
+        .where(Character.user_id == user_id)
+        .order_by(model.id)
+    )
+
+def _records(kind, result):
+    keys = tuple(result.keys())
+    stat_names = tuple(STAT_COLUMNS) if kind == 'character' else ()
+    for row in result:
+        data = dict(zip(keys, row))
+        if stat_names:
+            data['stats'] = {name: data.pop(name) for name in stat_names}
+        yield {'type': kind, 'data': data}
+
+def export_lines(user_id, yield_per=1000):
+    # Generador de líneas NDJSON: cabecera, una línea por fila y un pie con los recuentos.
+    # Cada sección es una consulta Core recorrida con yield_per, así la memoria no depende del tamaño
+    yield _line({'type': 'header', 'format': 'campaign', 'version': FORMAT_VERSION, 'user_id': user_id,
+                 'exported_at': datetime.now(timezone.utc)})
+    counts = {}
+    for kind, model, owner_column in SECTIONS:
+        counts[kind] = 0
+        result = db.session.execute(_section_query(kind, model, owner_column, user_id),
+                                    execution_options={'yield_per': yield_per})
+        for record in _records(kind, result):
+            counts[kind] += 1
+            yield _line(record)
+    yield _line({'type': 'footer', 'counts': counts})
+
+def buffered(lines, size=64 * 1024):
+    # Agrupa líneas en bloques para no escribir (ni comprimir) fila a fila
+    buffer, length = [], 0
+    for line in lines:
+        buffer.append(line)
+        length += len(line)
+        if length >= size:
+            yield ''.join(buffer).encode('utf-8')
+            buffer, length = [], 0
+    if buffer:
+        yield ''.join(buffer).encode('utf-8')
+
+def gzipped(chunks, level=6):
+    # wbits=31: contenedor gzip, legible con gunzip o gzip.open
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+def export_stream(user_id, compress=False, yield_per=1000):
+    chunks = buffered(export_lines(user_id, yield_per))
+    return gzipped(chunks) if compress else chunks
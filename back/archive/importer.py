@@ -0,0 +1,282 @@
+import gzip
+import io
+import json
+import re
+from datetime import datetime, timezone
+from sqlalchemy import select, insert, delete, DateTime
+from sqlalchemy.exc import SQLAlchemyError
+from back.models import db, STAT_COLUMNS, Character, CharacterRelationship, ImportJob, ImportIdMap, bump_character_versions
+from back.cache import invalidate_identity, invalidate_graphs
+from back.archive.export import SECTIONS, FORMAT_VERSION
+
+class ArchiveError(Exception):
+    pass
+
+MODELS = {kind: model for kind, model, _ in SECTIONS}
+CHILD_KINDS = tuple(kind for kind, _, _ in SECTIONS if kind not in ('character', 'relationship'))
+
+# --- Lectura incremental ---
+
+def _binary(stream):
+    # Se acepta la entrada tal cual o comprimida con gzip (como la genera la exportación)
+    stream = stream if hasattr(stream, 'peek') else io.BufferedReader(stream)
+    if stream.peek(2)[:2] == b'\x1f\x8b':
+        stream = gzip.GzipFile(fileobj=stream)
+    return stream
+
+def _ndjson_records(text):
+    for line in text:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+_SEPARATORS = re.compile(r'[\s,]*')
+
+def _json_array_records(text, size=64 * 1024):
+    # Un array JSON se decodifica elemento a elemento con raw_decode, sin cargar el documento entero
+    decoder = json.JSONDecoder()
+    buffer, position, eof, started = '', 0, False, False
+    while True:
+        position = _SEPARATORS.match(buffer, position).end()
+        if position == len(buffer):
+            if eof:
+                raise ArchiveError('El array JSON no está cerrado')
+            buffer, position = text.read(size), 0
+            eof = not buffer
+            continue
+        if not started:
+            if buffer[position] != '[':
+                raise ArchiveError('Se esperaba un array JSON')
+            started, position = True, position + 1
+            continue
+        if buffer[position] == ']':
+            return
+        try:
+            record, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            # El elemento está partido entre dos lecturas
+            chunk = text.read(size)
+            eof = not chunk
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        yield record
+
+def read_records(stream):
+    # NDJSON (una línea por registro) o un array JSON con los mismos registros.
+    # Es un generador: hasta la lectura de la cabecera ocurre dentro de Importer.run, que registra el fallo
+    binary = _binary(stream)
+    first = binary.peek(64).lstrip()[:1]
+    text = io.TextIOWrapper(binary, encoding='utf-8')
+    if first == b'[':
+        yield from _json_array_records(text)
+    else:
+        yield from _ndjson_records(text)
+
+# --- Conversión de registros a filas ---
+
+_SKIPPED = {'id', 'user_id', 'version', *STAT_COLUMNS.values()}
+_column_plans = {}
+
+def _column_plan(model):
+    plan = _column_plans.get(model)
+    if plan is None:
+        columns = [column for column in model.__table__.columns if column.key not in _SKIPPED]
+        plan = _column_plans[model] = (
+            tuple(column.key for column in columns),
+            frozenset(column.key for column in columns if isinstance(column.type, DateTime))
+        )
+    return plan
+
+def _row(model, data):
+    keys, datetimes = _column_plan(model)
+    row = {key: data[key] for key in keys if key in data}
+    for key in datetimes & row.keys():
+        if isinstance(row[key], str):
+            row[key] = datetime.fromisoformat(row[key])
+    return row
+
+def _character_row(data, user_id):
+    row = _row(Character, data)
+    stats = data.get('stats') or {}
+    if not isinstance(stats, dict) or not stats.keys() <= STAT_COLUMNS.keys():
+        raise ArchiveError(f"Personaje {data.get('id')}: estadísticas no válidas")
+    row.update({STAT_COLUMNS[name]: value for name, value in stats.items()})
+    row['user_id'] = user_id
+    return row
+
+def _old_id(data, key, number):
+    value = data.get(key)
+    if not isinstance(value, int):
+        raise ArchiveError(f'Registro {number}: falta {key}')
+    return value
+
+# --- Importación por bloques ---
+
+class Importer:
+    # Cada bloque de registros se inserta con un INSERT masivo por tabla y se confirma junto con la
+    # posición alcanzada, así que tras un fallo se reanuda desde el último bloque confirmado.
+    # Los INSERT van contra las tablas (Core): el camino masivo del ORM no aporta nada aquí y cuesta más
+    def __init__(self, job, chunk_size, progress=None):
+        self.job = job
+        self.chunk_size = chunk_size
+        self.progress = progress
+        rows = db.session.execute(select(ImportIdMap.old_id, ImportIdMap.new_id).where(ImportIdMap.job_id == job.id))
+        self.character_ids = dict(rows.all())
+        self.finished = False
+
+    def _check_header(self, record):
+        if record.get('format') != 'campaign' or not isinstance(record.get('version'), int) \
+                or record['version'] > FORMAT_VERSION:
+            raise ArchiveError('Formato de archivo no soportado')
+
+    def _check_footer(self, record):
+        # El pie lleva los registros de cada sección: sin él, o si no cuadra, el archivo llegó cortado
+        counts = record.get('counts')
+        if not isinstance(counts, dict):
+            raise ArchiveError('Pie de archivo no válido')
+        job = self.job
+        expected = (counts.get('character', 0), sum(counts.get(kind, 0) for kind in CHILD_KINDS),
+                    counts.get('relationship', 0))
+        if expected != (job.characters, job.children, job.relationships + job.skipped):
+            raise ArchiveError('El archivo está incompleto: los registros no coinciden con el pie')
+        self.finished = True
+
+    def _insert_chunk(self, records, start):
+        job = self.job
+        characters, children, relationships = [], {kind: [] for kind in CHILD_KINDS}, []
+        footer = None
+        for number, record in enumerate(records, start + 1):
+            if not isinstance(record, dict):
+                raise ArchiveError(f'Registro {number}: formato inválido')
+            kind = record.get('type')
+            if (number == 1) != (kind == 'header'):
+                raise ArchiveError('El archivo debe empezar por la cabecera' if number == 1
+                                   else f'Registro {number}: cabecera repetida')
+            if footer is not None:
+                raise ArchiveError(f'Registro {number}: hay registros después del pie')
+            if kind not in ('header', 'footer') and not isinstance(record.get('data'), dict):
+                raise ArchiveError(f'Registro {number}: formato inválido')
+            if kind == 'header':
+                self._check_header(record)
+            elif kind == 'footer':
+                footer = record
+            elif kind == 'character':
+                characters.append((_old_id(record['data'], 'id', number), _character_row(record['data'], job.user_id)))
+            elif kind in children:
+                children[kind].append((number, record['data']))
+            elif kind == 'relationship':
+                relationships.append((number, record['data']))
+            else:
+                raise ArchiveError(f'Registro {number}: tipo desconocido {kind}')
+
+        created = []
+        if characters:
+            # Como en bulk_insert: los ids autoincrementales de una misma sentencia son crecientes
+            result = db.session.execute(insert(Character.__table__).returning(Character.__table__.c.id),
+                                        [row for _, row in characters])
+            created = sorted(result.scalars())
+            new_ids = dict(zip((old_id for old_id, _ in characters), created))
+            if len(new_ids) != len(characters) or new_ids.keys() & self.character_ids.keys():
+                raise ArchiveError('Hay personajes con el id repetido en el archivo')
+            db.session.execute(insert(ImportIdMap.__table__), [
+                {'job_id': job.id, 'old_id': old_id, 'new_id': new_id} for old_id, new_id in new_ids.items()
+            ])
+            self.character_ids.update(new_ids)
+
+        touched = set()
+        for kind, items in children.items():
+            if not items:
+                continue
+            rows = []
+            for number, data in items:
+                character_id = self.character_ids.get(_old_id(data, 'character_id', number))
+                if character_id is None:
+                    raise ArchiveError(f"Registro {number}: el personaje {data['character_id']} no está en el archivo")
+                rows.append({**_row(MODELS[kind], data), 'character_id': character_id})
+                touched.add(character_id)
+            db.session.execute(insert(MODELS[kind].__table__), rows)
+            job.children += len(rows)
+
+        rows = []
+        for number, data in relationships:
+            source_id = self.character_ids.get(_old_id(data, 'source_id', number))
+            target_id = self.character_ids.get(_old_id(data, 'target_id', number))
+            if source_id is None or target_id is None:
+                # El otro extremo no viene en el archivo (p. ej. un personaje de otro usuario)
+                job.skipped += 1
+                continue
+            rows.append({**_row(CharacterRelationship, data), 'source_id': source_id, 'target_id': target_id})
+            touched.update((source_id, target_id))
+        if rows:
+            db.session.execute(insert(CharacterRelationship.__table__), rows)
+            job.relationships += len(rows)
+
+        bump_character_versions(db.session, touched - set(created))
+        job.characters += len(created)
+        if footer is not None:
+            # Antes del commit: si no cuadra, el bloque se descarta y la importación puede reanudarse
+            self._check_footer(footer)
+        job.records_committed += len(records)
+        job.chunks_committed += 1
+        job.updated_at = datetime.now(timezone.utc)
+        db.session.commit()
+        # Los INSERT masivos no pasan por el flush del ORM: la identidad y el grafo se invalidan a mano
+        invalidate_identity(job.user_id)
+        invalidate_graphs(user_ids=[job.user_id])
+
+    def _fail(self, error):
+        db.session.rollback()
+        self.job.status = 'failed'
+        self.job.error = str(error)
+        self.job.updated_at = datetime.now(timezone.utc)
+        db.session.commit()
+
+    def run(self, records):
+        job = self.job
+        job.status, job.error = 'running', None
+        db.session.commit()
+        skip = job.records_committed
+        chunk = []
+        try:
+            for position, record in enumerate(records):
+                if position < skip:
+                    continue
+                chunk.append(record)
+                if len(chunk) >= self.chunk_size:
+                    self._insert_chunk(chunk, job.records_committed)
+                    chunk = []
+                    if self.progress:
+                        self.progress(job)
+            if chunk:
+                self._insert_chunk(chunk, job.records_committed)
+                if self.progress:
+                    self.progress(job)
+            if not self.finished:
+                raise ArchiveError('El archivo está incompleto: falta el pie')
+        except ArchiveError as error:
+            self._fail(error)
+            raise
+        except (ValueError, TypeError, KeyError, EOFError, OSError, SQLAlchemyError) as error:
+            # EOFError/OSError (BadGzipFile incluido): el gzip llegó truncado o corrupto
+            error = getattr(error, 'orig', None) or error
+            self._fail(error)
+            raise ArchiveError(str(error)) from error
+
+        job.status = 'completed'
+        job.updated_at = datetime.now(timezone.utc)
+        db.session.execute(delete(ImportIdMap).where(ImportIdMap.job_id == job.id))
+        db.session.commit()
+        return job
+
+def create_job(user_id, source=None):
+    job = ImportJob(user_id=user_id, source=source)
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+def import_archive(job, stream, chunk_size, progress=None):
+    if job.status == 'completed':
+        raise ArchiveError('La importación ya está completada')
+    return Importer(job, chunk_size, progress).run(read_records(stream))
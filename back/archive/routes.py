@@ -0,0 +1,118 @@
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from back.models import db, User, ImportJob
+from back.archive.export import export_stream
+from back.archive.importer import ArchiveError, create_job, import_archive
+import click
+
+archive = Blueprint("archive", __name__)
+
+@archive.route('/export', methods=['GET'])
+@jwt_required()
+# Ejemplo de llamada: [GET] /api/export?gzip=1
+def export_campaign():
+    user_id = int(get_jwt_identity())
+    compress = request.args.get('gzip', '0').lower() in ('1', 'true')
+    filename = f'campaign-{user_id}.ndjson' + ('.gz' if compress else '')
+    # stream_with_context mantiene la sesión viva mientras se envía: la respuesta empieza con la
+    # cabecera y las primeras filas sin haber leído el resto
+    stream = export_stream(user_id, compress, current_app.config['EXPORT_YIELD_PER'])
+    return Response(
+        stream_with_context(stream),
+        mimetype='application/gzip' if compress else 'application/x-ndjson',
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
+@archive.route('/import', methods=['POST'])
+@jwt_required()
+# Ejemplo de llamada: [POST] /api/import?chunk_size=500 con el NDJSON (o JSON, o gzip) como cuerpo.
+# Tras un fallo se reenvía el mismo archivo con ?job_id=N y se continúa desde el último bloque confirmado
+def import_campaign():
+    user_id = int(get_jwt_identity())
+    chunk_size, error = _chunk_size(request.args.get('chunk_size', type=int))
+    if error:
+        return jsonify({'error': error}), 400
+
+    job_id = request.args.get('job_id', type=int)
+    if job_id is None:
+        job = create_job(user_id, request.args.get('source'))
+    else:
+        job = db.session.get(ImportJob, job_id)
+        if job is None or job.user_id != user_id:
+            return jsonify({'error': 'Importación no encontrada'}), 404
+        if job.status == 'completed':
+            return jsonify({'error': 'La importación ya está completada', 'job': job.to_dict()}), 409
+
+    try:
+        import_archive(job, request.stream, chunk_size)
+    except ArchiveError as error:
+        return jsonify({'error': f'Importación fallida: {error}', 'job': job.to_dict()}), 400
+
+    return jsonify({'message': 'Importación completada', 'job': job.to_dict()}), 201
+
+@archive.route('/import/<int:job_id>', methods=['GET'])
+@jwt_required()
+def get_import(job_id):
+    job = db.session.get(ImportJob, job_id)
+    if job is None or str(job.user_id) != get_jwt_identity():
+        return jsonify({'error': 'Importación no encontrada'}), 404
+    return jsonify({'message': 'Importación obtenida correctamente', 'job': job.to_dict()}), 200
+
+def _chunk_size(value):
+    maximum = current_app.config['IMPORT_CHUNK_SIZE_MAX']
+    if value is None:
+        return current_app.config['IMPORT_CHUNK_SIZE'], None
+    if not 1 <= value <= maximum:
+        return None, f'chunk_size debe estar entre 1 y {maximum}'
+    return value, None
+
+@archive.cli.command('export')
+@click.argument('user_id', type=int)
+@click.option('--output', '-o', type=click.Path(dir_okay=False, writable=True), default=None,
+              help='Fichero de salida (por defecto, la salida estándar)')
+@click.option('--gzip', 'compress', is_flag=True, help='Comprime la salida con gzip')
+def export_command(user_id, output, compress):
+    """Exporta en NDJSON los personajes de un usuario con todos sus datos."""
+    if db.session.get(User, user_id) is None:
+        raise click.ClickException(f'Usuario no encontrado: {user_id}')
+    stream = export_stream(user_id, compress, current_app.config['EXPORT_YIELD_PER'])
+    if output is None:
+        target = click.get_binary_stream('stdout')
+        for chunk in stream:
+            target.write(chunk)
+        target.flush()
+        return
+    with open(output, 'wb') as target:
+        for chunk in stream:
+            target.write(chunk)
+    click.echo(f'Exportación escrita en {output}', err=True)
+
+@archive.cli.command('import')
+@click.argument('user_id', type=int)
+@click.argument('source', type=click.File('rb'))
+@click.option('--chunk-size', type=int, default=None, help='Registros por bloque (uno por transacción)')
+@click.option('--resume', 'job_id', type=int, default=None, help='Reanuda una importación fallida')
+def import_command(user_id, source, chunk_size, job_id):
+    """Importa un archivo NDJSON o JSON (opcionalmente gzip) en la cuenta de un usuario."""
+    if db.session.get(User, user_id) is None:
+        raise click.ClickException(f'Usuario no encontrado: {user_id}')
+    chunk_size, error = _chunk_size(chunk_size)
+    if error:
+        raise click.ClickException(error)
+    if job_id is None:
+        job = create_job(user_id, source.name)
+    else:
+        job = db.session.get(ImportJob, job_id)
+        if job is None or job.user_id != user_id:
+            raise click.ClickException(f'Importación no encontrada: {job_id}')
+
+    def progress(job):
+        click.echo(f'Bloque {job.chunks_committed}: {job.records_committed} registros '
+                   f'({job.characters} personajes, {job.children} hijos, {job.relationships} relaciones)', err=True)
+
+    try:
+        import_archive(job, source, chunk_size, progress)
+    except ArchiveError as error:
+        raise click.ClickException(f'Importación {job.id} fallida: {error}. Reanuda con --resume {job.id}')
+    click.echo(f'Importación {job.id} completada: {job.records_committed} registros, '
+               f'{job.skipped} relaciones omitidas', err=True)
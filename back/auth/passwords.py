@@ -0,0 +1,80 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from flask import current_app
+import bcrypt
+
+class HasherBusy(Exception):
+    pass
+
+class PasswordHasher:
+    # bcrypt suelta el GIL, así que un pool de hilos acotado limita cuántos hashes se calculan a la vez
+    # y rechaza el exceso en lugar de dejar que una ráfaga de logins acapare todos los workers
+    def __init__(self, workers, max_queue, timeout):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = self.rejected = self.timeouts = 0
+
+    def _finished(self, future):
+        with self._lock:
+            self.pending -= 1
+            self.completed += 1
+
+    def run(self, function, *args):
+        with self._lock:
+            if self.pending >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise HasherBusy()
+            self.pending += 1
+        future = self._executor.submit(function, *args)
+        future.add_done_callback(self._finished)
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            with self._lock:
+                self.timeouts += 1
+            raise HasherBusy()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'in_flight': min(self.pending, self.workers),
+                'queue_depth': max(0, self.pending - self.workers),
+                'max_queue': self.max_queue,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'timeouts': self.timeouts
+            }
+
+def init_app(app):
+    app.extensions['password_hasher'] = PasswordHasher(
+        app.config['PASSWORD_HASH_WORKERS'],
+        app.config['PASSWORD_HASH_QUEUE_MAX'],
+        app.config['PASSWORD_HASH_TIMEOUT']
+    )
+
+def password_hasher():
+    return current_app.extensions['password_hasher']
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+def _check(password, hashed):
+    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+
+def hash_password(password):
+    return password_hasher().run(_hash, password, current_app.config['BCRYPT_ROUNDS'])
+
+def check_password(password, hashed):
+    return password_hasher().run(_check, password, hashed)
+
+def hash_rounds(hashed):
+    # Formato $2b$12$...: el tercer campo es el coste
+    return int(hashed.split('$')[2])
+
+def needs_rehash(hashed):
+    return hash_rounds(hashed) != current_app.config['BCRYPT_ROUNDS']
@@ -0,0 +1,139 @@
+import hashlib
+import threading
+import time
+from flask import current_app
+from sqlalchemy import select, delete
+from sqlalchemy.exc import IntegrityError
+from back.models import db, RevokedToken
+
+class BloomFilter:
+    # Un "no" es definitivo; un "sí" hay que confirmarlo en el diccionario de revocados
+    def __init__(self, bits, hashes):
+        self.bits = bits
+        self.hashes = hashes
+        self._array = bytearray((bits + 7) // 8)
+
+    def _positions(self, key):
+        # Doble hashing (Kirsch-Mitzenmacher): k posiciones a partir de dos enteros de 64 bits
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return [(first + index * second) % self.bits for index in range(self.hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self._array[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        return all(self._array[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+class Denylist:
+    # jti -> exp en memoria; la tabla revoked_tokens es la fuente compartida entre workers y reinicios.
+    # Las comprobaciones no consultan la base de datos salvo la sincronización periódica (como mucho una
+    # vez cada sync_interval segundos, y solo lee las filas nuevas)
+    def __init__(self, bloom_bits, bloom_hashes, sync_interval):
+        self.bloom_bits = bloom_bits
+        self.bloom_hashes = bloom_hashes
+        self.sync_interval = sync_interval
+        self._lock = threading.Lock()
+        self._expires = {}
+        self._bloom = BloomFilter(bloom_bits, bloom_hashes)
+        self._last_id = 0
+        self._next_sync = 0.0
+        self.checks = self.bloom_negatives = self.revoked_hits = self.syncs = 0
+
+    def _add(self, jti, expires_at):
+        self._expires[jti] = expires_at
+        self._bloom.add(jti)
+
+    def _purge(self, now):
+        # El filtro de Bloom no admite borrados: al caducar tokens se reconstruye con los que quedan
+        expired = [jti for jti, expires_at in self._expires.items() if expires_at <= now]
+        if not expired:
+            return
+        for jti in expired:
+            del self._expires[jti]
+        self._bloom = BloomFilter(self.bloom_bits, self.bloom_hashes)
+        for jti in self._expires:
+            self._bloom.add(jti)
+
+    def sync(self, force=False):
+        now = time.monotonic()
+        if not force and now < self._next_sync:
+            return
+        with self._lock:
+            if not force and now < self._next_sync:
+                return
+            self._next_sync = now + self.sync_interval
+            epoch = int(time.time())
+            rows = db.session.execute(
+                select(RevokedToken.id, RevokedToken.jti, RevokedToken.expires_at)
+                .where(RevokedToken.id > self._last_id, RevokedToken.expires_at > epoch)
+                .order_by(RevokedToken.id)
+            ).all()
+            for row in rows:
+                self._add(row.jti, row.expires_at)
+            if rows:
+                self._last_id = rows[-1].id
+            self._purge(epoch)
+            self.syncs += 1
+
+    def is_revoked(self, jti):
+        self.sync()
+        self.checks += 1
+        if jti not in self._bloom:
+            self.bloom_negatives += 1
+            return False
+        expires_at = self._expires.get(jti)
+        revoked = expires_at is not None and expires_at > time.time()
+        self.revoked_hits += revoked
+        return revoked
+
+    def revoke(self, jti, token_type, user_id, expires_at):
+        if self.is_revoked(jti):
+            return False
+        db.session.add(RevokedToken(jti=jti, token_type=token_type, user_id=user_id, expires_at=expires_at))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Otro worker lo revocó a la vez; la próxima sincronización lo traerá
+            db.session.rollback()
+            return False
+        with self._lock:
+            self._add(jti, expires_at)
+        return True
+
+    def stats(self):
+        return {
+            'revoked': len(self._expires),
+            'checks': self.checks,
+            'bloom_negatives': self.bloom_negatives,
+            'revoked_hits': self.revoked_hits,
+            'syncs': self.syncs,
+            'sync_interval': self.sync_interval
+        }
+
+def init_app(app):
+    app.extensions['denylist'] = Denylist(
+        app.config['REVOCATION_BLOOM_BITS'],
+        app.config['REVOCATION_BLOOM_HASHES'],
+        app.config['REVOCATION_SYNC_INTERVAL']
+    )
+
+def denylist():
+    return current_app.extensions['denylist']
+
+def token_in_blocklist(jwt_header, jwt_payload):
+    return denylist().is_revoked(jwt_payload['jti'])
+
+def revoke_token(payload):
+    identity = payload.get('sub')
+    return denylist().revoke(
+        payload['jti'], payload.get('type', 'access'),
+        int(identity) if str(identity).isdigit() else None,
+        payload.get('exp') or int(time.time() + current_app.config['JWT_REFRESH_TOKEN_EXPIRES'].total_seconds())
+    )
+
+def purge_expired():
+    result = db.session.execute(delete(RevokedToken).where(RevokedToken.expires_at <= int(time.time())))
+    db.session.commit()
+    return result.rowcount
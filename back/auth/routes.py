@@ -1,9 +1,14 @@
 from flask import Blueprint, request, current_app, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity, create_access_token, create_refresh_token, get_jwt
+from flask_jwt_extended import jwt_required, get_jwt_identity, create_access_token, create_refresh_token, get_jwt, decode_token
+from jwt.exceptions import PyJWTError
 from back.models import User, db
 from back.utils import validate_required_fields
+from back.auth.passwords import HasherBusy, hash_password, check_password, needs_rehash
+from back.auth.throttle import login_throttle, normalize_login_name
+from back.auth.revocation import revoke_token, purge_expired
+from back.cache import get_identity
+import click
 from datetime import datetime, timezone
-import bcrypt
 
 auth = Blueprint("auth", __name__)
 
@@ -25,7 +30,10 @@ def register_user():
         response['error'] = 'El correo ya está registrado'
         return jsonify(response), 400
 
-    hashed = bcrypt.hashpw(data['password'].encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    try:
+        hashed = hash_password(data['password'])
+    except HasherBusy:
+        return _busy()
     now = datetime.now(timezone.utc)
     user = User(
         username=data['username'],
@@ -50,15 +58,38 @@ def login_user():
         response['error'] = error
         return jsonify(response), 400
 
+    # Antes de tocar la base de datos o bcrypt: por IP y por nombre de login
+    login_name = normalize_login_name(data['login_name'])
+    retry_after = login_throttle().check(request.remote_addr, login_name)
+    if retry_after:
+        current_app.logger.warning(f"Login limitado para '{data['login_name']}' desde {request.remote_addr}.")
+        response['error'] = 'Demasiados intentos, inténtalo más tarde'
+        return jsonify(response), 429, {'Retry-After': str(retry_after)}
+
     user = User.query.filter(
         (User.username == data['login_name']) | (User.email == data['login_name'])
     ).first()
 
+    try:
+        valid = bool(user) and check_password(data['password'], user.password_hash)
+    except HasherBusy:
+        return _busy()
+
+    if valid and needs_rehash(user.password_hash):
+        # El coste configurado cambió: se aprovecha que tenemos la contraseña en claro para actualizar el hash.
+        # Es una mejora oportunista: con el pool saturado se deja para el siguiente login y se entra igual
+        try:
+            user.password_hash = hash_password(data['password'])
+            db.session.commit()
+        except HasherBusy:
+            current_app.logger.warning(f"Rehash pospuesto para el usuario {user.id}: pool de contraseñas saturado.")
+
     if not user:
         current_app.logger.warning(f"Intento de login fallido: usuario '{data['login_name']}' no existe.")
-    elif not bcrypt.checkpw(data['password'].encode('utf-8'), user.password_hash.encode('utf-8')):
+    elif not valid:
         current_app.logger.warning(f"Intento de login fallido: contraseña incorrecta para '{data['login_name']}'.")
     else:
+        login_throttle().succeeded(login_name)
         access_token = create_access_token(identity=str(user.id))
         refresh_token = create_refresh_token(identity=str(user.id))
 
@@ -70,26 +101,61 @@ def login_user():
     response['error'] = 'Credenciales inválidas'
     return jsonify(response), 401
 
+def _busy():
+    current_app.logger.warning('Pool de contraseñas saturado, petición rechazada')
+    return jsonify({'error': 'Servidor ocupado, inténtalo de nuevo en unos segundos'}), 503, {'Retry-After': '1'}
+
 @auth.route('/userinfo', methods=['GET'])
 @jwt_required()
 def get_user_info():
-    user_id = get_jwt_identity()
-    user = User.query.filter_by(id=user_id).first()
+    identity = get_identity(get_jwt_identity())
 
-    if not user:
+    if not identity:
         return jsonify({'error': 'Usuario no encontrado'}), 404
 
-    return jsonify({
-        'id': user.id,
-        'username': user.username,
-        'email': user.email,
-        'created_at': user.created_at.isoformat()
-    }), 200
+    return jsonify(identity.user), 200
 
 
+@auth.route('/logout', methods=['POST'])
+@jwt_required(verify_type=False)
+# Revoca el token de la cabecera; si se envía {"refresh_token": ...} del mismo usuario, también ese
+def logout_user():
+    response = {}
+    payload = get_jwt()
+    tokens = [payload]
+
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        response['error'] = 'Formato inválido'
+        return jsonify(response), 400
+
+    refresh = data.get('refresh_token')
+    if refresh:
+        if not isinstance(refresh, str):
+            response['error'] = 'refresh_token no válido'
+            return jsonify(response), 400
+        try:
+            refresh_payload = decode_token(refresh)
+        except PyJWTError:
+            response['error'] = 'refresh_token no válido'
+            return jsonify(response), 400
+        if refresh_payload.get('sub') != payload.get('sub'):
+            response['error'] = 'No autorizado'
+            return jsonify(response), 403
+        tokens.append(refresh_payload)
+
+    response['message'] = 'Sesión cerrada'
+    response['revoked'] = [token['type'] for token in tokens if revoke_token(token)]
+    return jsonify(response), 200
+
 @auth.route('/refresh', methods=['POST'])
 @jwt_required(refresh=True)
 def refresh_token():
     identity = get_jwt_identity()
     new_token = create_access_token(identity=str(identity))
     return jsonify({'access_token': new_token}), 200
+
+@auth.cli.command('purge-revoked')
+def purge_revoked_command():
+    """Borra de revoked_tokens los tokens ya caducados."""
+    click.echo(f'Tokens caducados eliminados: {purge_expired()}')
@@ -0,0 +1,87 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+from werkzeug.utils import import_string
+
+class MemoryBucketStore:
+    # Cubetas de fichas en memoria del proceso, con LRU para acotar cuántas claves se guardan.
+    # Otra implementación (Redis, etc.) solo necesita take(), reset() y stats() con la misma firma
+    def __init__(self, max_keys):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def take(self, key, capacity, period):
+        # Se recargan capacity fichas cada period segundos de forma continua (ventana deslizante).
+        # Devuelve 0 si hay ficha, o los segundos hasta la siguiente
+        now = time.monotonic()
+        rate = capacity / period
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                wait = 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                wait = (1 - tokens) / rate
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+                self.evictions += 1
+            return wait
+
+    def reset(self, key):
+        with self._lock:
+            self._buckets.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {'buckets': len(self._buckets), 'max_keys': self.max_keys, 'evictions': self.evictions}
+
+def memory_store(app):
+    return MemoryBucketStore(app.config['LOGIN_THROTTLE_MAX_KEYS'])
+
+# Cada worker tiene sus propias cubetas: back.serve no arranca varios workers con este almacén
+memory_store.per_process = True
+
+class LoginThrottle:
+    def __init__(self, store):
+        self.store = store
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def check(self, ip, login_name):
+        # Devuelve los segundos de espera si el intento debe rechazarse, o None si puede seguir
+        config = current_app.config
+        if not config['LOGIN_THROTTLE_ENABLED']:
+            return None
+        for key, (capacity, period) in ((f'ip:{ip}', config['LOGIN_THROTTLE_IP']),
+                                        (f'login:{login_name}', config['LOGIN_THROTTLE_LOGIN_NAME'])):
+            wait = self.store.take(key, capacity, period)
+            if wait:
+                with self._lock:
+                    self.rejected += 1
+                return max(1, math.ceil(wait))
+        return None
+
+    def succeeded(self, login_name):
+        # Un login correcto no debe dejar al usuario bloqueado por sus fallos anteriores
+        self.store.reset(f'login:{login_name}')
+
+    def stats(self):
+        with self._lock:
+            rejected = self.rejected
+        return {'rejected': rejected, **self.store.stats()}
+
+def init_app(app):
+    app.extensions['login_throttle'] = LoginThrottle(import_string(app.config['LOGIN_THROTTLE_STORE'])(app))
+
+def login_throttle():
+    return current_app.extensions['login_throttle']
+
+def normalize_login_name(login_name):
+    return str(login_name).strip().lower()
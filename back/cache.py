@@ -0,0 +1,221 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from flask import current_app, has_app_context
+from sqlalchemy import event, select, inspect
+from sqlalchemy.orm import Session
+from back.models import db, Character, User, CharacterRelationship, STAT_COLUMNS
+
+_MISSING = object()
+
+class TTLCache:
+    def __init__(self, ttl, maxsize):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not _MISSING:
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def invalidate_where(self, predicate):
+        with self._lock:
+            for key in [key for key, (_, value) in self._entries.items() if predicate(value)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+# Datos públicos del usuario y los ids de sus personajes, por identidad del JWT
+Identity = namedtuple('Identity', 'user character_ids')
+
+def init_app(app):
+    app.extensions['stat_cache'] = TTLCache(app.config['STAT_CACHE_TTL'], app.config['STAT_CACHE_SIZE'])
+    app.extensions['identity_cache'] = TTLCache(app.config['IDENTITY_CACHE_TTL'], app.config['IDENTITY_CACHE_SIZE'])
+    app.extensions['graph_cache'] = TTLCache(app.config['GRAPH_CACHE_TTL'], app.config['GRAPH_CACHE_SIZE'])
+
+def stat_cache():
+    return current_app.extensions['stat_cache']
+
+def identity_cache():
+    return current_app.extensions['identity_cache']
+
+def graph_cache():
+    # user_id -> GraphIndex (back/relationship/graph.py)
+    return current_app.extensions['graph_cache']
+
+def get_stat_map(character_id):
+    # character_id -> {'FUE': 2, ...}; None si el personaje no existe. Una tirada caliente no toca la base de datos
+    cache = stat_cache()
+    stats = cache.get(character_id)
+    if stats is not None:
+        return stats
+
+    row = db.session.execute(
+        select(*(getattr(Character, column) for column in STAT_COLUMNS.values())).where(Character.id == character_id)
+    ).first()
+    if row is None:
+        return None
+    stats = dict(zip(STAT_COLUMNS, row))
+    cache.set(character_id, stats)
+    return stats
+
+def get_stat_maps(character_ids):
+    # Varios personajes: los que no están en caché se cargan con un único SELECT ... IN
+    cache = stat_cache()
+    stats = {character_id: cache.get(character_id) for character_id in character_ids}
+    missing = [character_id for character_id, values in stats.items() if values is None]
+    if missing:
+        rows = db.session.execute(
+            select(Character.id, *(getattr(Character, column) for column in STAT_COLUMNS.values()))
+            .where(Character.id.in_(missing))
+        )
+        for character_id, *values in rows:
+            stats[character_id] = dict(zip(STAT_COLUMNS, values))
+            cache.set(character_id, stats[character_id])
+    return stats
+
+def get_identity(user_id):
+    # Una sola consulta en el fallo de caché; None si el usuario no existe (eso no se cachea)
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        return None
+    cache = identity_cache()
+    identity = cache.get(user_id)
+    if identity is not None:
+        return identity
+
+    rows = db.session.execute(
+        select(User.id, User.username, User.email, User.created_at, Character.id.label('character_id'))
+        .outerjoin(Character, Character.user_id == User.id)
+        .where(User.id == user_id)
+    ).all()
+    if not rows:
+        return None
+    first = rows[0]
+    identity = Identity(
+        {
+            'id': first.id,
+            'username': first.username,
+            'email': first.email,
+            'created_at': first.created_at.isoformat() if first.created_at else None
+        },
+        frozenset(row.character_id for row in rows if row.character_id is not None)
+    )
+    cache.set(user_id, identity)
+    return identity
+
+def invalidate_identity(*user_ids):
+    identity_cache().invalidate(*(int(user_id) for user_id in user_ids if user_id is not None))
+
+def invalidate_graphs(user_ids=(), character_ids=()):
+    # Se descartan los grafos de esos usuarios y los que tengan alguno de esos personajes como origen
+    # o destino de una relación. También sirve para escrituras masivas que no pasan por el flush del ORM
+    graph_cache().invalidate(*(int(user_id) for user_id in user_ids))
+    character_ids = set(character_ids)
+    if character_ids:
+        graph_cache().invalidate_where(
+            lambda index: not index.owned.isdisjoint(character_ids) or not index.incoming.keys().isdisjoint(character_ids)
+        )
+
+def _stale_character_ids(session):
+    for instance in list(session.dirty) + list(session.deleted):
+        if isinstance(instance, Character):
+            yield instance.id
+
+def _stale_user_ids(session):
+    # Altas y bajas de personajes cambian el conjunto de ids del dueño; un cambio de dueño afecta a los dos
+    for instance in session.new:
+        if isinstance(instance, Character):
+            yield instance.user_id
+    for instance in session.deleted:
+        if isinstance(instance, Character):
+            yield instance.user_id
+        elif isinstance(instance, User):
+            yield instance.id
+    for instance in session.dirty:
+        if isinstance(instance, Character):
+            history = inspect(instance).attrs.user_id.history
+            yield from history.added
+            yield from history.deleted
+        elif isinstance(instance, User):
+            yield instance.id
+
+def _stale_graph_nodes(session):
+    for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(instance, CharacterRelationship):
+            yield instance.source_id
+            yield from inspect(instance).attrs.source_id.history.deleted
+    for instance in session.deleted:
+        if isinstance(instance, Character):
+            yield instance.id
+
+@event.listens_for(Session, 'before_flush')
+def _collect_stale_entries(session, flush_context, instances):
+    stale = {character_id for character_id in _stale_character_ids(session) if character_id is not None}
+    session.info.setdefault('stale_stat_ids', set()).update(stale)
+    stale = {int(user_id) for user_id in _stale_user_ids(session) if user_id is not None}
+    session.info.setdefault('stale_identity_ids', set()).update(stale)
+    stale = {character_id for character_id in _stale_graph_nodes(session) if character_id is not None}
+    session.info.setdefault('stale_graph_nodes', set()).update(stale)
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_stale_entries(session):
+    # Se invalida al confirmar para que otra petición no vuelva a cachear el valor anterior al commit
+    stale_stats = session.info.pop('stale_stat_ids', None)
+    stale_identities = session.info.pop('stale_identity_ids', None)
+    stale_nodes = session.info.pop('stale_graph_nodes', None)
+    if not has_app_context() or 'stat_cache' not in current_app.extensions:
+        return
+    if stale_stats:
+        stat_cache().invalidate(*stale_stats)
+    if stale_identities:
+        # Altas, bajas o cambios de dueño de personajes también cambian el grafo del usuario
+        identity_cache().invalidate(*stale_identities)
+        invalidate_graphs(user_ids=stale_identities)
+    if stale_nodes:
+        invalidate_graphs(character_ids=stale_nodes)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_stale_entries(session):
+    session.info.pop('stale_stat_ids', None)
+    session.info.pop('stale_identity_ids', None)
+    session.info.pop('stale_graph_nodes', None)
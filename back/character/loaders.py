@@ -0,0 +1,57 @@
+from sqlalchemy.orm import selectinload, load_only
+from back.models import Character, STAT_COLUMNS, serialization_plan
+
+SHEET_RELATIONSHIPS = (
+    'stats',
+    'abilities',
+    'spells',
+    'inventory_items',
+    'journal_entries',
+    'decisions',
+    'conditions',
+    'user',
+    'relationships_out',
+    'relationships_in',
+)
+
+def _parse_list(value):
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+def parse_sheet_args(args):
+    # fields= limita las columnas del personaje; include= limita las relaciones (vacío = ninguna)
+    fields = include = None
+
+    if 'fields' in args:
+        fields = _parse_list(args['fields'])
+        unknown = [name for name in fields if name not in serialization_plan(Character).columns]
+        if unknown:
+            return None, None, f"Campos no válidos: {', '.join(unknown)}"
+        fields = set(fields) | {'id'}
+
+    if 'include' in args:
+        include = _parse_list(args['include'])
+        unknown = [name for name in include if name not in SHEET_RELATIONSHIPS]
+        if unknown:
+            return None, None, f"Relaciones no válidas: {', '.join(unknown)}"
+        include = set(include)
+
+    return fields, include, None
+
+def sheet_query(user_id, fields=None, include=None):
+    # Un SELECT por relación (IN sobre los ids de la página), sin importar cuántos personajes haya
+    relationships = SHEET_RELATIONSHIPS if include is None else [name for name in SHEET_RELATIONSHIPS if name in include]
+    options = [selectinload(getattr(Character, name)) for name in relationships if name != 'stats']
+    if fields is not None:
+        # Las estadísticas son columnas del propio personaje: si se piden, van en el mismo SELECT
+        columns = set(fields) | (set(STAT_COLUMNS.values()) if 'stats' in relationships else set())
+        options.append(load_only(*(getattr(Character, name) for name in columns)))
+    return Character.query.filter_by(user_id=user_id).options(*options)
+
+def sheet_variant(fields=None, include=None):
+    # Cada combinación de fields/include es una representación distinta y necesita su propio ETag
+    if fields is None and include is None:
+        return ''
+    return f"fields={','.join(sorted(fields or ()))};include={','.join(sorted(include or ()))};{fields is None}{include is None}"
+
+def serialize_sheet(character, fields=None, include=None):
+    return character.to_dict(include_relationships=True if include is None else include, fields=fields)
@@ -1,7 +1,9 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from back.models import Character, Stat, db
-from back.utils import validate_required_fields
+from back.models import Character, Spell, Ability, Condition, STAT_COLUMNS, db
+from sqlalchemy import select, update, delete
+from back.utils import validate_required_fields, character_etag, claim_if_match, owned_character_id
+from back.character.loaders import sheet_query, parse_sheet_args, serialize_sheet, sheet_variant
 
 character = Blueprint("character", __name__)
 
@@ -9,23 +11,53 @@ character = Blueprint("character", __name__)
 @jwt_required()
 def get_all_characters():
     user_id = get_jwt_identity()
-    characters = Character.query.filter_by(user_id=user_id).all()
-    return jsonify({
+    fields, include, error = parse_sheet_args(request.args)
+    if error:
+        return jsonify({'error': error}), 400
+
+    versions = db.session.execute(
+        select(Character.id, Character.version).where(Character.user_id == user_id).order_by(Character.id)
+    ).all()
+    listing = ','.join(f'{row.id}:{row.version}' for row in versions)
+    etag = character_etag('list', len(versions), f'{listing}|{sheet_variant(fields, include)}')
+    if request.if_none_match.contains(etag):
+        return '', 304, {'ETag': f'"{etag}"'}
+
+    characters = sheet_query(user_id, fields, include).order_by(Character.id).all()
+    response = jsonify({
         'message': 'Success',
-        'characters': [c.to_dict(include_relationships=True) for c in characters]
-    }), 200
+        'characters': [serialize_sheet(c, fields, include) for c in characters]
+    })
+    response.set_etag(etag)
+    return response, 200
 
 @character.route('/character/<int:character_id>', methods=['GET'])
 @jwt_required()
 def get_character(character_id):
     user_id = get_jwt_identity()
-    character = Character.query.filter_by(id=character_id, user_id=user_id).first()
+    fields, include, error = parse_sheet_args(request.args)
+    if error:
+        return jsonify({'error': error}), 400
+
+    # Solo se lee la versión; si el cliente ya tiene la ficha no hace falta cargar ni serializar nada
+    version = db.session.execute(
+        select(Character.version).where(Character.id == character_id, Character.user_id == user_id)
+    ).scalar()
+    if version is None:
+        return jsonify({'error': 'Personaje no encontrado'}), 404
+    etag = character_etag(character_id, version, sheet_variant(fields, include))
+    if request.if_none_match.contains(etag):
+        return '', 304, {'ETag': f'"{etag}"'}
+
+    character = sheet_query(user_id, fields, include).filter_by(id=character_id).first()
     if not character:
         return jsonify({'error': 'Personaje no encontrado'}), 404
-    return jsonify({
+    response = jsonify({
         'message': 'Success',
-        'character': character.to_dict(include_relationships=True)
-    }), 200
+        'character': serialize_sheet(character, fields, include)
+    })
+    response.set_etag(etag)
+    return response, 200
 
 @character.route('/character', methods=['POST'])
 @jwt_required()
@@ -40,6 +72,10 @@ def create_character():
         return jsonify(response), 400
 
     stats_data = data.get('stats', {})
+    unknown = [name for name in stats_data if name not in STAT_COLUMNS]
+    if unknown:
+        response['error'] = f"Estadísticas no válidas: {', '.join(unknown)}"
+        return jsonify(response), 400
     default_stats = {'FUE': 0, 'AGI': 0, 'MEN': 0, 'CAR': 0}
     default_stats.update(stats_data)
 
@@ -57,14 +93,10 @@ def create_character():
         health_max=data.get('health_max', 6 + fuerza),
         mana_current=data.get('mana_current', 3 + mente),
         mana_max=data.get('mana_max', 3 + mente),
-        image_url=data.get('image_url')
+        image_url=data.get('image_url'),
+        **{STAT_COLUMNS[stat_name]: value for stat_name, value in default_stats.items()}
     )
     db.session.add(character)
-    db.session.flush()
-
-    for stat_name, value in default_stats.items():
-        db.session.add(Stat(name=stat_name, value=value, character_id=character.id))
-
     db.session.commit()
     response['message'] = 'Personaje creado correctamente'
     response['character_id'] = character.id
@@ -79,6 +111,10 @@ def update_character(character_id):
     if not character:
         return jsonify({'error': 'Personaje no encontrado'}), 404
 
+    error = claim_if_match(character.id)
+    if error:
+        return error
+
     data = request.get_json() or {}
     for field in ['name', 'race', 'goal', 'background', 'level', 'health_current', 'health_max', 'mana_current', 'mana_max', 'image_url']:
         if field in data:
@@ -87,7 +123,9 @@ def update_character(character_id):
     db.session.commit()
     response['message'] = 'Personaje actualizado correctamente'
     response['character_id'] = character.id
-    return jsonify(response), 200
+    response = jsonify(response)
+    response.set_etag(character_etag(character.id, character.version))
+    return response, 200
 
 @character.route('/character/<int:character_id>', methods=['DELETE'])
 @jwt_required()
@@ -103,3 +141,59 @@ def delete_character(character_id):
     response['message'] = 'Personaje eliminado correctamente'
     response['character_id'] = character_id
     return jsonify(response), 200
+
+
+def _long_rest(character_ids):
+    # character_ids puede ser una lista o una subconsulta: todo se resuelve en sentencias UPDATE/DELETE
+    no_sync = {'synchronize_session': False}
+    counts = {}
+    counts['characters'] = db.session.execute(
+        update(Character)
+        .where(Character.id.in_(character_ids))
+        .values(health_current=Character.health_max, mana_current=Character.mana_max, version=Character.version + 1),
+        execution_options=no_sync
+    ).rowcount
+    counts['spells'] = db.session.execute(
+        update(Spell)
+        .where(Spell.character_id.in_(character_ids), Spell.uses != Spell.uses_max)
+        .values(uses=Spell.uses_max),
+        execution_options=no_sync
+    ).rowcount
+    counts['abilities'] = db.session.execute(
+        update(Ability)
+        .where(Ability.character_id.in_(character_ids), Ability.used.is_(True))
+        .values(used=False),
+        execution_options=no_sync
+    ).rowcount
+    counts['conditions'] = db.session.execute(
+        delete(Condition)
+        .where(Condition.character_id.in_(character_ids), Condition.temporary.is_(True)),
+        execution_options=no_sync
+    ).rowcount
+    db.session.commit()
+    return counts
+
+@character.route('/character/<int:character_id>/rest', methods=['POST'])
+@jwt_required()
+def rest_character(character_id):
+    response = {}
+    user_id = get_jwt_identity()
+    character_id = owned_character_id(user_id, character_id)
+    if not character_id:
+        return jsonify({'error': 'Personaje no encontrado'}), 404
+
+    response['message'] = 'Descanso largo completado'
+    response['character_id'] = character_id
+    response['affected'] = _long_rest([character_id])
+    return jsonify(response), 200
+
+@character.route('/character/rest', methods=['POST'])
+@jwt_required()
+def rest_party():
+    response = {}
+    user_id = get_jwt_identity()
+    owned = select(Character.id).where(Character.user_id == user_id).scalar_subquery()
+
+    response['message'] = 'Descanso largo completado para todo el grupo'
+    response['affected'] = _long_rest(owned)
+    return jsonify(response), 200
@@ -1,7 +1,7 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from back.models import db, Character, Condition
-from back.utils import validate_required_fields
+from back.models import db, Condition
+from back.utils import validate_required_fields, owned_character_id, get_owned, parse_batch, owned_batch_character_ids, bulk_insert
 
 condition = Blueprint("condition", __name__)
 
@@ -9,11 +9,11 @@ condition = Blueprint("condition", __name__)
 @jwt_required()
 def get_conditions(character_id):
     user_id = get_jwt_identity()
-    character = Character.query.filter_by(id=character_id, user_id=user_id).first()
-    if not character:
+    character_id = owned_character_id(user_id, character_id)
+    if not character_id:
         return jsonify({'error': 'Personaje no encontrado'}), 404
 
-    conditions = Condition.query.filter_by(character_id=character.id).all()
+    conditions = Condition.query.filter_by(character_id=character_id).all()
     return jsonify({
         'message': 'Condiciones obtenidas correctamente',
         'conditions': [c.to_dict() for c in conditions]
@@ -29,12 +29,12 @@ def create_condition():
     if not valid:
         return jsonify({'error': error}), 400
 
-    character = Character.query.filter_by(id=data['character_id'], user_id=user_id).first()
-    if not character:
+    character_id = owned_character_id(user_id, data['character_id'])
+    if not character_id:
         return jsonify({'error': 'Personaje no encontrado'}), 404
 
     condition = Condition(
-        character_id=character.id,
+        character_id=character_id,
         name=data['name'],
         description=data['description'],
         temporary=data.get('temporary', True)
@@ -47,17 +47,38 @@ def create_condition():
         'condition_id': condition.id
     }), 201
 
+@condition.route('/condition/bulk', methods=['POST'])
+@jwt_required()
+def create_conditions_bulk():
+    user_id = get_jwt_identity()
+
+    conditions, error = parse_batch(request.get_json(), 'character_id', 'name', 'description')
+    if error:
+        return jsonify({'error': error}), 400
+
+    character_ids = owned_batch_character_ids(user_id, conditions)
+    if character_ids is None:
+        return jsonify({'error': 'Personaje no encontrado'}), 404
+
+    rows = [{
+        'character_id': character_id,
+        'name': data['name'],
+        'description': data['description'],
+        'temporary': data.get('temporary', True)
+    } for character_id, data in zip(character_ids, conditions)]
+
+    return jsonify({
+        'message': 'Condiciones creadas correctamente',
+        'condition_ids': bulk_insert(Condition, rows)
+    }), 201
+
 @condition.route('/condition/<int:condition_id>', methods=['DELETE'])
 @jwt_required()
 def delete_condition(condition_id):
     user_id = get_jwt_identity()
-    condition = Condition.query.get(condition_id)
-    if not condition:
-        return jsonify({'error': 'Condición no encontrada'}), 404
-
-    character = Character.query.filter_by(id=condition.character_id, user_id=user_id).first()
-    if not character:
-        return jsonify({'error': 'No autorizado'}), 403
+    condition, error = get_owned(Condition, condition_id, user_id, 'Condición no encontrada')
+    if error:
+        return error
 
     db.session.delete(condition)
     db.session.commit()
@@ -4,6 +4,12 @@ from datetime import timedelta
 
 load_dotenv()
 
+# Cada worker del servidor es un proceso con sus propios pools y cachés: los núcleos se reparten entre ellos.
+# Por defecto un solo worker con varios hilos; para usar más hace falta un LOGIN_THROTTLE_STORE compartido
+_CPUS = os.cpu_count() or 1
+_SERVER_WORKERS = int(os.getenv('SERVER_WORKERS', 1))
+_CPUS_PER_WORKER = max(1, _CPUS // _SERVER_WORKERS)
+
 class Config:
     SECRET_KEY = os.getenv("SECRET_KEY", "super-secret")
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///db.sqlite3')
@@ -13,6 +19,79 @@ class Config:
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
     JWT_TOKEN_LOCATION = ['headers']
 
+    REVOCATION_SYNC_INTERVAL = 30
+    REVOCATION_BLOOM_BITS = 1 << 20
+    REVOCATION_BLOOM_HASHES = 7
+
+    BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', 12))
+    # Hashes bcrypt simultáneos por worker del servidor; en toda la máquina, como mucho uno por núcleo
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', _CPUS_PER_WORKER))
+    PASSWORD_HASH_QUEUE_MAX = 32
+    PASSWORD_HASH_TIMEOUT = 10
+
+    # (intentos, segundos) por cubeta; el almacén se puede sustituir por uno compartido entre workers
+    LOGIN_THROTTLE_ENABLED = True
+    LOGIN_THROTTLE_IP = (30, 60)
+    LOGIN_THROTTLE_LOGIN_NAME = (5, 300)
+    LOGIN_THROTTLE_MAX_KEYS = 100_000
+    # El almacén en memoria es de cada proceso: con N workers el límite efectivo sería N veces mayor
+    LOGIN_THROTTLE_STORE = os.getenv('LOGIN_THROTTLE_STORE', 'back.auth.throttle:memory_store')
+    # Proxies de confianza delante de la app (nginx, balanceador). Con 0 se usa la IP de la conexión;
+    # detrás de un proxy todas las peticiones comparten su IP y la cubeta por IP dejaría de servir
+    PROXY_FIX_X_FOR = int(os.getenv('PROXY_FIX_X_FOR', 0))
+
+    PAGE_SIZE_DEFAULT = 50
+    PAGE_SIZE_MAX = 200
+    SEARCH_LIMIT_DEFAULT = 20
+    BULK_MAX_ITEMS = 500
+    ROLL_MAX_COUNT = 100_000
+    ROLL_MAX_DICE = 5_000_000  # tiradas x dados de cada expresión (los que explotan cuentan x4)
+
+    STAT_CACHE_TTL = 300
+    STAT_CACHE_SIZE = 10_000
+    IDENTITY_CACHE_TTL = 60
+    IDENTITY_CACHE_SIZE = 10_000
+
+    RELATIONSHIP_GRAPH_INDEX = True
+    RELATIONSHIP_GRAPH_MAX_DEPTH = 6
+    GRAPH_CACHE_TTL = 300  # cada consulta comprueba antes una huella barata de los personajes del usuario
+    GRAPH_CACHE_SIZE = 1_000
+
+    EXPORT_YIELD_PER = 1_000
+    IMPORT_CHUNK_SIZE = 1_000
+    IMPORT_CHUNK_SIZE_MAX = 10_000
+
+    # /api/metrics expone datos del proceso (cachés, colas): desactivado salvo que se pida expresamente
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', '0') == '1'
+
+    # Servidor de producción (python -m back.serve, gunicorn). Cada worker es un proceso con su propia
+    # app, sus cachés y su pool de conexiones; los hilos atienden peticiones concurrentes dentro de él.
+    # Lo que es de cada worker: el límite de login (salvo almacén compartido), las cachés de identidad,
+    # estadísticas y grafo (se validan contra la base de datos) y la lista de revocados (se sincroniza con
+    # revoked_tokens cada REVOCATION_SYNC_INTERVAL segundos, así que otro worker puede tardar eso en verla)
+    SERVER_BIND = os.getenv('SERVER_BIND', '0.0.0.0:5000')
+    SERVER_WORKERS = _SERVER_WORKERS
+    SERVER_THREADS = int(os.getenv('SERVER_THREADS', max(4, 2 * _CPUS)))
+    SERVER_WORKER_CLASS = os.getenv('SERVER_WORKER_CLASS', 'gthread')
+    SERVER_TIMEOUT = int(os.getenv('SERVER_TIMEOUT', 30))  # un worker sin responder más tiempo se reinicia
+    SERVER_GRACEFUL_TIMEOUT = int(os.getenv('SERVER_GRACEFUL_TIMEOUT', 30))  # margen para acabar al reiniciar
+    SERVER_KEEPALIVE = int(os.getenv('SERVER_KEEPALIVE', 5))
+    SERVER_MAX_REQUESTS = int(os.getenv('SERVER_MAX_REQUESTS', 0))  # 0 = no reciclar workers
+    SERVER_MAX_REQUESTS_JITTER = int(os.getenv('SERVER_MAX_REQUESTS_JITTER', 0))
+    SERVER_BACKLOG = int(os.getenv('SERVER_BACKLOG', 2048))
+    SERVER_PRELOAD = os.getenv('SERVER_PRELOAD', '0') == '1'
+    SERVER_ACCESS_LOG = os.getenv('SERVER_ACCESS_LOG')  # '-' para stdout; sin definir, desactivado
+
+    SIMULATION_MAX_TRIALS = 10_000_000  # CLI
+    SIMULATION_MAX_TRIALS_HTTP = 1_000_000  # la petición ocupa un hilo del worker
+    SIMULATION_MAX_WORK_HTTP = 40_000_000  # trials x dificultades x dados: alrededor de un segundo
+    SIMULATION_MAX_CHARACTERS = 20
+    SIMULATION_MAX_DIFFICULTIES = 20
+    # Procesos por worker del servidor: con un solo worker, uno por núcleo; con un worker por núcleo o más
+    # sale 1 y las simulaciones por HTTP no lanzan procesos. El CLI corre solo y usa todos los núcleos
+    SIMULATION_WORKERS = int(os.getenv('SIMULATION_WORKERS', _CPUS_PER_WORKER))
+    SIMULATION_PARALLEL_THRESHOLD = 20_000_000
+
     CLOUDINARY_NAME = os.getenv('CLOUDINARY_NAME')
     CLOUDINARY_API_KEY = os.getenv('CLOUDINARY_API_KEY')
     CLOUDINARY_API_SECRET = os.getenv('CLOUDINARY_API_SECRET')
\ No newline at end of file
@@ -1,7 +1,7 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from back.models import db, Character, InventoryItem
-from back.utils import validate_required_fields
+from back.models import db, InventoryItem
+from back.utils import validate_required_fields, owned_character_id, get_owned, parse_batch, owned_batch_character_ids, bulk_insert, claim_if_match
 
 inventory = Blueprint("inventory", __name__)
 
@@ -11,12 +11,12 @@ def get_inventory(character_id):
     response = {}
     user_id = get_jwt_identity()
 
-    character = Character.query.filter_by(id=character_id, user_id=user_id).first()
-    if not character:
+    character_id = owned_character_id(user_id, character_id)
+    if not character_id:
         response['error'] = 'Personaje no encontrado'
         return jsonify(response), 404
 
-    items = InventoryItem.query.filter_by(character_id=character.id).all()
+    items = InventoryItem.query.filter_by(character_id=character_id).all()
     response['message'] = 'Inventario obtenido correctamente'
     response['items'] = [item.to_dict() for item in items]
     return jsonify(response), 200
@@ -33,13 +33,13 @@ def create_item():
         response['error'] = error
         return jsonify(response), 400
 
-    character = Character.query.filter_by(id=data['character_id'], user_id=user_id).first()
-    if not character:
+    character_id = owned_character_id(user_id, data['character_id'])
+    if not character_id:
         response['error'] = 'Personaje no encontrado'
         return jsonify(response), 404
 
     item = InventoryItem(
-        character_id=character.id,
+        character_id=character_id,
         item=data['item'],
         description=data['description'],
         image_url=data.get('image_url'),
@@ -53,18 +53,47 @@ def create_item():
     response['item_id'] = item.id
     return jsonify(response), 201
 
+@inventory.route('/inventory/bulk', methods=['POST'])
+@jwt_required()
+def create_items_bulk():
+    response = {}
+    user_id = get_jwt_identity()
+
+    items, error = parse_batch(request.get_json(), 'character_id', 'item', 'description')
+    if error:
+        response['error'] = error
+        return jsonify(response), 400
+
+    character_ids = owned_batch_character_ids(user_id, items)
+    if character_ids is None:
+        response['error'] = 'Personaje no encontrado'
+        return jsonify(response), 404
+
+    rows = [{
+        'character_id': character_id,
+        'item': data['item'],
+        'description': data['description'],
+        'image_url': data.get('image_url'),
+        'magical': data.get('magical', False),
+        'notes': data.get('notes')
+    } for character_id, data in zip(character_ids, items)]
+
+    response['message'] = 'Items añadidos al inventario'
+    response['item_ids'] = bulk_insert(InventoryItem, rows)
+    return jsonify(response), 201
+
 @inventory.route('/inventory/<int:item_id>', methods=['PUT'])
 @jwt_required()
 def update_item(item_id):
     response = {}
     user_id = get_jwt_identity()
-    item = InventoryItem.query.get(item_id)
-    if not item:
-        return jsonify({'error': 'Item no encontrado'}), 404
+    item, error = get_owned(InventoryItem, item_id, user_id, 'Item no encontrado')
+    if error:
+        return error
 
-    character = Character.query.filter_by(id=item.character_id, user_id=user_id).first()
-    if not character:
-        return jsonify({'error': 'No autorizado'}), 403
+    error = claim_if_match(item.character_id)
+    if error:
+        return error
 
     data = request.get_json() or {}
     for field in ['item', 'description', 'image_url', 'magical', 'notes']:
@@ -81,13 +110,9 @@ def update_item(item_id):
 def delete_item(item_id):
     response = {}
     user_id = get_jwt_identity()
-    item = InventoryItem.query.get(item_id)
-    if not item:
-        return jsonify({'error': 'Item no encontrado'}), 404
-
-    character = Character.query.filter_by(id=item.character_id, user_id=user_id).first()
-    if not character:
-        return jsonify({'error': 'No autorizado'}), 403
+    item, error = get_owned(InventoryItem, item_id, user_id, 'Item no encontrado')
+    if error:
+        return error
 
     db.session.delete(item)
     db.session.commit()
@@ -0,0 +1,315 @@
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from math import comb
+import numpy as np
+
+MAX_DICE = 100
+MAX_SIDES = 1000
+MAX_TERMS = 20
+MAX_CONSTANT = 1_000_000
+EXPLODE_LIMIT = 20
+EXPLODE_WORK = 4  # un dado que explota cuesta unas cuatro veces más que uno normal al tirarlo (medido)
+
+class DiceError(ValueError):
+    pass
+
+@dataclass(frozen=True)
+class Dice:
+    count: int
+    sides: int
+    explode: bool = False
+    keep: tuple = None  # ('h' | 'l', cuántos)
+
+    def __str__(self):
+        text = f'{self.count}d{self.sides}'
+        if self.explode:
+            text += '!'
+        if self.keep:
+            text += f'k{self.keep[0]}{self.keep[1]}'
+        return text
+
+@dataclass(frozen=True)
+class Constant:
+    value: int
+
+    def __str__(self):
+        return str(self.value)
+
+@dataclass(frozen=True)
+class StatRef:
+    name: str
+
+    def __str__(self):
+        return self.name
+
+@dataclass(frozen=True)
+class Expression:
+    terms: tuple  # ((signo, término), ...)
+
+    def __str__(self):
+        text = ''
+        for sign, term in self.terms:
+            text += ('-' if sign < 0 else ('+' if text else '')) + str(term)
+        return text
+
+    @property
+    def dice_work(self):
+        # Dados que se generan por cada tirada de la expresión, con los que explotan ponderados
+        return sum(term.count * (EXPLODE_WORK if term.explode else 1)
+                   for _, term in self.terms if isinstance(term, Dice))
+
+    @property
+    def stat_names(self):
+        return {term.name for _, term in self.terms if isinstance(term, StatRef)}
+
+    def bind(self, stats):
+        # Sustituye las estadísticas por constantes: '1d20+AGI' con AGI=2 pasa a '1d20+2'
+        terms = []
+        for sign, term in self.terms:
+            if isinstance(term, StatRef):
+                if term.name not in stats:
+                    raise DiceError(f'Estadística "{term.name}" no encontrada en el personaje')
+                term = Constant(stats[term.name])
+            terms.append((sign, term))
+        return Expression(tuple(terms))
+
+_TOKEN = re.compile(r'\s*(?:(?P<sign>[+-])|(?P<dice>(?P<count>\d*)d(?P<sides>\d+)(?P<mods>(?:!|k[hl]\d+)*))'
+                    r'|(?P<alias>adv|dis)(?![a-z])|(?P<number>\d+)|(?P<stat>[a-z]+))', re.IGNORECASE)
+_MODIFIER = re.compile(r'!|k([hl])(\d+)', re.IGNORECASE)
+
+def _dice_term(match):
+    count = int(match.group('count') or 1)
+    sides = int(match.group('sides'))
+    if not 1 <= count <= MAX_DICE or not 1 <= sides <= MAX_SIDES:
+        raise DiceError(f'Dados fuera de rango: máximo {MAX_DICE}d{MAX_SIDES}')
+
+    explode, keep = False, None
+    for modifier in _MODIFIER.finditer(match.group('mods')):
+        if modifier.group(0) == '!':
+            if sides == 1:
+                raise DiceError('Un dado de una cara no puede explotar')
+            explode = True
+        else:
+            kept = int(modifier.group(2))
+            if not 1 <= kept <= count:
+                raise DiceError(f'No se pueden conservar {kept} de {count} dados')
+            keep = (modifier.group(1).lower(), kept)
+    return Dice(count, sides, explode, keep)
+
+@lru_cache(maxsize=1024)
+def compile_expression(text):
+    terms, sign, position = [], None, 0
+    text = text.strip()
+    if not text:
+        raise DiceError('Expresión vacía')
+
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if not match or match.end() == position:
+            raise DiceError(f'Expresión no válida cerca de "{text[position:]}"')
+        position = match.end()
+
+        if match.group('sign'):
+            if sign is not None:
+                raise DiceError('Dos signos seguidos en la expresión')
+            sign = -1 if match.group('sign') == '-' else 1
+            continue
+        if terms and sign is None:
+            raise DiceError('Falta un operador entre términos')
+
+        if match.group('dice'):
+            term = _dice_term(match)
+        elif match.group('alias'):
+            term = Dice(2, 20, keep=('h' if match.group('alias').lower() == 'adv' else 'l', 1))
+        elif match.group('number'):
+            if len(match.group('number')) > len(str(MAX_CONSTANT)) or int(match.group('number')) > MAX_CONSTANT:
+                raise DiceError(f'Las constantes no pueden superar {MAX_CONSTANT}')
+            term = Constant(int(match.group('number')))
+        else:
+            term = StatRef(match.group('stat').upper())
+        terms.append((sign or 1, term))
+        sign = None
+        if len(terms) > MAX_TERMS:
+            raise DiceError(f'Máximo {MAX_TERMS} términos por expresión')
+
+    if sign is not None or not terms:
+        raise DiceError('La expresión termina en un operador')
+    return Expression(tuple(terms))
+
+def _roll_dice(term, rng, count):
+    faces = rng.integers(1, term.sides + 1, size=(count, term.count))
+    rolled = faces.copy()
+    if term.explode:
+        # Cada dado que saca el máximo vuelve a tirarse y suma, hasta EXPLODE_LIMIT veces
+        last = faces
+        for _ in range(EXPLODE_LIMIT):
+            exploding = last == term.sides
+            if not exploding.any():
+                break
+            last = np.zeros_like(faces)
+            last[exploding] = rng.integers(1, term.sides + 1, size=int(exploding.sum()))
+            rolled += last
+    kept = rolled
+    if term.keep:
+        kept = np.sort(rolled, axis=1)
+        kept = kept[:, -term.keep[1]:] if term.keep[0] == 'h' else kept[:, :term.keep[1]]
+    return rolled, kept
+
+def roll(expression, rng, count=1, detail=False):
+    # Todas las tiradas de la expresión se generan de golpe como matrices (count x dados)
+    if expression.stat_names:
+        raise DiceError('La expresión tiene estadísticas sin resolver')
+
+    totals = np.zeros(count, dtype=np.int64)
+    breakdown = []
+    for sign, term in expression.terms:
+        if isinstance(term, Constant):
+            totals += sign * term.value
+            continue
+        rolled, kept = _roll_dice(term, rng, count)
+        totals += sign * kept.sum(axis=1)
+        if detail:
+            breakdown.append({'dice': str(term), 'rolls': rolled[0].tolist(), 'kept': np.sort(kept[0]).tolist()})
+    return totals, breakdown
+
+# Valores posibles de la suma completa. Las convoluciones son directas (O(n·m)): con 20 000 la peor
+# expresión admitida tarda unas décimas de segundo
+MAX_SUPPORT = 20_000
+MAX_KEEP_WORK = 1_000_000_000  # operaciones sobre elementos en _keep_pmf: medio segundo como mucho
+# Solo se cachean las distribuciones pequeñas: 512 x 2 000 valores x 8 bytes = 8 MB como mucho por proceso
+ODDS_CACHE_SIZE = 512
+ODDS_CACHE_MAX_SUPPORT = 2_000
+# La respuesta incluye la distribución completa solo hasta este tamaño
+MAX_PMF_POINTS = 1_000
+
+def _die_pmf(term):
+    # Distribución de un solo dado; si explota, la cadena se corta en EXPLODE_LIMIT como en roll()
+    sides = term.sides
+    if not term.explode:
+        return 1, np.full(sides, 1 / sides)
+    pmf = np.zeros((EXPLODE_LIMIT + 1) * sides)
+    for depth in range(EXPLODE_LIMIT):
+        pmf[depth * sides:(depth + 1) * sides - 1] = sides ** -(depth + 1)
+    pmf[EXPLODE_LIMIT * sides:] = sides ** -(EXPLODE_LIMIT + 1)
+    return 1, pmf
+
+def _convolve(first, second):
+    return first[0] + second[0], np.convolve(first[1], second[1])
+
+def _sum_pmf(die, count):
+    # Suma de count dados por cuadrados sucesivos: log2(count) convoluciones
+    result, power = (0, np.ones(1)), die
+    while count:
+        if count & 1:
+            result = _convolve(result, power)
+        count >>= 1
+        if count:
+            power = _convolve(power, power)
+    return result
+
+def _keep_pmf(term, die):
+    # Estadísticos de orden por programación dinámica: se recorren las caras de mayor a menor (kh) o de
+    # menor a mayor (kl) repartiendo cuántos dados muestran cada cara y cuántos de ellos se conservan
+    offset, probabilities = die
+    count, keep = term.count, term.keep[1]
+    faces = [(offset + index, p) for index, p in enumerate(probabilities) if p > 0]
+    if term.keep[0] == 'h':
+        faces.reverse()
+
+    max_value = max(value for value, _ in faces) * keep
+    binomials = [[comb(n, c) for c in range(n + 1)] for n in range(count + 1)]
+    states = {(0, 0): np.zeros(max_value + 1)}
+    states[(0, 0)][0] = 1.0
+    for value, p in faces:
+        powers = [p ** c for c in range(count + 1)]
+        updated = {}
+        for (used, kept), pmf in states.items():
+            for c in range(count - used + 1):
+                taken = min(c, keep - kept)
+                shifted = pmf * (binomials[count - used][c] * powers[c])
+                if taken:
+                    shifted = np.concatenate((np.zeros(taken * value), shifted[:len(shifted) - taken * value]))
+                key = (used + c, kept + taken)
+                updated[key] = updated[key] + shifted if key in updated else shifted
+        states = updated
+    return 0, states[(count, keep)]
+
+def _faces(term):
+    return (EXPLODE_LIMIT + 1) * term.sides if term.explode else term.sides
+
+def _term_support(term):
+    # Cuántos valores distintos puede sumar el término, sin calcular nada
+    if isinstance(term, Constant):
+        return 1
+    if term.keep:
+        return _faces(term) * term.keep[1] + 1
+    return term.count * (_faces(term) - 1) + 1
+
+def expression_support(expression):
+    # Se comprueba la expresión entera antes de la primera convolución: rechazarla no cuesta nada
+    support = 1
+    for _, term in expression.terms:
+        if isinstance(term, Dice) and term.keep and \
+                _faces(term) * (term.count + 1) ** 2 * (term.keep[1] + 1) * _term_support(term) > MAX_KEEP_WORK:
+            raise DiceError('La expresión es demasiado compleja para el cálculo exacto')
+        support += _term_support(term) - 1
+    if support > MAX_SUPPORT:
+        raise DiceError('La expresión es demasiado compleja para el cálculo exacto')
+    return support
+
+def _term_pmf(term):
+    if isinstance(term, Constant):
+        return term.value, np.ones(1)
+    die = _die_pmf(term)
+    if term.keep:
+        return _keep_pmf(term, die)
+    return _sum_pmf(die, term.count)
+
+def _distribution(expression):
+    result = (0, np.ones(1))
+    for sign, term in expression.terms:
+        offset, pmf = _term_pmf(term)
+        if sign < 0:
+            offset, pmf = -(offset + len(pmf) - 1), pmf[::-1]
+        result = _convolve(result, (offset, pmf))
+
+    offset, pmf = result
+    nonzero = np.flatnonzero(pmf > 0)
+    pmf = pmf[nonzero[0]:nonzero[-1] + 1] / pmf.sum()
+    pmf.setflags(write=False)
+    return offset + int(nonzero[0]), pmf
+
+@lru_cache(maxsize=ODDS_CACHE_SIZE)
+def _cached_distribution(normalized):
+    return _distribution(compile_expression(normalized))
+
+def odds_cache_info():
+    return _cached_distribution.cache_info()
+
+def outcome_distribution(normalized):
+    # La clave es la expresión ya resuelta ('1d20+2'), así las consultas repetidas salen de memoria
+    expression = compile_expression(normalized)
+    if expression.stat_names:
+        raise DiceError('La expresión tiene estadísticas sin resolver')
+    if expression_support(expression) <= ODDS_CACHE_MAX_SUPPORT:
+        return _cached_distribution(normalized)
+    return _distribution(expression)
+
+def outcome_summary(offset, pmf, difficulty=None, percentiles=(5, 25, 50, 75, 95)):
+    totals = np.arange(offset, offset + len(pmf))
+    cdf = np.cumsum(pmf)
+    summary = {
+        'min': int(totals[0]),
+        'max': int(totals[-1]),
+        'mean': float(totals @ pmf),
+        'percentiles': {
+            f'p{q}': int(totals[min(np.searchsorted(cdf, q / 100 - 1e-12), len(cdf) - 1)]) for q in percentiles
+        },
+    }
+    if len(pmf) <= MAX_PMF_POINTS:
+        summary['pmf'] = [[int(total), float(p)] for total, p in zip(totals, pmf)]
+    if difficulty is not None:
+        summary['difficulty'] = difficulty
+        summary['success_probability'] = float(pmf[totals >= difficulty].sum())
+    return summary
@@ -1,6 +1,18 @@
-from flask import Blueprint, request, jsonify
-from back.models import Character
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from back.cache import get_stat_map, get_stat_maps, stat_cache, identity_cache
+from back.auth.passwords import password_hasher
+from back.auth.throttle import login_throttle
+from back.auth.revocation import denylist
+from back.misc.dice import DiceError, compile_expression, roll, outcome_distribution, outcome_summary, odds_cache_info
+from back.misc.simulation import simulate_party, simulation_work
+from back.utils import owned_character_id, owned_batch_character_ids
+import click
+import json
+import os
+import numpy as np
 import random
+import secrets
 
 misc = Blueprint("misc", __name__)
 
@@ -20,28 +32,278 @@ def roll_handler():
         response['error'] = 'Parámetros character_id, stat y difficulty requeridos'
         return jsonify(response), 400
 
-    character = Character.query.get(character_id)
-    if not character:
+    stats = get_stat_map(character_id)
+    if stats is None:
         response['error'] = 'Personaje no encontrado'
         return jsonify(response), 404
 
     stat_name = stat_name.upper()
-    stat = next((s for s in character.stats if s.name == stat_name), None)
-    if not stat:
+    modifier = stats.get(stat_name)
+    if modifier is None:
         response['error'] = f'Estadística \"{stat_name}\" no encontrada en el personaje'
         return jsonify(response), 400
 
     roll = random.randint(1, 20)
-    total = roll + stat.value
+    total = roll + modifier
     success = total >= difficulty
 
     response['message'] = 'Tirada realizada'
     response['result'] = {
         'stat': stat_name,
         'base_roll': roll,
-        'modifier': stat.value,
+        'modifier': modifier,
         'total': total,
         'difficulty': difficulty,
         'success': success
     }
-    return jsonify(response), 200
\ No newline at end of file
+    return jsonify(response), 200
+
+@misc.route('/roll/batch', methods=['POST'])
+@jwt_required()
+# Ejemplo: {"character_id": 1, "seed": 42, "rolls": [{"expression": "2d6+FUE", "count": 3, "difficulty": 10}]}
+def roll_batch_handler():
+    response = {}
+    data = request.get_json() or {}
+    if not isinstance(data, dict):
+        response['error'] = 'Formato inválido'
+        return jsonify(response), 400
+    rolls = data.get('rolls')
+
+    if not isinstance(rolls, list) or not rolls:
+        response['error'] = 'Se esperaba una lista de tiradas'
+        return jsonify(response), 400
+
+    seed = data.get('seed')
+    if seed is None:
+        seed = secrets.randbits(63)
+    elif type(seed) is not int or seed < 0:
+        response['error'] = 'La semilla debe ser un entero no negativo'
+        return jsonify(response), 400
+
+    try:
+        parsed = []
+        for index, item in enumerate(rolls):
+            if not isinstance(item, dict) or not isinstance(item.get('expression'), str):
+                raise DiceError(f'Tirada {index}: falta la expresión')
+            count = item.get('count', 1)
+            difficulty = item.get('difficulty')
+            if type(count) is not int or count < 1:
+                raise DiceError(f'Tirada {index}: count debe ser un entero positivo')
+            if difficulty is not None and type(difficulty) is not int:
+                raise DiceError(f'Tirada {index}: difficulty debe ser un entero')
+            parsed.append((compile_expression(item['expression']), count, difficulty))
+    except DiceError as error:
+        response['error'] = str(error)
+        return jsonify(response), 400
+
+    if sum(count for _, count, _ in parsed) > current_app.config['ROLL_MAX_COUNT']:
+        response['error'] = f"Máximo {current_app.config['ROLL_MAX_COUNT']} tiradas por petición"
+        return jsonify(response), 400
+    if sum(count * expression.dice_work for expression, count, _ in parsed) > current_app.config['ROLL_MAX_DICE']:
+        response['error'] = f"Máximo {current_app.config['ROLL_MAX_DICE']} dados por petición"
+        return jsonify(response), 400
+
+    stats = {}
+    if any(expression.stat_names for expression, _, _ in parsed):
+        character_id = owned_character_id(get_jwt_identity(), data.get('character_id'))
+        stats = get_stat_map(character_id) if character_id else None
+        if stats is None:
+            response['error'] = 'Personaje no encontrado'
+            return jsonify(response), 404
+
+    rng = np.random.default_rng(seed)
+    results = []
+    try:
+        for expression, count, difficulty in parsed:
+            bound = expression.bind(stats)
+            totals, breakdown = roll(bound, rng, count, detail=count == 1)
+            result = {'expression': str(expression), 'resolved': str(bound), 'totals': totals.tolist()}
+            if breakdown:
+                result['detail'] = breakdown
+            if difficulty is not None:
+                result['difficulty'] = difficulty
+                result['successes'] = int((totals >= difficulty).sum())
+            results.append(result)
+    except DiceError as error:
+        response['error'] = str(error)
+        return jsonify(response), 400
+
+    response['message'] = 'Tiradas realizadas'
+    response['seed'] = seed
+    response['results'] = results
+    return jsonify(response), 200
+
+
+@misc.route('/roll/odds', methods=['GET'])
+@jwt_required()
+# Ejemplo de llamada: [GET] /api/roll/odds?character_id=1&stat=AGI&difficulty=14 (expression por defecto: 1d20)
+def roll_odds_handler():
+    response = {}
+
+    expression_text = request.args.get('expression', '1d20', type=str)
+    stat_name = request.args.get('stat', type=str)
+    character_id = request.args.get('character_id', type=int)
+    difficulty = request.args.get('difficulty', type=int)
+    if stat_name:
+        expression_text = f'{expression_text}+{stat_name}'
+
+    try:
+        expression = compile_expression(expression_text)
+    except DiceError as error:
+        response['error'] = str(error)
+        return jsonify(response), 400
+
+    stats = {}
+    if expression.stat_names:
+        character_id = owned_character_id(get_jwt_identity(), character_id)
+        stats = get_stat_map(character_id) if character_id else None
+        if stats is None:
+            response['error'] = 'Personaje no encontrado'
+            return jsonify(response), 404
+
+    try:
+        bound = expression.bind(stats)
+        offset, pmf = outcome_distribution(str(bound))
+    except DiceError as error:
+        response['error'] = str(error)
+        return jsonify(response), 400
+
+    response['message'] = 'Probabilidades calculadas'
+    response['result'] = {
+        'expression': str(expression),
+        'resolved': str(bound),
+        **outcome_summary(offset, pmf, difficulty)
+    }
+    return jsonify(response), 200
+
+
+def _party_members(character_ids, expression_text, stat_name):
+    if stat_name:
+        expression_text = f'{expression_text}+{stat_name}'
+    expression = compile_expression(expression_text)
+
+    stats = get_stat_maps(character_ids)
+    missing = [character_id for character_id, values in stats.items() if values is None]
+    if missing:
+        return None, missing
+
+    return [(character_id, str(expression.bind(stats[character_id]))) for character_id in character_ids], None
+
+def _run_simulation(character_ids, difficulties, trials, seed, expression_text='1d20', stat_name=None, workers=None,
+                    max_work=None):
+    members, missing = _party_members(character_ids, expression_text, stat_name)
+    if missing:
+        return None, missing
+    if max_work and simulation_work([expression for _, expression in members], difficulties, trials) > max_work:
+        raise DiceError(f'Simulación demasiado grande: trials x dificultades x dados no puede superar {max_work}')
+    return simulate_party(
+        members, difficulties, trials, seed,
+        workers=workers or current_app.config['SIMULATION_WORKERS'],
+        parallel_threshold=current_app.config['SIMULATION_PARALLEL_THRESHOLD']
+    ), None
+
+@misc.route('/roll/simulate', methods=['POST'])
+@jwt_required()
+# Ejemplo: {"character_ids": [1, 2, 3], "stat": "AGI", "difficulties": [10, 15], "trials": 100000, "seed": 7}
+def roll_simulate_handler():
+    response = {}
+    data = request.get_json() or {}
+    if not isinstance(data, dict):
+        response['error'] = 'Formato inválido'
+        return jsonify(response), 400
+
+    character_ids = data.get('character_ids')
+    difficulties = data.get('difficulties')
+    trials = data.get('trials', 10_000)
+    seed = data.get('seed')
+    if seed is None:
+        seed = secrets.randbits(63)
+
+    config = current_app.config
+    if (not isinstance(character_ids, list) or not 1 <= len(character_ids) <= config['SIMULATION_MAX_CHARACTERS']
+            or not all(type(character_id) is int for character_id in character_ids)):
+        response['error'] = f"Se esperaba una lista de entre 1 y {config['SIMULATION_MAX_CHARACTERS']} character_ids"
+        return jsonify(response), 400
+    if (not isinstance(difficulties, list) or not 1 <= len(difficulties) <= config['SIMULATION_MAX_DIFFICULTIES']
+            or not all(type(difficulty) is int for difficulty in difficulties)):
+        response['error'] = f"Se esperaba una lista de entre 1 y {config['SIMULATION_MAX_DIFFICULTIES']} dificultades"
+        return jsonify(response), 400
+    expression_text, stat_name = data.get('expression', '1d20'), data.get('stat')
+    if not isinstance(expression_text, str) or not (stat_name is None or isinstance(stat_name, str)):
+        response['error'] = 'expression y stat deben ser textos'
+        return jsonify(response), 400
+    max_trials = config['SIMULATION_MAX_TRIALS_HTTP']
+    if type(trials) is not int or not 1 <= trials <= max_trials:
+        response['error'] = f"trials debe estar entre 1 y {max_trials}"
+        return jsonify(response), 400
+    if type(seed) is not int or seed < 0:
+        response['error'] = 'La semilla debe ser un entero no negativo'
+        return jsonify(response), 400
+
+    user_id = get_jwt_identity()
+    if owned_batch_character_ids(user_id, [{'character_id': character_id} for character_id in character_ids]) is None:
+        response['error'] = 'Personajes no encontrados'
+        return jsonify(response), 404
+
+    try:
+        result, missing = _run_simulation(list(dict.fromkeys(character_ids)), difficulties, trials, seed,
+                                          expression_text, stat_name, max_work=config['SIMULATION_MAX_WORK_HTTP'])
+    except DiceError as error:
+        response['error'] = str(error)
+        return jsonify(response), 400
+    if missing:
+        response['error'] = f"Personajes no encontrados: {', '.join(map(str, missing))}"
+        return jsonify(response), 404
+
+    response['message'] = 'Simulación completada'
+    response['result'] = result
+    return jsonify(response), 200
+
+@misc.route('/metrics', methods=['GET'])
+def metrics_handler():
+    if not current_app.config['METRICS_ENABLED']:
+        return jsonify({'error': 'No encontrado'}), 404
+    return jsonify({
+        'caches': {
+            'stats': stat_cache().stats(),
+            'identities': identity_cache().stats(),
+            'expressions': _lru_stats(compile_expression.cache_info()),
+            'odds': _lru_stats(odds_cache_info())
+        },
+        'password_hasher': password_hasher().stats(),
+        'login_throttle': login_throttle().stats(),
+        'denylist': denylist().stats()
+    }), 200
+
+def _lru_stats(info):
+    lookups = info.hits + info.misses
+    return {
+        'size': info.currsize,
+        'maxsize': info.maxsize,
+        'hits': info.hits,
+        'misses': info.misses,
+        'hit_rate': info.hits / lookups if lookups else 0.0
+    }
+
+@misc.cli.command('simulate')
+@click.option('--character', 'character_ids', type=int, multiple=True, required=True, help='Id de personaje (repetible)')
+@click.option('--difficulty', 'difficulties', type=int, multiple=True, required=True, help='Dificultad (repetible)')
+@click.option('--stat', 'stat_name', default=None, help='Estadística que se suma a la expresión')
+@click.option('--expression', 'expression_text', default='1d20', show_default=True)
+@click.option('--trials', type=int, default=1_000_000, show_default=True)
+@click.option('--seed', type=int, default=None)
+@click.option('--workers', type=int, default=None, help='Procesos para la simulación [por defecto: todos los núcleos]')
+def simulate_command(character_ids, difficulties, stat_name, expression_text, trials, seed, workers):
+    """Simula tiradas de todo un grupo contra varias dificultades."""
+    max_trials = current_app.config['SIMULATION_MAX_TRIALS']
+    if not 1 <= trials <= max_trials:
+        raise click.BadParameter(f'debe estar entre 1 y {max_trials}', param_hint='--trials')
+    seed = secrets.randbits(63) if seed is None else seed
+    try:
+        result, missing = _run_simulation(list(dict.fromkeys(character_ids)), list(difficulties), trials, seed,
+                                          expression_text, stat_name, workers or os.cpu_count())
+    except DiceError as error:
+        raise click.ClickException(str(error))
+    if missing:
+        raise click.ClickException(f"Personajes no encontrados: {', '.join(map(str, missing))}")
+    click.echo(json.dumps(result, indent=2))
@@ -0,0 +1,100 @@
+import math
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from back.misc.dice import compile_expression, roll
+
+CHUNK_TRIALS = 250_000
+Z_95 = 1.959963984540054
+
+_executor = None
+_executor_workers = None
+_executor_lock = threading.Lock()
+
+def _get_executor(workers):
+    # Un solo pool por proceso; 'spawn' evita heredar hilos y conexiones del servidor
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is None or _executor_workers != workers:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            _executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            _executor_workers = workers
+        return _executor
+
+def shutdown_executor():
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+        _executor = _executor_workers = None
+
+def simulation_work(expressions, difficulties, trials):
+    # Dados que se tiran en total: trials x dificultades x dados de cada personaje. Es lo que mide el
+    # tiempo de la simulación (unos 30 ns por dado), no el número de tiradas por sí solo
+    dice = sum(max(1, compile_expression(text).dice_work) for text in expressions)
+    return trials * len(difficulties) * dice
+
+def _simulate_chunk(expressions, difficulties, trials, seed_sequence):
+    # Cada personaje tira trials x dificultades de una vez; la partida completa se resuelve con AND/OR por filas
+    rng = np.random.default_rng(seed_sequence)
+    thresholds = np.asarray(difficulties)
+    party_all = np.ones((trials, len(difficulties)), dtype=bool)
+    party_any = np.zeros((trials, len(difficulties)), dtype=bool)
+    member_successes = []
+    for text in expressions:
+        totals, _ = roll(compile_expression(text), rng, trials * len(difficulties))
+        successes = totals.reshape(trials, len(difficulties)) >= thresholds
+        member_successes.append(successes.sum(axis=0))
+        party_all &= successes
+        party_any |= successes
+    return np.array(member_successes), party_all.sum(axis=0), party_any.sum(axis=0)
+
+def wilson_interval(successes, trials, z=Z_95):
+    if not trials:
+        return 0.0, 0.0
+    rate = successes / trials
+    denominator = 1 + z * z / trials
+    center = (rate + z * z / (2 * trials)) / denominator
+    margin = z * math.sqrt(rate * (1 - rate) / trials + z * z / (4 * trials * trials)) / denominator
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+def _rate(successes, trials):
+    low, high = wilson_interval(int(successes), trials)
+    return {'successes': int(successes), 'rate': int(successes) / trials, 'ci95': [low, high]}
+
+def simulate_party(members, difficulties, trials, seed, workers=1, parallel_threshold=0):
+    # members: [(character_id, expresión ya resuelta)]. Los trozos tienen semillas propias derivadas de
+    # seed, así el resultado es el mismo con uno o con varios procesos
+    expressions = [expression for _, expression in members]
+    sizes = [CHUNK_TRIALS] * (trials // CHUNK_TRIALS)
+    if trials % CHUNK_TRIALS:
+        sizes.append(trials % CHUNK_TRIALS)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    arguments = [(expressions, difficulties, size, seed_sequence) for size, seed_sequence in zip(sizes, seeds)]
+
+    work = trials * len(members) * len(difficulties)
+    if workers > 1 and len(sizes) > 1 and work >= parallel_threshold:
+        chunks = list(_get_executor(workers).map(_simulate_chunk, *zip(*arguments)))
+    else:
+        chunks = [_simulate_chunk(*args) for args in arguments]
+
+    member_totals = sum(chunk[0] for chunk in chunks)
+    all_totals = sum(chunk[1] for chunk in chunks)
+    any_totals = sum(chunk[2] for chunk in chunks)
+
+    return {
+        'trials': trials,
+        'seed': seed,
+        'difficulties': list(difficulties),
+        'members': [{
+            'character_id': character_id,
+            'expression': expression,
+            'checks': [_rate(successes, trials) for successes in member_totals[index]]
+        } for index, (character_id, expression) in enumerate(members)],
+        'party': {
+            'all_succeed': [_rate(successes, trials) for successes in all_totals],
+            'any_succeeds': [_rate(successes, trials) for successes in any_totals]
+        }
+    }
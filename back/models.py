@@ -1,40 +1,86 @@
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import Integer, String, ForeignKey, Text, DateTime
+from sqlalchemy.orm import Mapped, mapped_column, relationship, Session
+from sqlalchemy import Integer, String, ForeignKey, Text, DateTime, Index, event, update
 from sqlalchemy.inspection import inspect
+from itertools import chain
 from datetime import datetime, timezone
-from flask_sqlalchemy import SQLAlchemy
+from operator import itemgetter
 
 db = SQLAlchemy()
 
-class Serializer:
-    def to_dict(self, include_relationships=False):
-        result = {}
-        sensitive_fields = {'password', 'password_hash'}
+SENSITIVE_FIELDS = frozenset({'password', 'password_hash'})
+
+# Las estadísticas viven en columnas del personaje; la API las sigue mostrando como lista
+STAT_COLUMNS = {'FUE': 'stat_fue', 'AGI': 'stat_agi', 'MEN': 'stat_men', 'CAR': 'stat_car'}
+
+class SerializationPlan:
+    __slots__ = ('columns', 'column_keys', 'fetch_columns', 'relationships', 'computed')
+
+    def __init__(self, model):
+        mapper = inspect(model)
+        hidden = SENSITIVE_FIELDS | set(getattr(model, '__serializer_hidden__', ()))
+        self.columns = tuple(
+            column_attribute.key for column_attribute in mapper.column_attrs
+            if column_attribute.key not in hidden
+        )
+        self.column_keys = frozenset(self.columns)
+        getter = itemgetter(*self.columns)
+        self.fetch_columns = getter if len(self.columns) > 1 else (lambda state: (getter(state),))
+        self.relationships = tuple(
+            (relationship_property.key, relationship_property.uselist)
+            for relationship_property in mapper.relationships
+        )
+        # Propiedades que se serializan como si fueran relaciones (p. ej. Character.stats)
+        self.computed = tuple(getattr(model, '__serializer_computed__', ()))
+
+_serialization_plans = {}
+
+def serialization_plan(model):
+    # Se calcula una sola vez por modelo; inspect() y el filtrado de columnas no se repiten por instancia
+    plan = _serialization_plans.get(model)
+    if plan is None:
+        plan = _serialization_plans[model] = SerializationPlan(model)
+    return plan
 
-        for column_attribute in inspect(self).mapper.column_attrs:
-            column_name = column_attribute.key
-            if column_name in sensitive_fields:
-                continue
-            column_value = getattr(self, column_name)
-            result[column_name] = column_value
+class Serializer:
+    def to_dict(self, include_relationships=False, fields=None):
+        plan = serialization_plan(type(self))
+        if fields is not None:
+            # Subconjunto pedido por el cliente: solo se tocan esas columnas para no cargar las diferidas
+            result = {name: getattr(self, name) for name in plan.columns if name in fields}
+        else:
+            state = self.__dict__
+            if plan.column_keys <= state.keys():
+                result = dict(zip(plan.columns, plan.fetch_columns(state)))
+            else:
+                # Columnas expiradas o diferidas (se cargan por el camino normal del ORM) o instancias
+                # transitorias, cuyas columnas sin asignar no llegan a estar en __dict__
+                result = {name: getattr(self, name) for name in plan.columns}
 
         if include_relationships:
-            for relationship_property in inspect(self.__class__).relationships:
-                relation_name = relationship_property.key
+            for relation_name, uselist in plan.relationships:
+                if include_relationships is not True and relation_name not in include_relationships:
+                    continue
                 relation_value = getattr(self, relation_name)
 
-                if isinstance(relation_value, list):
+                if uselist:
                     result[relation_name] = [
                         item.to_dict() for item in relation_value
                     ]
                 elif relation_value is not None:
                     result[relation_name] = relation_value.to_dict()
 
+            for computed_name in plan.computed:
+                if include_relationships is True or computed_name in include_relationships:
+                    result[computed_name] = getattr(self, computed_name)
+
         return result
 
 class Character(db.Model, Serializer):
     __tablename__ = "characters"
+    __table_args__ = (
+        Index("ix_characters_user_id_id", "user_id", "id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=True)
@@ -50,8 +96,16 @@ class Character(db.Model, Serializer):
     health_max: Mapped[int] = mapped_column(default=6)
     mana_current: Mapped[int] = mapped_column(default=3)
     mana_max: Mapped[int] = mapped_column(default=3)
+    version: Mapped[int] = mapped_column(default=1, server_default="1")
+
+    stat_fue: Mapped[int] = mapped_column(default=0, server_default="0")
+    stat_agi: Mapped[int] = mapped_column(default=0, server_default="0")
+    stat_men: Mapped[int] = mapped_column(default=0, server_default="0")
+    stat_car: Mapped[int] = mapped_column(default=0, server_default="0")
+
+    __serializer_hidden__ = tuple(STAT_COLUMNS.values())
+    __serializer_computed__ = ('stats',)
 
-    stats = relationship("Stat", back_populates="character", cascade="all, delete-orphan")
     abilities = relationship("Ability", back_populates="character", cascade="all, delete-orphan")
     spells = relationship("Spell", back_populates="character", cascade="all, delete-orphan")
     inventory_items = relationship("InventoryItem", back_populates="character", cascade="all, delete-orphan")
@@ -61,21 +115,26 @@ class Character(db.Model, Serializer):
     decisions = relationship("Decision", back_populates="character", cascade="all, delete-orphan")
     conditions = relationship("Condition", back_populates="character", cascade="all, delete-orphan")
 
-class Stat(db.Model, Serializer):
-    __tablename__ = "stats"
+    @property
+    def stat_map(self):
+        return {name: getattr(self, column) for name, column in STAT_COLUMNS.items()}
 
-    id: Mapped[int] = mapped_column(primary_key=True)
-    character_id: Mapped[int] = mapped_column(ForeignKey("characters.id"))
-    name: Mapped[str] = mapped_column(String(16))
-    value: Mapped[int] = mapped_column(Integer)
+    @property
+    def stats(self):
+        # Misma forma que las antiguas filas de la tabla stats. El id es sintético pero estable: las
+        # cuatro estadísticas de cada personaje ocupan posiciones consecutivas, como al crearlas en orden
+        base = None if self.id is None else (self.id - 1) * len(STAT_COLUMNS)
+        return [
+            {'id': None if base is None else base + position, 'character_id': self.id, 'name': name, 'value': value}
+            for position, (name, value) in enumerate(self.stat_map.items(), 1)
+        ]
 
-    character = relationship("Character", back_populates="stats")
-    
 class InventoryItem(db.Model, Serializer):
     __tablename__ = "inventory_items"
+    __version_owners__ = ('character_id',)
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    character_id: Mapped[int] = mapped_column(ForeignKey("characters.id"))
+    character_id: Mapped[int] = mapped_column(ForeignKey("characters.id"), index=True)
     item: Mapped[str]
     description: Mapped[str]
     image_url: Mapped[str] = mapped_column(String(255), nullable=True)
@@ -86,9 +145,10 @@ class InventoryItem(db.Model, Serializer):
 
 class Ability(db.Model, Serializer):
     __tablename__ = "abilities"
+    __version_owners__ = ('character_id',)
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    character_id: Mapped[int] = mapped_column(ForeignKey("characters.id"))
+    character_id: Mapped[int] = mapped_column(ForeignKey("characters.id"), index=True)
     name: Mapped[str]
     description: Mapped[str]
     image_url: Mapped[str] = mapped_column(String(255), nullable=True)
@@ -99,9 +159,10 @@ class Ability(db.Model, Serializer):
 
 class Spell(db.Model, Serializer):
     __tablename__ = "spells"
+    __version_owners__ = ('character_id',)
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    character_id: Mapped[int] = mapped_column(ForeignKey("characters.id"))
+    character_id: Mapped[int] = mapped_column(ForeignKey("characters.id"), index=True)
     name: Mapped[str]
     type: Mapped[str]
     description: Mapped[str]
@@ -113,6 +174,10 @@ class Spell(db.Model, Serializer):
 
 class JournalEntry(db.Model, Serializer):
     __tablename__ = "journal_entries"
+    __version_owners__ = ('character_id',)
+    __table_args__ = (
+        Index("ix_journal_entries_character_id_created_at", "character_id", "created_at"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     character_id: Mapped[int] = mapped_column(ForeignKey("characters.id"))
@@ -123,9 +188,10 @@ class JournalEntry(db.Model, Serializer):
 
 class Decision(db.Model, Serializer):
     __tablename__ = "decisions"
+    __version_owners__ = ('character_id',)
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    character_id: Mapped[int] = mapped_column(ForeignKey("characters.id"))
+    character_id: Mapped[int] = mapped_column(ForeignKey("characters.id"), index=True)
     description: Mapped[str] = mapped_column(Text)
     impact: Mapped[str] = mapped_column(Text, nullable=True)
 
@@ -133,9 +199,10 @@ class Decision(db.Model, Serializer):
 
 class Condition(db.Model, Serializer):
     __tablename__ = "conditions"
+    __version_owners__ = ('character_id',)
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    character_id: Mapped[int] = mapped_column(ForeignKey("characters.id"))
+    character_id: Mapped[int] = mapped_column(ForeignKey("characters.id"), index=True)
     name: Mapped[str]
     description: Mapped[str]
     temporary: Mapped[bool] = mapped_column(default=True)
@@ -144,10 +211,11 @@ class Condition(db.Model, Serializer):
 
 class CharacterRelationship(db.Model, Serializer):
     __tablename__ = "character_relationships"
+    __version_owners__ = ('source_id', 'target_id')
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    source_id: Mapped[int] = mapped_column(ForeignKey("characters.id"))
-    target_id: Mapped[int] = mapped_column(ForeignKey("characters.id"))
+    source_id: Mapped[int] = mapped_column(ForeignKey("characters.id"), index=True)
+    target_id: Mapped[int] = mapped_column(ForeignKey("characters.id"), index=True)
     relation_type: Mapped[str] = mapped_column(String(64))
 
     source = relationship("Character", foreign_keys=[source_id], backref="relationships_out")
@@ -163,3 +231,79 @@ class User(db.Model, Serializer):
     created_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc))
 
     characters = relationship("Character", back_populates="user", cascade="all, delete-orphan")
+
+class RevokedToken(db.Model, Serializer):
+    __tablename__ = "revoked_tokens"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    jti: Mapped[str] = mapped_column(String(36), unique=True, nullable=False)
+    token_type: Mapped[str] = mapped_column(String(16), nullable=False)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=True)
+    expires_at: Mapped[int] = mapped_column(Integer, index=True)  # exp del JWT (epoch, segundos)
+
+class ImportJob(db.Model, Serializer):
+    __tablename__ = "import_jobs"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), index=True)
+    source: Mapped[str] = mapped_column(String(255), nullable=True)
+    status: Mapped[str] = mapped_column(String(16), default='running')  # running | failed | completed
+    records_committed: Mapped[int] = mapped_column(default=0)  # posición de reanudación en la entrada
+    chunks_committed: Mapped[int] = mapped_column(default=0)
+    characters: Mapped[int] = mapped_column(default=0)
+    children: Mapped[int] = mapped_column(default=0)
+    relationships: Mapped[int] = mapped_column(default=0)
+    skipped: Mapped[int] = mapped_column(default=0)
+    error: Mapped[str] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc))
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+class ImportIdMap(db.Model):
+    # Id del personaje en el archivo -> id asignado al importarlo; se conserva mientras la importación
+    # pueda reanudarse. Sin clave foránea en new_id para no impedir borrar el personaje entretanto
+    __tablename__ = "import_id_map"
+
+    job_id: Mapped[int] = mapped_column(ForeignKey("import_jobs.id"), primary_key=True)
+    old_id: Mapped[int] = mapped_column(primary_key=True)
+    new_id: Mapped[int]
+
+
+def bump_character_versions(session, character_ids):
+    # Para escrituras que no pasan por el flush del ORM (UPDATE/DELETE/INSERT masivos)
+    bumped = session.info.setdefault('bumped_character_ids', set())
+    character_ids = {character_id for character_id in character_ids if character_id is not None} - bumped
+    if not character_ids:
+        return
+    characters = Character.__table__
+    session.execute(
+        update(characters)
+        .where(characters.c.id.in_(character_ids))
+        .values(version=characters.c.version + 1)
+    )
+    bumped.update(character_ids)
+
+def _owner_ids(instance):
+    state = inspect(instance)
+    for key in instance.__version_owners__:
+        history = state.attrs[key].history
+        yield from chain(history.unchanged or (), history.added or (), history.deleted or ())
+
+@event.listens_for(Session, 'before_flush')
+def _bump_versions_on_flush(session, flush_context, instances):
+    # Cualquier cambio en el personaje o en sus hijos invalida la versión (y el ETag) de la ficha
+    bumped = session.info.setdefault('bumped_character_ids', set())
+    owner_ids = set()
+    for instance in chain(session.new, session.dirty, session.deleted):
+        if isinstance(instance, Character):
+            if (instance in session.dirty and instance.id not in bumped
+                    and session.is_modified(instance, include_collections=False)):
+                instance.version = Character.version + 1
+                bumped.add(instance.id)
+        elif hasattr(instance, '__version_owners__'):
+            owner_ids.update(_owner_ids(instance))
+    bump_character_versions(session, owner_ids)
+
+@event.listens_for(Session, 'after_commit')
+@event.listens_for(Session, 'after_rollback')
+def _reset_bumped_versions(session):
+    session.info.pop('bumped_character_ids', None)
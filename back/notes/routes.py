@@ -1,8 +1,11 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from back.models import db, Character, JournalEntry, Decision
-from back.utils import validate_required_fields
+from back.models import db, JournalEntry, Decision
+from back.utils import validate_required_fields, owned_character_id, get_owned, encode_cursor, decode_cursor, parse_page_args
+from back.notes.search import SEARCH_INDEXES, match_expression, search, rebuild_indexes
+from sqlalchemy import tuple_
 from datetime import datetime, timezone
+import click
 
 notes = Blueprint("notes", __name__)
 
@@ -12,14 +15,39 @@ notes = Blueprint("notes", __name__)
 @jwt_required()
 def get_journal(character_id):
     user_id = get_jwt_identity()
-    character = Character.query.filter_by(id=character_id, user_id=user_id).first()
-    if not character:
+    character_id = owned_character_id(user_id, character_id)
+    if not character_id:
         return jsonify({'error': 'Personaje no encontrado'}), 404
 
-    entries = JournalEntry.query.filter_by(character_id=character.id).order_by(JournalEntry.created_at.desc()).all()
+    limit, after, error = parse_page_args(request.args)
+    if error:
+        return jsonify({'error': error}), 400
+
+    query = JournalEntry.query.filter_by(character_id=character_id)
+    if after is not None:
+        cursor = decode_cursor(after, 2)
+        try:
+            created_at, entry_id = datetime.fromisoformat(cursor[0]), int(cursor[1])
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Cursor inválido'}), 400
+        query = query.filter(tuple_(JournalEntry.created_at, JournalEntry.id) < tuple_(created_at, entry_id))
+    query = query.order_by(JournalEntry.created_at.desc(), JournalEntry.id.desc())
+
+    if limit is None:
+        return jsonify({
+            'message': 'Entradas de diario obtenidas correctamente',
+            'entries': [e.to_dict() for e in query.all()]
+        }), 200
+
+    entries = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(entries) > limit:
+        entries = entries[:limit]
+        next_cursor = encode_cursor(entries[-1].created_at.isoformat(), entries[-1].id)
     return jsonify({
         'message': 'Entradas de diario obtenidas correctamente',
-        'entries': [e.to_dict() for e in entries]
+        'entries': [e.to_dict() for e in entries],
+        'next_cursor': next_cursor
     }), 200
 
 @notes.route('/journal', methods=['POST'])
@@ -31,12 +59,12 @@ def create_journal_entry():
     if not valid:
         return jsonify({'error': error}), 400
 
-    character = Character.query.filter_by(id=data['character_id'], user_id=user_id).first()
-    if not character:
+    character_id = owned_character_id(user_id, data['character_id'])
+    if not character_id:
         return jsonify({'error': 'Personaje no encontrado'}), 404
 
     entry = JournalEntry(
-        character_id=character.id,
+        character_id=character_id,
         content=data['content'],
         created_at=datetime.now(timezone.utc)
     )
@@ -49,13 +77,9 @@ def create_journal_entry():
 @jwt_required()
 def delete_journal_entry(entry_id):
     user_id = get_jwt_identity()
-    entry = JournalEntry.query.get(entry_id)
-    if not entry:
-        return jsonify({'error': 'Entrada no encontrada'}), 404
-
-    character = Character.query.filter_by(id=entry.character_id, user_id=user_id).first()
-    if not character:
-        return jsonify({'error': 'No autorizado'}), 403
+    entry, error = get_owned(JournalEntry, entry_id, user_id, 'Entrada no encontrada')
+    if error:
+        return error
 
     db.session.delete(entry)
     db.session.commit()
@@ -67,14 +91,39 @@ def delete_journal_entry(entry_id):
 @jwt_required()
 def get_decisions(character_id):
     user_id = get_jwt_identity()
-    character = Character.query.filter_by(id=character_id, user_id=user_id).first()
-    if not character:
+    character_id = owned_character_id(user_id, character_id)
+    if not character_id:
         return jsonify({'error': 'Personaje no encontrado'}), 404
 
-    decisions = Decision.query.filter_by(character_id=character.id).order_by(Decision.id.desc()).all()
+    limit, after, error = parse_page_args(request.args)
+    if error:
+        return jsonify({'error': error}), 400
+
+    query = Decision.query.filter_by(character_id=character_id)
+    if after is not None:
+        cursor = decode_cursor(after, 1)
+        try:
+            decision_id = int(cursor[0])
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Cursor inválido'}), 400
+        query = query.filter(Decision.id < decision_id)
+    query = query.order_by(Decision.id.desc())
+
+    if limit is None:
+        return jsonify({
+            'message': 'Decisiones obtenidas correctamente',
+            'decisions': [d.to_dict() for d in query.all()]
+        }), 200
+
+    decisions = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(decisions) > limit:
+        decisions = decisions[:limit]
+        next_cursor = encode_cursor(decisions[-1].id)
     return jsonify({
         'message': 'Decisiones obtenidas correctamente',
-        'decisions': [d.to_dict() for d in decisions]
+        'decisions': [d.to_dict() for d in decisions],
+        'next_cursor': next_cursor
     }), 200
 
 @notes.route('/decision', methods=['POST'])
@@ -86,12 +135,12 @@ def create_decision():
     if not valid:
         return jsonify({'error': error}), 400
 
-    character = Character.query.filter_by(id=data['character_id'], user_id=user_id).first()
-    if not character:
+    character_id = owned_character_id(user_id, data['character_id'])
+    if not character_id:
         return jsonify({'error': 'Personaje no encontrado'}), 404
 
     decision = Decision(
-        character_id=character.id,
+        character_id=character_id,
         description=data['description'],
         impact=data.get('impact')
     )
@@ -104,14 +153,47 @@ def create_decision():
 @jwt_required()
 def delete_decision(decision_id):
     user_id = get_jwt_identity()
-    decision = Decision.query.get(decision_id)
-    if not decision:
-        return jsonify({'error': 'Decisión no encontrada'}), 404
-
-    character = Character.query.filter_by(id=decision.character_id, user_id=user_id).first()
-    if not character:
-        return jsonify({'error': 'No autorizado'}), 403
+    decision, error = get_owned(Decision, decision_id, user_id, 'Decisión no encontrada')
+    if error:
+        return error
 
     db.session.delete(decision)
     db.session.commit()
     return jsonify({'message': 'Decisión eliminada', 'decision_id': decision_id}), 200
+
+# --- Search Endpoints ---
+
+@notes.route('/search', methods=['GET'])
+@jwt_required()
+# Ejemplo de llamada: [GET] /api/search?q=herrero&type=journal&character_id=1&limit=10
+def search_notes():
+    user_id = get_jwt_identity()
+    match = match_expression(request.args.get('q', ''))
+    if not match:
+        return jsonify({'error': 'Parámetro q requerido'}), 400
+
+    kind = request.args.get('type', 'all')
+    if kind != 'all' and kind not in SEARCH_INDEXES:
+        return jsonify({'error': f"Tipo no válido: {kind}"}), 400
+    kinds = list(SEARCH_INDEXES) if kind == 'all' else [kind]
+
+    limit = request.args.get('limit', current_app.config['SEARCH_LIMIT_DEFAULT'], type=int)
+    if not limit or not 1 <= limit <= current_app.config['PAGE_SIZE_MAX']:
+        return jsonify({'error': f"limit debe estar entre 1 y {current_app.config['PAGE_SIZE_MAX']}"}), 400
+
+    character_id = None
+    if 'character_id' in request.args:
+        character_id = owned_character_id(user_id, request.args['character_id'])
+        if not character_id:
+            return jsonify({'error': 'Personaje no encontrado'}), 404
+
+    return jsonify({
+        'message': 'Búsqueda realizada',
+        'results': search(int(user_id), match, kinds, limit, character_id)
+    }), 200
+
+@notes.cli.command('rebuild-search')
+def rebuild_search_command():
+    """Reconstruye los índices de búsqueda del diario y las decisiones."""
+    for kind, count in rebuild_indexes().items():
+        click.echo(f'{kind}: {count} filas indexadas')
@@ -0,0 +1,117 @@
+import html
+import re
+from datetime import datetime
+from sqlalchemy import DDL, event, text
+from back.models import db, JournalEntry, Decision
+
+# Índices FTS5 de contenido externo: el texto vive en journal_entries/decisions y aquí solo el índice
+# invertido. Los triggers lo mantienen al día con cualquier escritura, también las masivas
+SEARCH_INDEXES = {
+    'journal': {
+        'table': 'journal_entries',
+        'fts': 'journal_fts',
+        'columns': ('content',),
+    },
+    'decisions': {
+        'table': 'decisions',
+        'fts': 'decisions_fts',
+        'columns': ('description', 'impact'),
+    },
+}
+
+def _ddl(table, fts, columns):
+    column_list = ', '.join(columns)
+    new_values = ', '.join(f'new.{column}' for column in columns)
+    old_values = ', '.join(f'old.{column}' for column in columns)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({column_list}, content='{table}', "
+        f"content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {column_list}) VALUES (new.id, {new_values}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {column_list}) VALUES ('delete', old.id, {old_values}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {column_list}) VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO {fts}(rowid, {column_list}) VALUES (new.id, {new_values}); END",
+    ]
+
+# db.create_all() (tests, instalaciones nuevas) crea los índices junto a sus tablas; las bases
+# existentes los reciben con la migración correspondiente
+for _model, _index in ((JournalEntry, SEARCH_INDEXES['journal']), (Decision, SEARCH_INDEXES['decisions'])):
+    for _statement in _ddl(_index['table'], _index['fts'], _index['columns']):
+        event.listen(_model.__table__, 'after_create', DDL(_statement).execute_if(dialect='sqlite'))
+    event.listen(_model.__table__, 'before_drop',
+                 DDL(f"DROP TABLE IF EXISTS {_index['fts']}").execute_if(dialect='sqlite'))
+
+_WORD = re.compile(r'\w+', re.UNICODE)
+
+def match_expression(query):
+    # Cada palabra se busca como prefijo y entre comillas, así el texto del usuario nunca es sintaxis FTS5
+    words = _WORD.findall(query)
+    return ' '.join(f'"{word}"*' for word in words) or None
+
+# MATCH recorre el índice y cada coincidencia se filtra contra la lista de personajes del usuario, que
+# SQLite resuelve una sola vez (LIST SUBQUERY) en lugar de cruzar characters fila a fila. Acotar antes las
+# filas (rowid IN ...) es mucho peor: FTS5 repite la búsqueda, expansión de prefijos incluida, por cada fila
+_SEARCH_SQL = {
+    'journal': """
+        SELECT j.id, j.character_id, j.created_at,
+               snippet(journal_fts, -1, :open, :close, '…', :tokens) AS snippet,
+               bm25(journal_fts) AS score
+        FROM journal_fts
+        JOIN journal_entries j ON j.id = journal_fts.rowid
+        WHERE journal_fts MATCH :match AND j.character_id IN (
+            SELECT id FROM characters WHERE user_id = :user_id {character_filter}
+        )
+        ORDER BY score
+        LIMIT :limit
+    """,
+    'decisions': """
+        SELECT d.id, d.character_id, NULL AS created_at,
+               snippet(decisions_fts, -1, :open, :close, '…', :tokens) AS snippet,
+               bm25(decisions_fts) AS score
+        FROM decisions_fts
+        JOIN decisions d ON d.id = decisions_fts.rowid
+        WHERE decisions_fts MATCH :match AND d.character_id IN (
+            SELECT id FROM characters WHERE user_id = :user_id {character_filter}
+        )
+        ORDER BY score
+        LIMIT :limit
+    """,
+}
+
+# snippet() marca las coincidencias con caracteres de uso privado; el texto se escapa como HTML y solo
+# después se convierten en <mark>, así el contenido del usuario nunca llega al cliente como marcado
+_OPEN, _CLOSE = '\ue000', '\ue001'
+
+def highlight(snippet):
+    return html.escape(snippet).replace(_OPEN, '<mark>').replace(_CLOSE, '</mark>')
+
+def search(user_id, match, kinds, limit, character_id=None, snippet_tokens=12):
+    # bm25 devuelve valores negativos: cuanto menor, más relevante
+    params = {'match': match, 'user_id': user_id, 'limit': limit, 'tokens': snippet_tokens,
+              'open': _OPEN, 'close': _CLOSE}
+    character_filter = ''
+    if character_id is not None:
+        character_filter = 'AND id = :character_id'
+        params['character_id'] = character_id
+
+    results = []
+    for kind in kinds:
+        sql = _SEARCH_SQL[kind].format(character_filter=character_filter)
+        for row in db.session.execute(text(sql), params):
+            result = {'type': kind, 'id': row.id, 'character_id': row.character_id,
+                      'snippet': highlight(row.snippet), 'score': -row.score}
+            if row.created_at is not None:
+                result['created_at'] = datetime.fromisoformat(row.created_at)
+            results.append(result)
+    results.sort(key=lambda result: result['score'], reverse=True)
+    return results[:limit]
+
+def rebuild_indexes():
+    counts = {}
+    for kind, index in SEARCH_INDEXES.items():
+        db.session.execute(text(f"INSERT INTO {index['fts']}({index['fts']}) VALUES ('rebuild')"))
+        counts[kind] = db.session.execute(text(f"SELECT count(*) FROM {index['table']}")).scalar()
+    db.session.commit()
+    return counts
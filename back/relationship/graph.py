@@ -0,0 +1,235 @@
+from collections import deque
+from flask import current_app
+from sqlalchemy import select, text, bindparam, func
+from sqlalchemy.orm import aliased
+from back.models import db, Character, CharacterRelationship
+from back.cache import graph_cache
+
+DIRECTIONS = ('out', 'in', 'both')
+
+_target = aliased(Character)
+
+# --- Consultas recursivas (CTE) ---
+# El grafo de un usuario son las relaciones entre sus personajes: las aristas antiguas hacia personajes
+# ajenos no se recorren, así un camino o un vecindario nunca llega a datos de otro usuario
+
+def _edges_cte(direction, types):
+    base = ("SELECT r.id AS edge_id, r.source_id AS a, r.target_id AS b FROM character_relationships r "
+            "JOIN characters c ON c.id = r.source_id JOIN characters t ON t.id = r.target_id "
+            "WHERE c.user_id = :user_id AND t.user_id = :user_id")
+    if types:
+        base += " AND r.relation_type IN :types"
+    reverse = base.replace("r.source_id AS a, r.target_id AS b", "r.target_id AS a, r.source_id AS b")
+    if direction == 'out':
+        return base
+    if direction == 'in':
+        return reverse
+    return f"{base} UNION ALL {reverse}"
+
+def _execute(sql, params, types):
+    statement = text(sql)
+    if types:
+        statement = statement.bindparams(bindparam('types', expanding=True))
+        params = {**params, 'types': list(types)}
+    return db.session.execute(statement, params)
+
+def _sql_edges_between(user_id, nodes, types):
+    query = (
+        select(CharacterRelationship.id, CharacterRelationship.source_id, CharacterRelationship.target_id,
+               CharacterRelationship.relation_type)
+        .join(Character, Character.id == CharacterRelationship.source_id)
+        .join(_target, _target.id == CharacterRelationship.target_id)
+        .where(Character.user_id == user_id, _target.user_id == user_id,
+               CharacterRelationship.source_id.in_(nodes), CharacterRelationship.target_id.in_(nodes))
+        .order_by(CharacterRelationship.id)
+    )
+    if types:
+        query = query.where(CharacterRelationship.relation_type.in_(types))
+    return [tuple(row) for row in db.session.execute(query)]
+
+def sql_neighborhood(user_id, start, depth, direction='both', types=None):
+    sql = f"""
+        WITH RECURSIVE edges(edge_id, a, b) AS ({_edges_cte(direction, types)}),
+        walk(node, depth) AS (
+            SELECT :start, 0
+            UNION
+            SELECT e.b, w.depth + 1 FROM walk w JOIN edges e ON e.a = w.node WHERE w.depth < :depth
+        )
+        SELECT node, MIN(depth) AS distance FROM walk GROUP BY node
+    """
+    distances = {row.node: row.distance for row in _execute(sql, {'user_id': user_id, 'start': start, 'depth': depth}, types)}
+    return distances, _sql_edges_between(user_id, list(distances), types)
+
+def sql_shortest_path(user_id, start, goal, max_depth, direction='both', types=None):
+    # La cola de la CTE se ordena por profundidad (BFS) y LIMIT 1 corta en cuanto aparece el destino.
+    # Antes se comprueba que sea alcanzable para no enumerar caminos cuando no existe ninguno
+    distances, _ = sql_neighborhood(user_id, start, max_depth, direction, types)
+    if goal not in distances:
+        return None
+    sql = f"""
+        WITH RECURSIVE edges(edge_id, a, b) AS ({_edges_cte(direction, types)}),
+        walk(node, depth, nodes, edge_ids) AS (
+            SELECT :start, 0, ',' || :start || ',', ','
+            UNION ALL
+            SELECT e.b, w.depth + 1, w.nodes || e.b || ',', w.edge_ids || e.edge_id || ','
+            FROM walk w JOIN edges e ON e.a = w.node
+            WHERE w.depth < :depth AND instr(w.nodes, ',' || e.b || ',') = 0
+            ORDER BY 2
+        )
+        SELECT nodes, edge_ids FROM walk WHERE node = :goal LIMIT 1
+    """
+    row = _execute(sql, {'user_id': user_id, 'start': start, 'goal': goal, 'depth': distances[goal]}, types).first()
+    nodes = [int(node) for node in row.nodes.strip(',').split(',')]
+    edge_ids = [int(edge_id) for edge_id in row.edge_ids.strip(',').split(',') if edge_id]
+    edges = {edge[0]: edge for edge in _sql_edges_between(user_id, nodes, types)}
+    return nodes, [edges[edge_id] for edge_id in edge_ids]
+
+def sql_components(user_id, types=None):
+    sql = f"""
+        WITH RECURSIVE edges(edge_id, a, b) AS ({_edges_cte('both', types)}),
+        nodes(node) AS (SELECT a FROM edges UNION SELECT b FROM edges),
+        reach(root, node) AS (
+            SELECT node, node FROM nodes
+            UNION
+            SELECT r.root, e.b FROM reach r JOIN edges e ON e.a = r.node
+        )
+        SELECT node, MIN(root) AS component FROM reach GROUP BY node
+    """
+    components = {}
+    for row in _execute(sql, {'user_id': user_id}, types):
+        components.setdefault(row.component, []).append(row.node)
+    return _sorted_components(components.values())
+
+def _sorted_components(components):
+    return sorted((sorted(component) for component in components), key=lambda component: (-len(component), component[0]))
+
+# --- Índice de adyacencia en memoria ---
+
+class GraphIndex:
+    # Listas de adyacencia de un usuario; las consultas son BFS y union-find en Python, sin SQL
+    def __init__(self, owned, edges):
+        self.fingerprint = None
+        self.owned = frozenset(owned)
+        self.edges = {edge[0]: edge for edge in edges}
+        self.outgoing, self.incoming = {}, {}
+        for edge_id, source_id, target_id, relation_type in edges:
+            self.outgoing.setdefault(source_id, []).append((target_id, edge_id, relation_type))
+            self.incoming.setdefault(target_id, []).append((source_id, edge_id, relation_type))
+
+    @classmethod
+    def load(cls, user_id):
+        owned = db.session.execute(select(Character.id).where(Character.user_id == user_id)).scalars().all()
+        edges = db.session.execute(
+            select(CharacterRelationship.id, CharacterRelationship.source_id, CharacterRelationship.target_id,
+                   CharacterRelationship.relation_type)
+            .join(Character, Character.id == CharacterRelationship.source_id)
+            .join(_target, _target.id == CharacterRelationship.target_id)
+            .where(Character.user_id == user_id, _target.user_id == user_id)
+            .order_by(CharacterRelationship.id)
+        ).all()
+        return cls(owned, [tuple(edge) for edge in edges])
+
+    def _neighbors(self, node, direction, types):
+        lists = (self.outgoing, self.incoming) if direction == 'both' else \
+            ((self.outgoing,) if direction == 'out' else (self.incoming,))
+        for adjacency in lists:
+            for neighbor, edge_id, relation_type in adjacency.get(node, ()):
+                if not types or relation_type in types:
+                    yield neighbor, edge_id
+
+    def _bfs(self, start, depth, direction, types, goal=None):
+        distances, parents = {start: 0}, {}
+        queue = deque([start])
+        while queue:
+            node = queue.popleft()
+            if node == goal or distances[node] >= depth:
+                continue
+            for neighbor, edge_id in self._neighbors(node, direction, types):
+                if neighbor not in distances:
+                    distances[neighbor] = distances[node] + 1
+                    parents[neighbor] = (node, edge_id)
+                    queue.append(neighbor)
+        return distances, parents
+
+    def _edges_between(self, nodes, types):
+        edge_ids = sorted(
+            edge_id for node in nodes for target_id, edge_id, relation_type in self.outgoing.get(node, ())
+            if target_id in nodes and (not types or relation_type in types)
+        )
+        return [self.edges[edge_id] for edge_id in edge_ids]
+
+    def neighborhood(self, start, depth, direction='both', types=None):
+        distances, _ = self._bfs(start, depth, direction, types)
+        return distances, self._edges_between(distances, types)
+
+    def shortest_path(self, start, goal, max_depth, direction='both', types=None):
+        distances, parents = self._bfs(start, max_depth, direction, types, goal)
+        if goal not in distances:
+            return None
+        nodes, edges = [goal], []
+        while nodes[-1] != start:
+            parent, edge_id = parents[nodes[-1]]
+            nodes.append(parent)
+            edges.append(self.edges[edge_id])
+        return nodes[::-1], edges[::-1]
+
+    def components(self, types=None):
+        parent = {}
+        def find(node):
+            parent.setdefault(node, node)
+            while parent[node] != node:
+                parent[node] = parent[parent[node]]
+                node = parent[node]
+            return node
+        for _, source_id, target_id, relation_type in self.edges.values():
+            if types and relation_type not in types:
+                continue
+            root_a, root_b = find(source_id), find(target_id)
+            if root_a != root_b:
+                parent[max(root_a, root_b)] = min(root_a, root_b)
+        components = {}
+        for node in parent:
+            components.setdefault(find(node), []).append(node)
+        return _sorted_components(components.values())
+
+def _fingerprint(user_id):
+    # Otro worker puede haber cambiado el grafo sin invalidar esta caché. Crear o borrar personajes cambia
+    # el número o el id máximo, y cualquier escritura de una relación sube la versión de sus dos extremos
+    return tuple(db.session.execute(
+        select(func.count(), func.coalesce(func.max(Character.id), 0), func.coalesce(func.sum(Character.version), 0))
+        .where(Character.user_id == user_id)
+    ).one())
+
+def graph_index(user_id):
+    cache = graph_cache()
+    fingerprint = _fingerprint(user_id)
+    index = cache.get(user_id)
+    if index is None or index.fingerprint != fingerprint:
+        index = GraphIndex.load(user_id)
+        index.fingerprint = fingerprint
+        cache.set(user_id, index)
+    return index
+
+# --- Punto de entrada para las rutas: índice en memoria si está activado, CTE si no ---
+
+def _use_index():
+    return current_app.config['RELATIONSHIP_GRAPH_INDEX']
+
+def neighborhood(user_id, start, depth, direction='both', types=None):
+    if _use_index():
+        return graph_index(user_id).neighborhood(start, depth, direction, types)
+    return sql_neighborhood(user_id, start, depth, direction, types)
+
+def shortest_path(user_id, start, goal, max_depth, direction='both', types=None):
+    if _use_index():
+        return graph_index(user_id).shortest_path(start, goal, max_depth, direction, types)
+    return sql_shortest_path(user_id, start, goal, max_depth, direction, types)
+
+def components(user_id, types=None):
+    if _use_index():
+        return graph_index(user_id).components(types)
+    return sql_components(user_id, types)
+
+def edge_dict(edge):
+    edge_id, source_id, target_id, relation_type = edge
+    return {'id': edge_id, 'source_id': source_id, 'target_id': target_id, 'relation_type': relation_type}
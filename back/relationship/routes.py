@@ -1,7 +1,8 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from back.models import db, Character, CharacterRelationship
-from back.utils import validate_required_fields
+from back.utils import validate_required_fields, owned_character_id, get_owned
+from back.relationship import graph
 
 relationship = Blueprint("relationship", __name__)
 
@@ -9,16 +10,51 @@ relationship = Blueprint("relationship", __name__)
 @jwt_required()
 def get_relationships(character_id):
     user_id = get_jwt_identity()
-    character = Character.query.filter_by(id=character_id, user_id=user_id).first()
-    if not character:
+    character_id = owned_character_id(user_id, character_id)
+    if not character_id:
         return jsonify({'error': 'Personaje no encontrado'}), 404
 
-    relationships = CharacterRelationship.query.filter_by(source_id=character.id).all()
+    types = {name.strip() for name in request.args.get('relation_type', '').split(',') if name.strip()}
+    listing = {'out': [], 'in': []}
+    for row in db.session.execute(_relationships_query(character_id, int(user_id), types)):
+        listing[row.direction].append({
+            'id': row.id,
+            'source_id': row.source_id,
+            'target_id': row.target_id,
+            'relation_type': row.relation_type,
+            'character': None if row.character_id is None else
+                {'id': row.character_id, 'name': row.name, 'race': row.race, 'image_url': row.image_url}
+        })
     return jsonify({
         'message': 'Relaciones obtenidas correctamente',
-        'relationships': [r.to_dict() for r in relationships]
+        'relationships_out': listing['out'],
+        'relationships_in': listing['in']
     }), 200
 
+def _relationships_query(character_id, user_id, types):
+    # Salientes y entrantes en una sola sentencia (UNION ALL), cada rama con el otro extremo ya unido.
+    # El otro extremo solo se une si es del mismo usuario: una saliente antigua hacia un personaje ajeno
+    # se lista sin sus datos y las entrantes desde personajes ajenos no se listan, como en el grafo
+    def branch(direction, own_column, other_column):
+        other = db.aliased(Character)
+        query = (
+            db.select(db.literal(direction).label('direction'), CharacterRelationship.id,
+                      CharacterRelationship.source_id, CharacterRelationship.target_id,
+                      CharacterRelationship.relation_type, other.id.label('character_id'),
+                      other.name, other.race, other.image_url)
+            .join(other, db.and_(other.id == other_column, other.user_id == user_id), isouter=direction == 'out')
+            .where(own_column == character_id)
+        )
+        if types:
+            query = query.where(CharacterRelationship.relation_type.in_(types))
+        return query
+
+    union = db.union_all(
+        branch('out', CharacterRelationship.source_id, CharacterRelationship.target_id),
+        branch('in', CharacterRelationship.target_id, CharacterRelationship.source_id)
+    ).subquery()
+    return db.select(union).order_by(union.c.id)
+
 @relationship.route('/relationship', methods=['POST'])
 @jwt_required()
 def create_relationship():
@@ -29,13 +65,14 @@ def create_relationship():
     if not valid:
         return jsonify({'error': error}), 400
 
-    source = Character.query.filter_by(id=data['source_id'], user_id=user_id).first()
-    if not source:
+    source_id = owned_character_id(user_id, data['source_id'])
+    target_id = owned_character_id(user_id, data['target_id'])
+    if not source_id or not target_id:
         return jsonify({'error': 'Personaje no autorizado'}), 403
 
     relationship = CharacterRelationship(
-        source_id=source.id,
-        target_id=data['target_id'],
+        source_id=source_id,
+        target_id=target_id,
         relation_type=data['relation_type']
     )
     db.session.add(relationship)
@@ -50,13 +87,10 @@ def create_relationship():
 @jwt_required()
 def delete_relationship(relationship_id):
     user_id = get_jwt_identity()
-    relationship = CharacterRelationship.query.get(relationship_id)
-    if not relationship:
-        return jsonify({'error': 'Relación no encontrada'}), 404
-
-    source = Character.query.filter_by(id=relationship.source_id, user_id=user_id).first()
-    if not source:
-        return jsonify({'error': 'No autorizado'}), 403
+    relationship, error = get_owned(CharacterRelationship, relationship_id, user_id, 'Relación no encontrada',
+                                    owner_column=CharacterRelationship.source_id)
+    if error:
+        return error
 
     db.session.delete(relationship)
     db.session.commit()
@@ -64,3 +98,94 @@ def delete_relationship(relationship_id):
         'message': 'Relación eliminada correctamente',
         'relationship_id': relationship_id
     }), 200
+
+# --- Graph Endpoints ---
+# Filtros comunes: direction=out|in|both (por defecto both) y relation_type=aliado,rival
+
+def _graph_args(args):
+    direction = args.get('direction', 'both')
+    if direction not in graph.DIRECTIONS:
+        return None, None, f"Dirección no válida: {direction}"
+    types = {name.strip() for name in args.get('relation_type', '').split(',') if name.strip()}
+    return direction, types or None, None
+
+def _depth_arg(args, name, default):
+    maximum = current_app.config['RELATIONSHIP_GRAPH_MAX_DEPTH']
+    depth = args.get(name, default, type=int)
+    if depth is None or not 1 <= depth <= maximum:
+        return None, f'{name} debe estar entre 1 y {maximum}'
+    return depth, None
+
+def _names(user_id, character_ids):
+    rows = db.session.execute(
+        db.select(Character.id, Character.name).where(Character.id.in_(character_ids), Character.user_id == user_id)
+    )
+    return {row.id: row.name for row in rows}
+
+@relationship.route('/relationship/graph/path', methods=['GET'])
+@jwt_required()
+# Ejemplo de llamada: [GET] /api/relationship/graph/path?from=1&to=7&relation_type=aliado
+def get_relationship_path():
+    user_id = get_jwt_identity()
+    start = owned_character_id(user_id, request.args.get('from'))
+    goal = request.args.get('to', type=int)
+    if not start:
+        return jsonify({'error': 'Personaje no encontrado'}), 404
+    if goal is None:
+        return jsonify({'error': 'Parámetro to requerido'}), 400
+    direction, types, error = _graph_args(request.args)
+    if error:
+        return jsonify({'error': error}), 400
+    max_depth, error = _depth_arg(request.args, 'max_depth', current_app.config['RELATIONSHIP_GRAPH_MAX_DEPTH'])
+    if error:
+        return jsonify({'error': error}), 400
+
+    result = graph.shortest_path(int(user_id), start, goal, max_depth, direction, types)
+    if result is None:
+        return jsonify({'error': 'No hay camino entre los personajes'}), 404
+    nodes, edges = result
+    names = _names(int(user_id), nodes)
+    return jsonify({
+        'message': 'Camino encontrado',
+        'length': len(edges),
+        'path': [{'id': node, 'name': names.get(node)} for node in nodes],
+        'edges': [graph.edge_dict(edge) for edge in edges]
+    }), 200
+
+@relationship.route('/relationship/graph/<int:character_id>/neighborhood', methods=['GET'])
+@jwt_required()
+# Ejemplo de llamada: [GET] /api/relationship/graph/1/neighborhood?depth=2&direction=out&relation_type=aliado
+def get_relationship_neighborhood(character_id):
+    user_id = get_jwt_identity()
+    character_id = owned_character_id(user_id, character_id)
+    if not character_id:
+        return jsonify({'error': 'Personaje no encontrado'}), 404
+    direction, types, error = _graph_args(request.args)
+    if error:
+        return jsonify({'error': error}), 400
+    depth, error = _depth_arg(request.args, 'depth', 2)
+    if error:
+        return jsonify({'error': error}), 400
+
+    distances, edges = graph.neighborhood(int(user_id), character_id, depth, direction, types)
+    names = _names(int(user_id), list(distances))
+    return jsonify({
+        'message': 'Vecindario obtenido correctamente',
+        'nodes': [{'id': node, 'name': names.get(node), 'distance': distance}
+                  for node, distance in sorted(distances.items(), key=lambda item: (item[1], item[0]))],
+        'edges': [graph.edge_dict(edge) for edge in edges]
+    }), 200
+
+@relationship.route('/relationship/graph/components', methods=['GET'])
+@jwt_required()
+def get_relationship_components():
+    user_id = get_jwt_identity()
+    _, types, error = _graph_args(request.args)
+    if error:
+        return jsonify({'error': error}), 400
+
+    return jsonify({
+        'message': 'Componentes obtenidos correctamente',
+        'components': [{'size': len(component), 'character_ids': component}
+                       for component in graph.components(int(user_id), types)]
+    }), 200
@@ -1,6 +1,6 @@
 from flask import Blueprint, jsonify, request, current_app
 from flask_jwt_extended import create_access_token, decode_token, jwt_required, get_jwt_identity, get_jwt
-from .models import Character, Stat, InventoryItem, Ability, Spell, Condition, JournalEntry, Decision, CharacterRelationship, User, db
+from .models import Character, STAT_COLUMNS, InventoryItem, Ability, Spell, Condition, JournalEntry, Decision, CharacterRelationship, User, db
 from datetime import datetime, timezone
 import bcrypt
 import random
@@ -37,20 +37,20 @@ def roll_handler():
         return jsonify(response), 404
 
     stat_name = stat_name.upper()
-    stat = next((s for s in character.stats if s.name == stat_name), None)
-    if not stat:
+    modifier = character.stat_map.get(stat_name)
+    if modifier is None:
         response['error'] = f'Estadística \"{stat_name}\" no encontrada en el personaje'
         return jsonify(response), 400
 
     roll = random.randint(1, 20)
-    total = roll + stat.value
+    total = roll + modifier
     success = total >= difficulty
 
     response['message'] = 'Tirada realizada'
     response['result'] = {
         'stat': stat_name,
         'base_roll': roll,
-        'modifier': stat.value,
+        'modifier': modifier,
         'total': total,
         'difficulty': difficulty,
         'success': success
@@ -183,13 +183,9 @@ def character_handler():
             mana_current=data.get('mana_current', 3 + mente),
             mana_max=data.get('mana_max', 3 + mente),
             image_url=data.get('image_url'),
+            **{STAT_COLUMNS[stat_name]: value for stat_name, value in default_stats.items() if stat_name in STAT_COLUMNS}
         )
         db.session.add(character)
-        db.session.flush()
-
-        for stat_name, value in default_stats.items():
-            db.session.add(Stat(name=stat_name, value=value, character_id=character.id))
-
         db.session.commit()
         response['message'] = 'Personaje creado correctamente'
         response['character_id'] = character.id
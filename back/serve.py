@@ -0,0 +1,60 @@
+# Uso: python -m back.serve
+# Sirve create_app() con gunicorn (pre-fork): un proceso maestro que vigila N workers, cada uno con
+# SERVER_THREADS hilos. Señales: HUP recarga los workers de forma ordenada, TERM espera a que terminen
+# las peticiones en curso (SERVER_GRACEFUL_TIMEOUT), TTIN/TTOU añaden o quitan un worker
+from gunicorn.app.base import BaseApplication
+from werkzeug.utils import import_string
+from back import create_app
+from back.config import Config
+from back.models import db
+
+def server_options(config=Config):
+    # Con un almacén de intentos por proceso cada worker llevaría su propia cuenta y el límite de login
+    # se multiplicaría por el número de workers
+    store = import_string(config.LOGIN_THROTTLE_STORE)
+    if config.SERVER_WORKERS > 1 and config.LOGIN_THROTTLE_ENABLED and getattr(store, 'per_process', False):
+        raise RuntimeError(f'SERVER_WORKERS={config.SERVER_WORKERS} necesita un LOGIN_THROTTLE_STORE compartido '
+                           f'entre procesos; {config.LOGIN_THROTTLE_STORE} es de cada worker')
+    return {
+        'bind': config.SERVER_BIND,
+        'workers': config.SERVER_WORKERS,
+        'threads': config.SERVER_THREADS,
+        'worker_class': config.SERVER_WORKER_CLASS,
+        'timeout': config.SERVER_TIMEOUT,
+        'graceful_timeout': config.SERVER_GRACEFUL_TIMEOUT,
+        'keepalive': config.SERVER_KEEPALIVE,
+        'max_requests': config.SERVER_MAX_REQUESTS,
+        'max_requests_jitter': config.SERVER_MAX_REQUESTS_JITTER,
+        'backlog': config.SERVER_BACKLOG,
+        'preload_app': config.SERVER_PRELOAD,
+        'accesslog': config.SERVER_ACCESS_LOG,
+    }
+
+def _post_fork(server, worker):
+    # Con preload la app se crea en el maestro: cada worker abre sus propias conexiones en lugar de
+    # heredar las del proceso padre
+    app = server.app.application
+    if app is not None:
+        with app.app_context():
+            db.engine.dispose(close=False)
+
+class Server(BaseApplication):
+    def __init__(self, options=None):
+        self.options = options or server_options()
+        self.application = None
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            if value is not None:
+                self.cfg.set(key, value)
+        self.cfg.set('post_fork', _post_fork)
+
+    def load(self):
+        # Sin preload se llama en cada worker después del fork: nada de la app se comparte entre procesos
+        if self.application is None:
+            self.application = create_app()
+        return self.application
+
+if __name__ == '__main__':
+    Server().run()
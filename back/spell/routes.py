@@ -1,7 +1,8 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from back.models import db, Character, Spell
-from back.utils import validate_required_fields
+from back.models import db, Character, Spell, bump_character_versions
+from sqlalchemy import update, select, case
+from back.utils import validate_required_fields, owned_character_id, get_owned, parse_batch, owned_batch_character_ids, bulk_insert, claim_if_match
 
 spell = Blueprint("spell", __name__)
 
@@ -9,11 +10,11 @@ spell = Blueprint("spell", __name__)
 @jwt_required()
 def get_spells(character_id):
     user_id = get_jwt_identity()
-    character = Character.query.filter_by(id=character_id, user_id=user_id).first()
-    if not character:
+    character_id = owned_character_id(user_id, character_id)
+    if not character_id:
         return jsonify({'error': 'Personaje no encontrado'}), 404
 
-    spells = Spell.query.filter_by(character_id=character.id).all()
+    spells = Spell.query.filter_by(character_id=character_id).all()
     return jsonify({
         'message': 'Hechizos obtenidos correctamente',
         'spells': [s.to_dict() for s in spells]
@@ -29,12 +30,12 @@ def create_spell():
     if not valid:
         return jsonify({'error': error}), 400
 
-    character = Character.query.filter_by(id=data['character_id'], user_id=user_id).first()
-    if not character:
+    character_id = owned_character_id(user_id, data['character_id'])
+    if not character_id:
         return jsonify({'error': 'Personaje no encontrado'}), 404
 
     spell = Spell(
-        character_id=character.id,
+        character_id=character_id,
         name=data['name'],
         type=data['type'],
         description=data['description'],
@@ -50,17 +51,45 @@ def create_spell():
         'spell_id': spell.id
     }), 201
 
+@spell.route('/spell/bulk', methods=['POST'])
+@jwt_required()
+def create_spells_bulk():
+    user_id = get_jwt_identity()
+
+    spells, error = parse_batch(request.get_json(), 'character_id', 'name', 'type', 'description', 'uses', 'uses_max')
+    if error:
+        return jsonify({'error': error}), 400
+
+    character_ids = owned_batch_character_ids(user_id, spells)
+    if character_ids is None:
+        return jsonify({'error': 'Personaje no encontrado'}), 404
+
+    rows = [{
+        'character_id': character_id,
+        'name': data['name'],
+        'type': data['type'],
+        'description': data['description'],
+        'uses': data['uses'],
+        'uses_max': data.get('uses_max', 1),
+        'image_url': data.get('image_url')
+    } for character_id, data in zip(character_ids, spells)]
+
+    return jsonify({
+        'message': 'Hechizos creados correctamente',
+        'spell_ids': bulk_insert(Spell, rows)
+    }), 201
+
 @spell.route('/spell/<int:spell_id>', methods=['PUT'])
 @jwt_required()
 def update_spell(spell_id):
     user_id = get_jwt_identity()
-    spell = Spell.query.get(spell_id)
-    if not spell:
-        return jsonify({'error': 'Hechizo no encontrado'}), 404
+    spell, error = get_owned(Spell, spell_id, user_id, 'Hechizo no encontrado')
+    if error:
+        return error
 
-    character = Character.query.filter_by(id=spell.character_id, user_id=user_id).first()
-    if not character:
-        return jsonify({'error': 'No autorizado'}), 403
+    error = claim_if_match(spell.character_id)
+    if error:
+        return error
 
     data = request.get_json() or {}
     for field in ['name', 'type', 'description', 'uses', 'image_url']:
@@ -77,13 +106,9 @@ def update_spell(spell_id):
 @jwt_required()
 def delete_spell(spell_id):
     user_id = get_jwt_identity()
-    spell = Spell.query.get(spell_id)
-    if not spell:
-        return jsonify({'error': 'Hechizo no encontrado'}), 404
-
-    character = Character.query.filter_by(id=spell.character_id, user_id=user_id).first()
-    if not character:
-        return jsonify({'error': 'No autorizado'}), 403
+    spell, error = get_owned(Spell, spell_id, user_id, 'Hechizo no encontrado')
+    if error:
+        return error
 
     db.session.delete(spell)
     db.session.commit()
@@ -96,39 +121,99 @@ def delete_spell(spell_id):
 @jwt_required()
 def reset_spells(character_id):
     user_id = get_jwt_identity()
-    character = Character.query.filter_by(id=character_id, user_id=user_id).first()
-    if not character:
+    character_id = owned_character_id(user_id, character_id)
+    if not character_id:
         return jsonify({'error': 'Personaje no encontrado'}), 404
 
-    spells = Spell.query.filter_by(character_id=character.id).all()
-    for spell in spells:
-        spell.uses = spell.uses_max
-
+    db.session.execute(
+        update(Spell).where(Spell.character_id == character_id).values(uses=Spell.uses_max),
+        execution_options={'synchronize_session': False}
+    )
+    bump_character_versions(db.session, [character_id])
     db.session.commit()
     return jsonify({
         'message': 'Hechizos reiniciados correctamente',
         'character_id': character_id
     }), 200
 
+def _parse_casts(casts):
+    counts = {}
+    for cast in casts:
+        if not isinstance(cast, dict):
+            return None
+        spell_id, count = cast.get('spell_id'), cast.get('count', 1)
+        # bool es subclase de int: true no vale como id ni como número de usos
+        if type(spell_id) is not int or type(count) is not int or count < 1:
+            return None
+        counts[spell_id] = counts.get(spell_id, 0) + count
+    return counts or None
+
+def _consume_spells(user_id, counts):
+    # Un único UPDATE condicional: solo se descuenta si el hechizo es del usuario y le quedan usos,
+    # así dos lanzamientos simultáneos no pueden pasar ambos la comprobación
+    cost = case(counts, value=Spell.id)
+    owned = select(Character.id).where(Character.user_id == user_id)
+    rows = db.session.execute(
+        update(Spell)
+        .where(Spell.id.in_(list(counts)), Spell.character_id.in_(owned), Spell.uses >= cost)
+        .values(uses=Spell.uses - cost)
+        .returning(Spell.id, Spell.uses, Spell.character_id),
+        execution_options={'synchronize_session': False}
+    ).all()
+    if len(rows) != len(counts):
+        db.session.rollback()
+        return None, _cast_error(user_id, set(counts) - {row.id for row in rows})
+
+    bump_character_versions(db.session, {row.character_id for row in rows})
+    db.session.commit()
+    return rows, None
+
+def _cast_error(user_id, failed_ids):
+    # Solo en el camino de error se consulta por qué falló el UPDATE
+    for spell_id in sorted(failed_ids):
+        spell, error = get_owned(Spell, spell_id, user_id, 'Hechizo no encontrado')
+        if error:
+            return error
+    return jsonify({'error': 'El hechizo no tiene usos restantes', 'spell_id': min(failed_ids)}), 400
+
 @spell.route('/spell/use/<int:spell_id>', methods=['POST'])
 @jwt_required()
 def use_spell(spell_id):
     user_id = get_jwt_identity()
-    spell = Spell.query.get(spell_id)
-    if not spell:
-        return jsonify({'error': 'Hechizo no encontrado'}), 404
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Formato inválido'}), 400
 
-    character = Character.query.filter_by(id=spell.character_id, user_id=user_id).first()
-    if not character:
-        return jsonify({'error': 'No autorizado'}), 403
+    counts = _parse_casts([{'spell_id': spell_id, 'count': data.get('count', 1)}])
+    if not counts:
+        return jsonify({'error': 'El número de usos debe ser un entero positivo'}), 400
 
-    if spell.uses <= 0:
-        return jsonify({'error': 'El hechizo no tiene usos restantes'}), 400
+    rows, error = _consume_spells(user_id, counts)
+    if error:
+        return error
 
-    spell.uses -= 1
-    db.session.commit()
     return jsonify({
         'message': 'Hechizo usado correctamente',
-        'spell_id': spell.id,
-        'remaining_uses': spell.uses
+        'spell_id': spell_id,
+        'remaining_uses': rows[0].uses
+    }), 200
+
+@spell.route('/spell/use', methods=['POST'])
+@jwt_required()
+def use_spells():
+    user_id = get_jwt_identity()
+    data = request.get_json() or {}
+    casts = data.get('spells') if isinstance(data, dict) else None
+
+    counts = _parse_casts(casts) if isinstance(casts, list) else None
+    if not counts:
+        return jsonify({'error': 'Se esperaba una lista de hechizos con spell_id y count'}), 400
+
+    rows, error = _consume_spells(user_id, counts)
+    if error:
+        return error
+
+    return jsonify({
+        'message': 'Hechizos usados correctamente',
+        'remaining_uses': {str(row.id): row.uses for row in rows}
     }), 200
@@ -1,5 +1,143 @@
+import base64
+import hashlib
+import json
+from flask import current_app, request, jsonify
+from sqlalchemy import select, update, insert
+from back.models import db, Character, bump_character_versions
+
 def validate_required_fields(data, *fields):
     missing = [field for field in fields if not data.get(field)]
     if missing:
         return False, f"Faltan los siguientes campos: {', '.join(missing)}"
-    return True, None
\ No newline at end of file
+    return True, None
+
+def encode_cursor(*values):
+    raw = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor, size):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, UnicodeError):
+        return None
+    if not isinstance(values, list) or len(values) != size:
+        return None
+    return values
+
+def parse_page_args(args):
+    # Sin limit ni after se devuelve la lista completa, como antes de paginar
+    limit = args.get('limit', type=int)
+    if limit is None and 'limit' in args:
+        # ?limit=abc no se trata como si faltara: devolvería la lista completa
+        return None, None, 'limit inválido'
+    after = args.get('after')
+    if limit is None and after is None:
+        return None, None, None
+    if limit is None:
+        limit = current_app.config['PAGE_SIZE_DEFAULT']
+    if limit < 1:
+        return None, None, 'El parámetro limit debe ser mayor que 0'
+    return min(limit, current_app.config['PAGE_SIZE_MAX']), after, None
+
+def character_etag(character_id, version, variant=''):
+    tag = f'{character_id}-{version}'
+    if variant:
+        tag += '-' + hashlib.sha1(variant.encode('utf-8')).hexdigest()[:10]
+    return tag
+
+def claim_if_match(character_id):
+    # If-Match sobre el ETag de la ficha: se reclama la versión con un UPDATE condicional, así
+    # dos escrituras concurrentes con el mismo ETag no pueden ganar ambas
+    if not request.if_match or request.if_match.star_tag:
+        return None
+
+    versions = set()
+    for tag in request.if_match:
+        parts = tag.split('-')
+        if len(parts) >= 2 and parts[0] == str(character_id) and parts[1].isdigit():
+            versions.add(int(parts[1]))
+
+    characters = Character.__table__
+    for version in versions:
+        result = db.session.execute(
+            update(characters)
+            .where(characters.c.id == character_id, characters.c.version == version)
+            .values(version=characters.c.version + 1)
+        )
+        if result.rowcount:
+            db.session.info.setdefault('bumped_character_ids', set()).add(character_id)
+            return None
+
+    return jsonify({'error': 'El personaje ha sido modificado por otra petición'}), 412
+
+def owned_character_id(user_id, character_id):
+    # Siempre contra la base de datos (un SELECT por el índice (user_id, id)): la identidad cacheada de
+    # este worker no se entera de los borrados de otros, y SQLite puede reutilizar el id de un personaje
+    # borrado para el de otro usuario
+    try:
+        character_id = int(character_id)
+    except (TypeError, ValueError):
+        return None
+
+    owned = db.session.execute(
+        select(Character.id).where(Character.id == character_id, Character.user_id == user_id)
+    ).first()
+    return character_id if owned else None
+
+def get_owned(model, object_id, user_id, not_found, owner_column=None):
+    # Carga el objeto y el dueño de su personaje en un único SELECT con JOIN
+    owner_column = owner_column if owner_column is not None else model.character_id
+    row = db.session.execute(
+        select(model, Character.user_id)
+        .outerjoin(Character, Character.id == owner_column)
+        .where(model.id == object_id)
+    ).first()
+    if row is None:
+        return None, (jsonify({'error': not_found}), 404)
+
+    instance, owner_id = row
+    if owner_id is None or str(owner_id) != str(user_id):
+        return None, (jsonify({'error': 'No autorizado'}), 403)
+    return instance, None
+
+def parse_batch(data, *fields):
+    if not isinstance(data, list) or not data:
+        return None, 'Se esperaba una lista de elementos'
+    max_items = current_app.config['BULK_MAX_ITEMS']
+    if len(data) > max_items:
+        return None, f'Máximo {max_items} elementos por lote'
+    for index, item in enumerate(data):
+        if not isinstance(item, dict):
+            return None, f'Elemento {index}: formato inválido'
+        valid, error = validate_required_fields(item, *fields)
+        if not valid:
+            return None, f'Elemento {index}: {error}'
+    return data, None
+
+def owned_batch_character_ids(user_id, items):
+    # Un único SELECT ... IN para todo el lote, sea cual sea su tamaño (los lotes siempre son escrituras)
+    character_ids = []
+    for item in items:
+        try:
+            character_ids.append(int(item['character_id']))
+        except (TypeError, ValueError):
+            return None
+
+    wanted = set(character_ids)
+    owned = db.session.execute(
+        select(Character.id).where(Character.id.in_(wanted), Character.user_id == user_id)
+    ).scalars().all()
+    if len(owned) != len(wanted):
+        return None
+    return character_ids
+
+def bulk_insert(model, rows):
+    # Un único INSERT multi-fila con RETURNING, una transacción y un commit para todo el lote
+    # sort_by_parameter_order obligaría a SQLite a un INSERT por fila; los ids autoincrementales de una
+    # misma sentencia son crecientes, así que ordenarlos devuelve el orden de los parámetros
+    result = db.session.execute(insert(model).returning(model.id), rows)
+    ids = sorted(result.scalars())
+    bump_character_versions(db.session, {row['character_id'] for row in rows})
+    db.session.commit()
+    return ids
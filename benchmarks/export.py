@@ -0,0 +1,62 @@
+# Uso: python -m benchmarks.export [entradas_máximas]
+# Mide el pico de memoria de Python y el tiempo hasta el primer bloque de la exportación NDJSON a medida
+# que crece el diario. El pico debe quedarse plano: las filas se leen con yield_per y se escriben por bloques.
+# tracemalloc ralentiza la exportación; los tiempos sirven para comparar tamaños, no como rendimiento absoluto
+import os
+import sys
+import time
+import tracemalloc
+
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+
+from sqlalchemy import insert
+from back import create_app
+from back.models import db, User, Character, JournalEntry
+from back.archive.export import export_stream
+
+def _fill(character_id, start, end):
+    db.session.execute(insert(JournalEntry), [
+        {'character_id': character_id, 'content': f'Entrada {index}: el grupo cruza el puente y acampa junto al río'}
+        for index in range(start, end)
+    ])
+    db.session.commit()
+
+def _measure(user_id, compress):
+    db.session.expunge_all()
+    tracemalloc.start()
+    start = time.perf_counter()
+    stream = export_stream(user_id, compress)
+    first = len(next(stream))
+    first_chunk = time.perf_counter() - start
+    total = first + sum(len(chunk) for chunk in stream)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return first_chunk, elapsed, total, peak
+
+def main(max_entries=100_000):
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', email='bench@example.com', password_hash='x')
+        db.session.add(user)
+        db.session.flush()
+        character = Character(name='Bench', race='Humano', background='-', goal='-', user_id=user.id)
+        db.session.add(character)
+        db.session.commit()
+        user_id, character_id = user.id, character.id
+
+        size = 0
+        for target in (10, 1_000, 10_000, max_entries):
+            if target > max_entries or target <= size:
+                continue
+            _fill(character_id, size, target)
+            size = target
+            for compress in (False, True):
+                first_chunk, elapsed, total, peak = _measure(user_id, compress)
+                label = 'gzip' if compress else 'ndjson'
+                print(f'{size:>7} entradas {label:>6}: primer bloque {first_chunk * 1000:6.1f} ms, '
+                      f'total {elapsed * 1000:7.1f} ms, {total / 1024:8.0f} KiB, pico de memoria {peak / 1024:6.0f} KiB')
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
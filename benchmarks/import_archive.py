@@ -0,0 +1,58 @@
+# Uso: python -m benchmarks.import_archive [personajes] [entradas_por_personaje]
+# Exporta una campaña sintética y la importa en otra cuenta con distintos tamaños de bloque.
+# Cada bloque es un INSERT masivo por tabla y un commit, así que bloques mayores amortizan el commit
+import io
+import os
+import sys
+import time
+
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+
+from sqlalchemy import insert, select, func
+from back import create_app
+from back.models import db, User, Character, JournalEntry, CharacterRelationship
+from back.archive.export import export_stream
+from back.archive.importer import create_job, import_archive
+
+def _seed(user_id, characters, entries):
+    ids = db.session.execute(insert(Character).returning(Character.id), [
+        {'user_id': user_id, 'name': f'PNJ {index}', 'race': 'Humano', 'background': '-', 'goal': '-'}
+        for index in range(characters)
+    ]).scalars().all()
+    ids.sort()
+    db.session.execute(insert(JournalEntry), [
+        {'character_id': character_id, 'content': f'Sesión {index}: el grupo avanza por el paso de montaña'}
+        for character_id in ids for index in range(entries)
+    ])
+    db.session.execute(insert(CharacterRelationship), [
+        {'source_id': ids[index], 'target_id': ids[(index * 7 + 1) % len(ids)], 'relation_type': 'aliado'}
+        for index in range(len(ids))
+    ])
+    db.session.commit()
+
+def main(characters=2_000, entries=25):
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        users = [User(username=f'bench{index}', email=f'bench{index}@example.com', password_hash='x') for index in range(2)]
+        db.session.add_all(users)
+        db.session.commit()
+        source_id, target_id = users[0].id, users[1].id
+        _seed(source_id, characters, entries)
+        archive = b''.join(export_stream(source_id, compress=True))
+        records = characters * (entries + 2) + 2
+        print(f'{records} registros, {len(archive) / 1024:.0f} KiB comprimidos')
+
+        for chunk_size in (100, 1_000, 5_000):
+            job = create_job(target_id, 'benchmark')
+            start = time.perf_counter()
+            import_archive(job, io.BytesIO(archive), chunk_size)
+            elapsed = time.perf_counter() - start
+            print(f'bloque {chunk_size:>5}: {elapsed * 1000:7.0f} ms, {records / elapsed:8.0f} registros/s, '
+                  f'{job.chunks_committed} commits')
+
+        imported = db.session.execute(select(func.count()).select_from(Character).where(Character.user_id == target_id)).scalar()
+        assert imported == characters * 3
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
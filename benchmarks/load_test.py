@@ -0,0 +1,113 @@
+# Uso: python -m benchmarks.load_test [segundos] [clientes] [workers...]
+# Arranca python -m back.serve con distintos números de workers sobre una base SQLite temporal y la
+# satura con clientes keep-alive (un proceso por cliente, para que el GIL del cliente no sea el límite).
+# Mide peticiones por segundo y latencias de GET /api/character/<id>, una ficha completa con JWT.
+# El escalado depende de los núcleos: con N núcleos el rendimiento crece hasta ~N workers
+import http.client
+import multiprocessing
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def _seed(database_url):
+    # Se importa aquí: la configuración lee DATABASE_URL al importar back
+    os.environ['DATABASE_URL'] = database_url
+    from flask_jwt_extended import create_access_token
+    from back import create_app
+    from back.models import db, User, Character, JournalEntry
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        user = User(username='load', email='load@example.com', password_hash='x')
+        db.session.add(user)
+        db.session.flush()
+        character = Character(name='Carga', race='Humano', background='-', goal='-', user_id=user.id)
+        db.session.add(character)
+        db.session.flush()
+        db.session.add_all(JournalEntry(character_id=character.id, content=f'Entrada {index}') for index in range(20))
+        db.session.commit()
+        return create_access_token(identity=str(user.id)), character.id
+
+def _wait_ready(port, timeout=20):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError('El servidor no arrancó')
+
+def _client(port, path, token, duration, results):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    headers = {'Authorization': f'Bearer {token}'}
+    latencies, errors = [], 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        try:
+            connection.request('GET', path, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            if response.status != 200:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            connection.close()
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - start)
+    connection.close()
+    results.put((latencies, errors))
+
+def _run(workers, clients, duration, env, token, character_id):
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'back.serve'],
+        env={**env, 'SERVER_BIND': f'127.0.0.1:{port}', 'SERVER_WORKERS': str(workers)},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        _wait_ready(port)
+        time.sleep(1)  # los workers terminan de cargar la app
+        results = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=_client, args=(port, f'/api/character/{character_id}', token,
+                                                                     duration, results))
+                     for _ in range(clients)]
+        for process in processes:
+            process.start()
+        collected = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+    latencies = sorted(latency for batch, _ in collected for latency in batch)
+    errors = sum(errors for _, errors in collected)
+    return len(latencies) / duration, latencies, errors
+
+def main(duration=5, clients=8, *workers_list):
+    workers_list = workers_list or (1, 2, 4)
+    directory = tempfile.mkdtemp()
+    database_url = f"sqlite:///{os.path.join(directory, 'load.sqlite3')}"
+    token, character_id = _seed(database_url)
+    env = {**os.environ, 'DATABASE_URL': database_url, 'SERVER_THREADS': os.getenv('SERVER_THREADS', '4')}
+    print(f'{os.cpu_count()} núcleos, {clients} clientes, {duration} s por prueba, {env["SERVER_THREADS"]} hilos por worker')
+    for workers in workers_list:
+        throughput, latencies, errors = _run(workers, clients, duration, env, token, character_id)
+        p50 = statistics.median(latencies) * 1000
+        p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+        print(f'{workers:>2} workers: {throughput:7.0f} req/s, p50 {p50:6.1f} ms, p99 {p99:6.1f} ms, {errors} errores')
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,63 @@
+# Uso: python -m benchmarks.login_throughput [logins] [clientes] [coste_bcrypt]
+# Lanza una ráfaga de logins concurrentes y, mientras tanto, mide la latencia de /api/ping
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+_database = tempfile.NamedTemporaryFile(suffix='.sqlite3', delete=False)
+os.environ['DATABASE_URL'] = f'sqlite:///{_database.name}'
+
+from back import create_app
+from back.models import db
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q / 100))] if values else 0.0
+
+def main(logins=200, clients=16, rounds=10):
+    app = create_app()
+    app.config['BCRYPT_ROUNDS'] = rounds
+    app.config['LOGIN_THROTTLE_ENABLED'] = False
+    with app.app_context():
+        db.create_all()
+    app.test_client().post('/api/signup', json={'username': 'bench', 'email': 'bench@example.com', 'password': 'bench'})
+
+    statuses = []
+    def login(_):
+        res = app.test_client().post('/api/login', json={'login_name': 'bench', 'password': 'bench'})
+        statuses.append(res.status_code)
+
+    pings, done = [], threading.Event()
+    def ping():
+        client = app.test_client()
+        while not done.is_set():
+            start = time.perf_counter()
+            client.get('/api/ping')
+            pings.append(time.perf_counter() - start)
+            time.sleep(0.005)
+
+    pinger = threading.Thread(target=ping)
+    pinger.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(clients) as pool:
+        list(pool.map(login, range(logins)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    pinger.join()
+
+    with app.app_context():
+        stats = app.extensions['password_hasher'].stats()
+    print(f'coste bcrypt: {rounds}, workers: {stats["workers"]}, clientes: {clients}')
+    print(f'logins: {logins} en {elapsed:.2f} s ({logins / elapsed:.1f}/s)')
+    print(f'respuestas: ' + ', '.join(f'{code}={statuses.count(code)}' for code in sorted(set(statuses))))
+    print(f'/api/ping durante la ráfaga: p50 {_percentile(pings, 50) * 1000:.1f} ms, '
+          f'p95 {_percentile(pings, 95) * 1000:.1f} ms')
+
+if __name__ == '__main__':
+    try:
+        main(*(int(arg) for arg in sys.argv[1:4]))
+    finally:
+        os.unlink(_database.name)
@@ -0,0 +1,56 @@
+# Uso: python -m benchmarks.search [entradas_máximas] [repeticiones]
+# Mide la latencia de la búsqueda a medida que crece el diario. Un término selectivo se mantiene plano;
+# uno que aparece en casi todas las entradas crece con el número de coincidencias, que bm25 puntúa todas
+import os
+import random
+import statistics
+import sys
+import time
+
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+
+from sqlalchemy import insert
+from back import create_app
+from back.models import db, User, Character, JournalEntry
+from back.notes.search import search, match_expression
+
+WORDS = ('camino bosque taberna espada dragón río montaña puerta torre noche guardia mercado ciudad '
+         'lluvia fuego barco puente cueva oro mapa').split()
+
+def _fill(character_id, start, end, rng):
+    rows = [{
+        'character_id': character_id,
+        'content': ' '.join(rng.choices(WORDS, k=12)) + (' herrero' if index % 5000 == 0 else '')
+    } for index in range(start, end)]
+    db.session.execute(insert(JournalEntry), rows)
+    db.session.commit()
+
+def main(max_entries=200_000, repeat=50):
+    rng = random.Random(7)
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', email='bench@example.com', password_hash='x')
+        db.session.add(user)
+        db.session.flush()
+        character = Character(name='Bench', race='Humano', background='-', goal='-', user_id=user.id)
+        db.session.add(character)
+        db.session.commit()
+
+        size = 0
+        for target in (1_000, 10_000, 100_000, max_entries):
+            if target > max_entries or target <= size:
+                continue
+            _fill(character.id, size, target, rng)
+            size = target
+            for label, query in (('término raro', 'herrero'), ('término común', 'dragón torre')):
+                match = match_expression(query)
+                timings = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    search(user.id, match, ['journal'], 20)
+                    timings.append(time.perf_counter() - start)
+                print(f'{size:>7} entradas, {label}: mediana {statistics.median(timings) * 1000:.2f} ms')
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,67 @@
+# Uso: python -m benchmarks.serializer [entradas_de_diario] [repeticiones]
+import os
+import sys
+import timeit
+
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+
+from sqlalchemy.inspection import inspect
+from back import create_app
+from back.models import db, Character, STAT_COLUMNS, JournalEntry, InventoryItem, Spell
+from back.character.loaders import sheet_query
+
+def legacy_to_dict(instance, include_relationships=False):
+    # Implementación original de Serializer.to_dict, conservada como referencia
+    result = {}
+    sensitive_fields = {'password', 'password_hash'}
+
+    for column_attribute in inspect(instance).mapper.column_attrs:
+        column_name = column_attribute.key
+        if column_name in sensitive_fields:
+            continue
+        result[column_name] = getattr(instance, column_name)
+
+    if include_relationships:
+        for relationship_property in inspect(instance.__class__).relationships:
+            relation_value = getattr(instance, relationship_property.key)
+            if isinstance(relation_value, list):
+                result[relationship_property.key] = [legacy_to_dict(item) for item in relation_value]
+            elif relation_value is not None:
+                result[relationship_property.key] = legacy_to_dict(relation_value)
+
+    return result
+
+def seed(entries):
+    character = Character(name='Bench', race='Humano', background='-', goal='-',
+                          **{column: 1 for column in STAT_COLUMNS.values()})
+    db.session.add(character)
+    db.session.flush()
+    for i in range(entries):
+        db.session.add(JournalEntry(character_id=character.id, content=f'Entrada {i}'))
+        db.session.add(InventoryItem(character_id=character.id, item=f'Objeto {i}', description='-'))
+        db.session.add(Spell(character_id=character.id, name=f'Hechizo {i}', type='-', description='-', uses=1))
+    db.session.commit()
+    return character.user_id
+
+def main(entries=1000, repeat=20):
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        user_id = seed(entries)
+        character = sheet_query(user_id).one()
+        # Las estadísticas ya no son filas: el serializador las oculta como columnas y las expone como lista
+        expected = legacy_to_dict(character, True)
+        for column in STAT_COLUMNS.values():
+            del expected[column]
+        expected['stats'] = character.stats
+        assert expected == character.to_dict(include_relationships=True)
+
+        legacy = min(timeit.repeat(lambda: legacy_to_dict(character, True), number=1, repeat=repeat))
+        planned = min(timeit.repeat(lambda: character.to_dict(include_relationships=True), number=1, repeat=repeat))
+        rows = 3 * entries + 1
+        print(f'filas serializadas: {rows}')
+        print(f'to_dict original: {legacy * 1000:.2f} ms')
+        print(f'to_dict con plan: {planned * 1000:.2f} ms ({legacy / planned:.1f}x)')
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
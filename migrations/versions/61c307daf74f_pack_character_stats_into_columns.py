@@ -0,0 +1,64 @@
+"""pack character stats into columns
+
+Revision ID: 61c307daf74f
+Revises: 19948c156d0d
+Create Date: 2026-10-18 10:09:42.058009
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '61c307daf74f'
+down_revision = '19948c156d0d'
+branch_labels = None
+depends_on = None
+
+
+STAT_COLUMNS = {'FUE': 'stat_fue', 'AGI': 'stat_agi', 'MEN': 'stat_men', 'CAR': 'stat_car'}
+
+
+def upgrade():
+    with op.batch_alter_table('characters', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('stat_fue', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('stat_agi', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('stat_men', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('stat_car', sa.Integer(), server_default='0', nullable=False))
+
+    # Copia las filas de stats a las columnas nuevas antes de borrar la tabla
+    for name, column in STAT_COLUMNS.items():
+        op.execute(
+            f"UPDATE characters SET {column} = COALESCE(("
+            f"SELECT value FROM stats WHERE stats.character_id = characters.id AND stats.name = '{name}' "
+            f"ORDER BY stats.id DESC LIMIT 1), 0)"
+        )
+
+    with op.batch_alter_table('stats', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_stats_character_id'))
+
+    op.drop_table('stats')
+
+
+def downgrade():
+    op.create_table('stats',
+    sa.Column('id', sa.INTEGER(), nullable=False),
+    sa.Column('character_id', sa.INTEGER(), nullable=False),
+    sa.Column('name', sa.VARCHAR(length=16), nullable=False),
+    sa.Column('value', sa.INTEGER(), nullable=False),
+    sa.ForeignKeyConstraint(['character_id'], ['characters.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('stats', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_stats_character_id'), ['character_id'], unique=False)
+
+    for name, column in STAT_COLUMNS.items():
+        op.execute(
+            f"INSERT INTO stats (character_id, name, value) SELECT id, '{name}', {column} FROM characters"
+        )
+
+    with op.batch_alter_table('characters', schema=None) as batch_op:
+        batch_op.drop_column('stat_car')
+        batch_op.drop_column('stat_men')
+        batch_op.drop_column('stat_agi')
+        batch_op.drop_column('stat_fue')
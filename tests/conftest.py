@@ -9,7 +9,8 @@ def app():
     app.config.update({
         "TESTING": True,
         "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
-        "JWT_SECRET_KEY": "test-secret"
+        "JWT_SECRET_KEY": "test-secret",
+        "BCRYPT_ROUNDS": 4
     })
     with app.app_context():
         db.create_all()
@@ -37,3 +38,36 @@ def user_and_token(client):
 
     return "testuser", token
 
+
+@pytest.fixture
+def count_queries(app):
+    from contextlib import contextmanager
+    from sqlalchemy import event
+
+    @contextmanager
+    def counter():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+
+    return counter
+
+@pytest.fixture
+def other_token(client):
+    client.post('/api/signup', json={
+        "username": "otheruser",
+        "email": "other@example.com",
+        "password": "otherpass"
+    })
+    res = client.post('/api/login', json={
+        "login_name": "otheruser",
+        "password": "otherpass"
+    })
+    return res.get_json()["access_token"]
@@ -81,3 +81,40 @@ def test_delete_ability(client, user_and_token):
     res = client.delete(f'/api/ability/{aid}', headers={"Authorization": f"Bearer {token}"})
     assert res.status_code == 200
     assert res.get_json()["ability_id"] == aid
+
+def test_bulk_create_abilities(client, user_and_token):
+    user, token = user_and_token
+    headers = {"Authorization": f"Bearer {token}"}
+    cid = client.post('/api/character', json={
+        "name": "Versátil",
+        "race": "Humano",
+        "goal": "Saber de todo",
+        "background": "Aventurero",
+        "stats": {"FUE": 1, "AGI": 1, "MEN": 1, "CAR": 1}
+    }, headers=headers).get_json()["character_id"]
+
+    res = client.post('/api/ability/bulk', json=[
+        {"character_id": cid, "name": "Sigilo", "description": "Silencioso", "uses_per_session": 2},
+        {"character_id": cid, "name": "Rastreo", "description": "Sigue huellas", "uses_per_session": 1}
+    ], headers=headers)
+    assert res.status_code == 201
+    assert len(res.get_json()["ability_ids"]) == 2
+    assert len(client.get(f'/api/ability/{cid}', headers=headers).get_json()["abilities"]) == 2
+
+def test_use_ability_once(client, user_and_token):
+    user, token = user_and_token
+    headers = {"Authorization": f"Bearer {token}"}
+    cid = client.post('/api/character', json={
+        "name": "Berserker",
+        "race": "Orco",
+        "goal": "Enfurecerse",
+        "background": "Guerrero",
+        "stats": {"FUE": 3, "AGI": 0, "MEN": 0, "CAR": 0}
+    }, headers=headers).get_json()["character_id"]
+    aid = client.post('/api/ability', json={"character_id": cid, "name": "Furia", "description": "+2 daño",
+                                            "uses_per_session": 1}, headers=headers).get_json()["ability_id"]
+
+    assert client.post(f'/api/ability/use/{aid}', headers=headers).status_code == 200
+    res = client.post(f'/api/ability/use/{aid}', headers=headers)
+    assert res.status_code == 400
+    assert client.post('/api/ability/use/9999', headers=headers).status_code == 404
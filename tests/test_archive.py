@@ -0,0 +1,218 @@
+import gzip
+import json
+from back.models import db, User
+
+def _create_campaign(client, token):
+    headers = {"Authorization": f"Bearer {token}"}
+    ids = [client.post('/api/character', json={
+        "name": name, "race": "Humano", "goal": "Explorar", "background": "Viajero",
+        "stats": {"FUE": 1, "AGI": 2, "MEN": 3, "CAR": 0}
+    }, headers=headers).get_json()["character_id"] for name in ("Ana", "Bruno")]
+    cid = ids[0]
+    client.post('/api/spell', json={"character_id": cid, "name": "Luz", "type": "Utilidad",
+                                    "description": "Ilumina", "uses": 1, "uses_max": 1}, headers=headers)
+    client.post('/api/ability', json={"character_id": cid, "name": "Golpe", "description": "Fuerte",
+                                      "uses_per_session": 1}, headers=headers)
+    client.post('/api/inventory', json={"character_id": cid, "item": "Espada", "description": "Afilada"}, headers=headers)
+    client.post('/api/journal', json={"character_id": cid, "content": "Día uno"}, headers=headers)
+    client.post('/api/decision', json={"character_id": cid, "description": "Ir al norte"}, headers=headers)
+    client.post('/api/condition', json={"character_id": cid, "name": "Cansado", "description": "-1"}, headers=headers)
+    client.post('/api/relationship', json={"source_id": ids[0], "target_id": ids[1], "relation_type": "aliado"},
+                headers=headers)
+    return ids
+
+def _records(body):
+    return [json.loads(line) for line in body.decode('utf-8').splitlines()]
+
+def test_export_campaign_ndjson(client, user_and_token, other_token):
+    user, token = user_and_token
+    ids = _create_campaign(client, token)
+    client.post('/api/character', json={
+        "name": "Ajeno", "race": "Elfo", "goal": "g", "background": "b",
+        "stats": {"FUE": 0, "AGI": 0, "MEN": 0, "CAR": 0}
+    }, headers={"Authorization": f"Bearer {other_token}"})
+
+    res = client.get('/api/export', headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 200
+    assert res.mimetype == 'application/x-ndjson'
+    assert res.is_streamed
+    records = _records(res.data)
+    assert records[0]["type"] == "header" and records[0]["version"] == 1
+    assert records[-1] == {"type": "footer", "counts": {
+        "character": 2, "inventory_item": 1, "ability": 1, "spell": 1, "condition": 1,
+        "journal_entry": 1, "decision": 1, "relationship": 1
+    }}
+    characters = [record["data"] for record in records if record["type"] == "character"]
+    assert [character["id"] for character in characters] == ids
+    assert characters[0]["stats"] == {"FUE": 1, "AGI": 2, "MEN": 3, "CAR": 0}
+    assert "user_id" not in characters[0] and "stat_fue" not in characters[0]
+    journal = next(record["data"] for record in records if record["type"] == "journal_entry")
+    assert journal["character_id"] == ids[0] and journal["content"] == "Día uno"
+
+def test_export_campaign_gzip(client, user_and_token):
+    user, token = user_and_token
+    _create_campaign(client, token)
+    res = client.get('/api/export?gzip=1', headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 200
+    assert res.mimetype == 'application/gzip'
+    assert 'campaign-' in res.headers["Content-Disposition"]
+    records = _records(gzip.decompress(res.data))
+    assert records[-1]["counts"]["character"] == 2
+
+def test_export_cli(app, client, user_and_token, tmp_path):
+    user, token = user_and_token
+    _create_campaign(client, token)
+    output = tmp_path / 'export.ndjson.gz'
+    user_id = db.session.execute(db.select(User.id).filter_by(username=user)).scalar_one()
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['archive', 'export', str(user_id), '--gzip', '--output', str(output)])
+    assert result.exit_code == 0, result.output
+    with gzip.open(output, 'rt', encoding='utf-8') as handle:
+        records = [json.loads(line) for line in handle]
+    assert records[-1]["counts"]["relationship"] == 1
+
+    assert runner.invoke(args=['archive', 'export', '999']).exit_code != 0
+
+def test_export_requires_auth(client):
+    assert client.get('/api/export').status_code == 401
+
+def _import(client, token, body, **params):
+    query = '&'.join(f'{key}={value}' for key, value in params.items())
+    return client.post(f'/api/import?{query}', data=body, headers={"Authorization": f"Bearer {token}"})
+
+def test_import_roundtrip_remaps_ids(client, user_and_token, other_token):
+    user, token = user_and_token
+    _create_campaign(client, token)
+    archive = client.get('/api/export?gzip=1', headers={"Authorization": f"Bearer {token}"}).data
+
+    other = {"Authorization": f"Bearer {other_token}"}
+    # Calienta la identidad y el grafo en caché: la importación debe invalidarlos
+    assert client.get('/api/relationship/graph/components', headers=other).get_json()["components"] == []
+
+    res = _import(client, other_token, archive, chunk_size=3)
+    assert res.status_code == 201
+    job = res.get_json()["job"]
+    assert job["status"] == "completed"
+    assert (job["characters"], job["children"], job["relationships"], job["skipped"]) == (2, 6, 1, 0)
+    assert job["chunks_committed"] == 4
+
+    characters = client.get('/api/character', headers=other).get_json()["characters"]
+    assert [c["name"] for c in characters] == ["Ana", "Bruno"]
+    assert {s["name"]: s["value"] for s in characters[0]["stats"]} == {"FUE": 1, "AGI": 2, "MEN": 3, "CAR": 0}
+    assert characters[0]["journal_entries"][0]["content"] == "Día uno"
+    new_ids = [c["id"] for c in characters]
+    components = client.get('/api/relationship/graph/components', headers=other).get_json()["components"]
+    assert components == [{"size": 2, "character_ids": new_ids}]
+    assert client.get(f'/api/import/{job["id"]}', headers=other).get_json()["job"]["status"] == "completed"
+    assert client.get(f'/api/import/{job["id"]}', headers={"Authorization": f"Bearer {token}"}).status_code == 404
+
+def test_import_json_array(client, user_and_token):
+    user, token = user_and_token
+    records = [
+        {"type": "header", "format": "campaign", "version": 1},
+        {"type": "character", "data": {"id": 70, "name": "Lía", "race": "Elfa", "goal": "g", "background": "b",
+                                       "stats": {"MEN": 4}}},
+        {"type": "decision", "data": {"id": 5, "character_id": 70, "description": "Volver"}},
+        {"type": "relationship", "data": {"id": 9, "source_id": 70, "target_id": 12345, "relation_type": "rival"}},
+        {"type": "footer", "counts": {"character": 1, "decision": 1, "relationship": 1}},
+    ]
+    res = _import(client, token, json.dumps(records, indent=2).encode('utf-8'), chunk_size=1)
+    assert res.status_code == 201
+    job = res.get_json()["job"]
+    assert (job["characters"], job["children"], job["relationships"], job["skipped"]) == (1, 1, 0, 1)
+
+def test_import_resumes_from_last_committed_chunk(client, user_and_token):
+    user, token = user_and_token
+    good = [
+        {"type": "header", "format": "campaign", "version": 1},
+        {"type": "character", "data": {"id": 1, "name": "Uno", "race": "Humano", "goal": "g", "background": "b"}},
+        {"type": "character", "data": {"id": 2, "name": "Dos", "race": "Humano", "goal": "g", "background": "b"}},
+        {"type": "journal_entry", "data": {"id": 1, "character_id": 1, "content": "Primera",
+                                           "created_at": "2024-01-01T10:00:00"}},
+    ]
+    broken = good + [{"type": "journal_entry", "data": {"id": 2, "character_id": 99, "content": "Huérfana"}}]
+    ndjson = lambda records: ''.join(json.dumps(record) + '\n' for record in records).encode('utf-8')
+
+    res = _import(client, token, ndjson(broken), chunk_size=2)
+    assert res.status_code == 400
+    job = res.get_json()["job"]
+    assert job["status"] == "failed" and "99" in job["error"]
+    assert job["records_committed"] == 4
+
+    fixed = good + [{"type": "journal_entry", "data": {"id": 2, "character_id": 2, "content": "Recuperada"}},
+                    {"type": "footer", "counts": {"character": 2, "journal_entry": 2}}]
+    res = _import(client, token, ndjson(fixed), chunk_size=2, job_id=job["id"])
+    assert res.status_code == 201
+    job = res.get_json()["job"]
+    assert (job["status"], job["characters"], job["children"], job["error"]) == ("completed", 2, 2, None)
+
+    characters = client.get('/api/character?include=journal_entries', headers={"Authorization": f"Bearer {token}"}).get_json()["characters"]
+    assert [(c["name"], [j["content"] for j in c["journal_entries"]]) for c in characters] == \
+        [("Uno", ["Primera"]), ("Dos", ["Recuperada"])]
+    assert _import(client, token, ndjson(fixed), job_id=job["id"]).status_code == 409
+
+def test_import_validation(client, user_and_token):
+    user, token = user_and_token
+    assert _import(client, token, b'{"type": "dragon", "data": {}}\n').status_code == 400
+    assert _import(client, token, b'{"type": "header", "format": "campaign", "version": 99}\n').status_code == 400
+    assert _import(client, token, b'[{"type": "footer"}').status_code == 400
+    assert _import(client, token, b'', chunk_size=0).status_code == 400
+    assert _import(client, token, b'', job_id=999).status_code == 404
+
+def test_import_rejects_record_without_data(client, user_and_token):
+    user, token = user_and_token
+    res = _import(client, token, b'{"type": "character"}\n')
+    assert res.status_code == 400
+    assert res.get_json()["job"]["status"] == "failed"
+
+def test_import_truncated_gzip(client, user_and_token):
+    user, token = user_and_token
+    _create_campaign(client, token)
+    archive = client.get('/api/export?gzip=1', headers={"Authorization": f"Bearer {token}"}).data
+
+    for body in (archive[:len(archive) // 2], archive[:12]):
+        res = _import(client, token, body)
+        assert res.status_code == 400
+        assert res.get_json()["job"]["status"] == "failed"
+
+def test_import_truncated_at_line_boundary_can_be_resumed(client, user_and_token, other_token):
+    user, token = user_and_token
+    _create_campaign(client, token)
+    archive = client.get('/api/export', headers={"Authorization": f"Bearer {token}"}).data
+    lines = archive.splitlines(keepends=True)
+
+    res = _import(client, other_token, b''.join(lines[:-3]), chunk_size=2)
+    assert res.status_code == 400
+    job = res.get_json()["job"]
+    assert job["status"] == "failed" and "incompleto" in job["error"]
+
+    res = _import(client, other_token, archive, chunk_size=2, job_id=job["id"])
+    assert res.status_code == 201
+    job = res.get_json()["job"]
+    assert (job["characters"], job["children"], job["relationships"]) == (2, 6, 1)
+
+def test_import_requires_header_and_matching_footer(client, user_and_token):
+    user, token = user_and_token
+    character = {"type": "character", "data": {"id": 1, "name": "Uno", "race": "Humano", "goal": "g", "background": "b"}}
+    header = {"type": "header", "format": "campaign", "version": 1}
+    ndjson = lambda records: ''.join(json.dumps(record) + '\n' for record in records).encode('utf-8')
+
+    res = _import(client, token, ndjson([character, {"type": "footer", "counts": {"character": 1}}]))
+    assert res.status_code == 400 and "cabecera" in res.get_json()["job"]["error"]
+    res = _import(client, token, ndjson([header, character, {"type": "footer", "counts": {"character": 2}}]))
+    assert res.status_code == 400 and res.get_json()["job"]["characters"] == 0
+    assert client.get('/api/character', headers={"Authorization": f"Bearer {token}"}).get_json()["characters"] == []
+
+def test_import_cli(app, client, user_and_token, tmp_path):
+    user, token = user_and_token
+    _create_campaign(client, token)
+    user_id = db.session.execute(db.select(User.id).filter_by(username=user)).scalar_one()
+    runner = app.test_cli_runner()
+    archive = tmp_path / 'campaign.ndjson.gz'
+    assert runner.invoke(args=['archive', 'export', str(user_id), '--gzip', '-o', str(archive)]).exit_code == 0
+
+    result = runner.invoke(args=['archive', 'import', str(user_id), str(archive), '--chunk-size', '4'])
+    assert result.exit_code == 0, result.output
+    assert 'Bloque 3' in result.output
+    characters = client.get('/api/character', headers={"Authorization": f"Bearer {token}"}).get_json()["characters"]
+    assert [c["name"] for c in characters] == ["Ana", "Bruno", "Ana", "Bruno"]
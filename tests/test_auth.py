@@ -20,3 +20,191 @@ def test_userinfo(client, user_and_token):
     })
     assert res.status_code == 200
     assert "username" in res.get_json()
+
+def test_login_rehashes_when_cost_changes(app, client):
+    from back.models import User
+    from back.auth.passwords import hash_rounds
+    client.post('/api/signup', json={"username": "coste", "email": "coste@example.com", "password": "pass123"})
+    assert hash_rounds(User.query.filter_by(username="coste").one().password_hash) == 4
+
+    app.config["BCRYPT_ROUNDS"] = 5
+    res = client.post('/api/login', json={"login_name": "coste", "password": "pass123"})
+    assert res.status_code == 200
+    assert hash_rounds(User.query.filter_by(username="coste").one().password_hash) == 5
+
+    res = client.post('/api/login', json={"login_name": "coste", "password": "otra"})
+    assert res.status_code == 401
+
+def test_login_skips_rehash_when_hasher_is_busy(app, client, monkeypatch):
+    from back.models import User
+    from back.auth import routes
+    from back.auth.passwords import HasherBusy, hash_rounds
+    client.post('/api/signup', json={"username": "ocupado", "email": "ocupado@example.com", "password": "pass123"})
+
+    def busy(password):
+        raise HasherBusy()
+    monkeypatch.setattr(routes, "hash_password", busy)
+    app.config["BCRYPT_ROUNDS"] = 5
+    res = client.post('/api/login', json={"login_name": "ocupado", "password": "pass123"})
+    assert res.status_code == 200
+    assert "access_token" in res.get_json()
+    assert hash_rounds(User.query.filter_by(username="ocupado").one().password_hash) == 4
+
+def test_login_rejected_when_hasher_is_saturated(app, client):
+    import threading
+    import time
+    app.config["METRICS_ENABLED"] = True
+    client.post('/api/signup', json={"username": "lleno", "email": "lleno@example.com", "password": "pass123"})
+    hasher = app.extensions['password_hasher']
+    release = threading.Event()
+    blockers = [threading.Thread(target=hasher.run, args=(release.wait,))
+                for _ in range(hasher.workers + hasher.max_queue)]
+    for blocker in blockers:
+        blocker.start()
+    try:
+        while hasher.pending < hasher.workers + hasher.max_queue:
+            time.sleep(0.001)
+        res = client.post('/api/login', json={"login_name": "lleno", "password": "pass123"})
+        assert res.status_code == 503
+        assert res.headers["Retry-After"] == "1"
+        stats = client.get('/api/metrics').get_json()["password_hasher"]
+        assert stats["queue_depth"] == hasher.max_queue and stats["rejected"] == 1
+    finally:
+        release.set()
+        for blocker in blockers:
+            blocker.join()
+
+    assert client.post('/api/login', json={"login_name": "lleno", "password": "pass123"}).status_code == 200
+
+def test_login_throttled_by_login_name(client, count_queries):
+    client.post('/api/signup', json={"username": "victima", "email": "victima@example.com", "password": "pass123"})
+    for _ in range(5):
+        res = client.post('/api/login', json={"login_name": "victima", "password": "mala"})
+        assert res.status_code == 401
+
+    with count_queries() as statements:
+        res = client.post('/api/login', json={"login_name": " VICTIMA ", "password": "pass123"})
+    assert res.status_code == 429
+    assert int(res.headers["Retry-After"]) >= 1
+    assert statements == []
+
+    res = client.post('/api/login', json={"login_name": "otro", "password": "x"})
+    assert res.status_code == 401
+
+def test_login_throttled_by_ip_and_reset_on_success(app, client):
+    app.config["LOGIN_THROTTLE_IP"] = (3, 60)
+    app.config["METRICS_ENABLED"] = True
+    client.post('/api/signup', json={"username": "ip", "email": "ip@example.com", "password": "pass123"})
+    throttle = app.extensions['login_throttle']
+
+    assert client.post('/api/login', json={"login_name": "ip", "password": "mala"}).status_code == 401
+    assert client.post('/api/login', json={"login_name": "ip", "password": "pass123"}).status_code == 200
+    assert throttle.store.take('login:ip', 5, 300) == 0 and throttle.store.stats()['buckets'] == 2
+    assert client.post('/api/login', json={"login_name": "nadie", "password": "x"}).status_code == 401
+    res = client.post('/api/login', json={"login_name": "ip", "password": "pass123"})
+    assert res.status_code == 429
+    assert client.get('/api/metrics').get_json()["login_throttle"]["rejected"] == 1
+
+def test_login_throttle_uses_forwarded_ip_behind_proxy(monkeypatch):
+    from back import create_app, db
+    from back.config import Config
+    monkeypatch.setattr(Config, "PROXY_FIX_X_FOR", 1)
+    app = create_app()
+    app.config.update({"TESTING": True, "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+                       "LOGIN_THROTTLE_IP": (1, 60)})
+    with app.app_context():
+        db.create_all()
+        client = app.test_client()
+        login = lambda ip: client.post('/api/login', json={"login_name": "nadie", "password": "x"},
+                                       headers={"X-Forwarded-For": ip}).status_code
+        assert login("203.0.113.1") == 401
+        assert login("203.0.113.1") == 429
+        # Mismo proxy, otro cliente: su cubeta es distinta
+        assert login("203.0.113.2") == 401
+        db.session.remove()
+        db.drop_all()
+
+def test_memory_bucket_store_evicts_least_recent():
+    from back.auth.throttle import MemoryBucketStore
+    store = MemoryBucketStore(max_keys=2)
+    assert store.take('a', 1, 60) == 0
+    assert store.take('a', 1, 60) > 0
+    store.take('b', 1, 60)
+    store.take('c', 1, 60)
+    assert store.stats() == {'buckets': 2, 'max_keys': 2, 'evictions': 1}
+    assert store.take('a', 1, 60) == 0
+
+def test_serve_requires_shared_throttle_store_for_several_workers():
+    import pytest
+    from back.config import Config
+    from back.serve import server_options
+
+    several = type('SeveralWorkers', (Config,), {'SERVER_WORKERS': 4})
+    with pytest.raises(RuntimeError):
+        server_options(several)
+    shared = type('SharedStore', (several,), {'LOGIN_THROTTLE_STORE': 'tests.test_auth:_shared_store'})
+    assert server_options(shared)['workers'] == 4
+
+def _shared_store(app):
+    from back.auth.throttle import MemoryBucketStore
+    return MemoryBucketStore(app.config['LOGIN_THROTTLE_MAX_KEYS'])
+
+def test_userinfo_served_from_identity_cache(app, client, user_and_token, count_queries):
+    from back.models import db, User
+    _, token = user_and_token
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get('/api/userinfo', headers=headers).get_json()["username"] == "testuser"
+
+    with count_queries() as statements:
+        res = client.get('/api/userinfo', headers=headers)
+    assert res.get_json()["email"] == "test@example.com"
+    assert statements == []
+
+    User.query.filter_by(username="testuser").one().email = "nuevo@example.com"
+    db.session.commit()
+    assert client.get('/api/userinfo', headers=headers).get_json()["email"] == "nuevo@example.com"
+
+def test_logout_revokes_access_and_refresh_tokens(app, client):
+    client.post('/api/signup', json={"username": "salida", "email": "salida@example.com", "password": "pass123"})
+    tokens = client.post('/api/login', json={"login_name": "salida", "password": "pass123"}).get_json()
+    access = {"Authorization": f"Bearer {tokens['access_token']}"}
+    refresh = {"Authorization": f"Bearer {tokens['refresh_token']}"}
+    assert client.get('/api/userinfo', headers=access).status_code == 200
+
+    res = client.post('/api/logout', json={"refresh_token": tokens["refresh_token"]}, headers=access)
+    assert res.status_code == 200
+    assert res.get_json()["revoked"] == ["access", "refresh"]
+    assert client.get('/api/userinfo', headers=access).status_code == 401
+    assert client.post('/api/refresh', headers=refresh).status_code == 401
+
+    # Otro worker (otra lista en memoria) recupera las revocaciones de la tabla
+    from back.auth.revocation import Denylist
+    from flask_jwt_extended import decode_token
+    other_worker = Denylist(1024, 3, sync_interval=30)
+    assert other_worker.is_revoked(decode_token(tokens["refresh_token"])["jti"])
+    assert not other_worker.is_revoked("otro-jti")
+
+def test_logout_rejects_foreign_refresh_token(client, user_and_token, other_token):
+    _, token = user_and_token
+    client.post('/api/signup', json={"username": "ajeno", "email": "ajeno@example.com", "password": "pass123"})
+    foreign = client.post('/api/login', json={"login_name": "ajeno", "password": "pass123"}).get_json()["refresh_token"]
+    res = client.post('/api/logout', json={"refresh_token": foreign}, headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 403
+    assert client.get('/api/userinfo', headers={"Authorization": f"Bearer {token}"}).status_code == 200
+
+def test_logout_rejects_malformed_body(client, user_and_token):
+    _, token = user_and_token
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.post('/api/logout', json=["refresh_token"], headers=headers).status_code == 400
+    assert client.post('/api/logout', json={"refresh_token": 1}, headers=headers).status_code == 400
+    # Nada se revocó: el token sigue siendo válido
+    assert client.get('/api/userinfo', headers=headers).status_code == 200
+
+def test_bloom_filter_has_no_false_negatives():
+    from back.auth.revocation import BloomFilter
+    bloom = BloomFilter(4096, 5)
+    keys = [f"jti-{index}" for index in range(200)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+    assert sum(f"otro-{index}" in bloom for index in range(1000)) < 50
@@ -14,6 +14,37 @@ def test_create_character(client, user_and_token):
     print(res.status_code, res.get_json())
     assert "character_id" in data
 
+def test_create_character_single_insert(client, user_and_token, count_queries):
+    user, token = user_and_token
+    headers = {"Authorization": f"Bearer {token}"}
+    with count_queries() as statements:
+        res = client.post('/api/character', json={
+            "name": "Compacto", "race": "Enano", "goal": "-", "background": "-",
+            "stats": {"FUE": 2, "MEN": -1}
+        }, headers=headers)
+    assert res.status_code == 201
+    assert len([s for s in statements if s.startswith('INSERT')]) == 1
+    cid = res.get_json()["character_id"]
+
+    res = client.get(f'/api/character/{cid}?fields=name&include=stats', headers=headers)
+    character = res.get_json()["character"]
+    base = (cid - 1) * 4
+    assert character["stats"] == [
+        {"id": base + 1, "name": "FUE", "value": 2, "character_id": cid},
+        {"id": base + 2, "name": "AGI", "value": 0, "character_id": cid},
+        {"id": base + 3, "name": "MEN", "value": -1, "character_id": cid},
+        {"id": base + 4, "name": "CAR", "value": 0, "character_id": cid},
+    ]
+    assert "stat_fue" not in character
+
+def test_create_character_rejects_unknown_stats(client, user_and_token):
+    user, token = user_and_token
+    res = client.post('/api/character', json={
+        "name": "Raro", "race": "Elfo", "goal": "-", "background": "-", "stats": {"INT": 3}
+    }, headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 400
+    assert "INT" in res.get_json()["error"]
+
 def test_get_characters(client, user_and_token):
     user, token = user_and_token
     res = client.get('/api/character', headers={"Authorization": f"Bearer {token}"})
@@ -49,3 +80,197 @@ def test_delete_character(client, user_and_token):
     delete = client.delete(f'/api/character/{cid}', headers={"Authorization": f"Bearer {token}"})
     assert delete.status_code == 200
     assert delete.get_json()["character_id"] == cid
+
+def _create_full_character(client, token, name):
+    headers = {"Authorization": f"Bearer {token}"}
+    cid = client.post('/api/character', json={
+        "name": name,
+        "race": "Humano",
+        "goal": "Ser leyenda",
+        "background": "Vendedor carismático",
+        "stats": {"FUE": 2, "AGI": 1, "MEN": -1, "CAR": 3}
+    }, headers=headers).get_json()["character_id"]
+    client.post('/api/spell', json={"character_id": cid, "name": "Luz", "type": "Utilidad",
+                                    "description": "Ilumina", "uses": 1, "uses_max": 1}, headers=headers)
+    client.post('/api/ability', json={"character_id": cid, "name": "Golpe", "description": "Fuerte",
+                                      "uses_per_session": 1}, headers=headers)
+    client.post('/api/inventory', json={"character_id": cid, "item": "Espada", "description": "Afilada"}, headers=headers)
+    client.post('/api/journal', json={"character_id": cid, "content": "Día uno"}, headers=headers)
+    client.post('/api/decision', json={"character_id": cid, "description": "Ir al norte"}, headers=headers)
+    client.post('/api/condition', json={"character_id": cid, "name": "Cansado", "description": "-1"}, headers=headers)
+    return cid
+
+def test_get_characters_query_count_is_constant(client, user_and_token, count_queries):
+    user, token = user_and_token
+    headers = {"Authorization": f"Bearer {token}"}
+    first = _create_full_character(client, token, "Uno")
+
+    with count_queries() as single:
+        res = client.get('/api/character', headers=headers)
+    assert res.status_code == 200
+
+    for i in range(5):
+        other = _create_full_character(client, token, f"Otro {i}")
+        client.post('/api/relationship', json={"source_id": first, "target_id": other,
+                                               "relation_type": "Amistad"}, headers=headers)
+
+    with count_queries() as many:
+        res = client.get('/api/character', headers=headers)
+    characters = res.get_json()["characters"]
+    assert len(characters) == 6
+    assert all(len(c["stats"]) == 4 and len(c["spells"]) == 1 for c in characters)
+    assert len({s["id"] for c in characters for s in c["stats"]}) == 24
+    assert len(single) == len(many)
+
+def test_get_character_loads_sheet_eagerly(client, user_and_token, count_queries):
+    user, token = user_and_token
+    cid = _create_full_character(client, token, "Uno")
+
+    with count_queries() as statements:
+        res = client.get(f'/api/character/{cid}', headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 200
+    character = res.get_json()["character"]
+    assert character["journal_entries"][0]["content"] == "Día uno"
+    assert character["user"]["username"] == "testuser"
+    assert "password_hash" not in character["user"]
+    # versión para el ETag + personaje + una consulta por relación
+    assert len(statements) <= 12, statements
+
+def test_get_characters_sparse_fieldset(client, user_and_token, count_queries):
+    user, token = user_and_token
+    _create_full_character(client, token, "Ligero")
+
+    with count_queries() as statements:
+        res = client.get('/api/character?fields=name,race,level,health_current,mana_current&include=',
+                         headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 200
+    character = res.get_json()["characters"][0]
+    assert set(character) == {"id", "name", "race", "level", "health_current", "mana_current"}
+    assert len(statements) == 2
+    assert "background" not in statements[-1]
+
+def test_get_character_include_selects_relationships(client, user_and_token, count_queries):
+    user, token = user_and_token
+    cid = _create_full_character(client, token, "Selectivo")
+
+    with count_queries() as statements:
+        res = client.get(f'/api/character/{cid}?include=stats,spells',
+                         headers={"Authorization": f"Bearer {token}"})
+    character = res.get_json()["character"]
+    assert len(character["stats"]) == 4
+    assert len(character["spells"]) == 1
+    assert "journal_entries" not in character
+    assert character["background"] == "Vendedor carismático"
+    assert len(statements) == 3
+
+def test_get_character_rejects_unknown_fields(client, user_and_token):
+    user, token = user_and_token
+    headers = {"Authorization": f"Bearer {token}"}
+    res = client.get('/api/character?fields=name,password_hash', headers=headers)
+    assert res.status_code == 400
+    res = client.get('/api/character?include=secrets', headers=headers)
+    assert res.status_code == 400
+
+def test_get_character_etag_and_not_modified(client, user_and_token, count_queries):
+    user, token = user_and_token
+    headers = {"Authorization": f"Bearer {token}"}
+    cid = _create_full_character(client, token, "Versionado")
+
+    res = client.get(f'/api/character/{cid}', headers=headers)
+    etag = res.headers["ETag"]
+    assert res.get_json()["character"]["version"] >= 1
+
+    with count_queries() as statements:
+        cached = client.get(f'/api/character/{cid}', headers={**headers, "If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["ETag"] == etag
+    assert len(statements) == 1
+
+    sparse = client.get(f'/api/character/{cid}?fields=name', headers={**headers, "If-None-Match": etag})
+    assert sparse.status_code == 200
+    assert sparse.headers["ETag"] != etag
+
+    client.post('/api/inventory', json={"character_id": cid, "item": "Escudo", "description": "Roble"}, headers=headers)
+    changed = client.get(f'/api/character/{cid}', headers={**headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+def test_get_characters_list_etag(client, user_and_token):
+    user, token = user_and_token
+    headers = {"Authorization": f"Bearer {token}"}
+    cid = _create_full_character(client, token, "Listado")
+
+    etag = client.get('/api/character', headers=headers).headers["ETag"]
+    assert client.get('/api/character', headers={**headers, "If-None-Match": etag}).status_code == 304
+
+    client.post('/api/journal', json={"character_id": cid, "content": "Nueva página"}, headers=headers)
+    assert client.get('/api/character', headers={**headers, "If-None-Match": etag}).status_code == 200
+
+def test_update_character_if_match(client, user_and_token):
+    user, token = user_and_token
+    headers = {"Authorization": f"Bearer {token}"}
+    cid = _create_full_character(client, token, "Concurrente")
+    etag = client.get(f'/api/character/{cid}', headers=headers).headers["ETag"]
+
+    first = client.put(f'/api/character/{cid}', json={"level": 2}, headers={**headers, "If-Match": etag})
+    assert first.status_code == 200
+    assert first.headers["ETag"] != etag
+
+    stale = client.put(f'/api/character/{cid}', json={"level": 3}, headers={**headers, "If-Match": etag})
+    assert stale.status_code == 412
+
+    fresh = client.put(f'/api/character/{cid}', json={"level": 3},
+                       headers={**headers, "If-Match": first.headers["ETag"]})
+    assert fresh.status_code == 200
+    assert client.get(f'/api/character/{cid}', headers=headers).get_json()["character"]["level"] == 3
+
+def _wear_down(client, headers, cid):
+    sid = client.post('/api/spell', json={"character_id": cid, "name": "Rayo", "type": "Ofensivo",
+                                          "description": "Daño", "uses": 1, "uses_max": 3}, headers=headers).get_json()["spell_id"]
+    client.post('/api/ability', json={"character_id": cid, "name": "Furia", "description": "+2",
+                                      "uses_per_session": 1, "used": True}, headers=headers)
+    client.post('/api/condition', json={"character_id": cid, "name": "Herido", "description": "-1"}, headers=headers)
+    client.post('/api/condition', json={"character_id": cid, "name": "Maldito", "description": "Permanente",
+                                        "temporary": False}, headers=headers)
+    client.put(f'/api/character/{cid}', json={"health_current": 1, "mana_current": 0}, headers=headers)
+    return sid
+
+def test_long_rest_single_character(client, user_and_token, count_queries):
+    user, token = user_and_token
+    headers = {"Authorization": f"Bearer {token}"}
+    cid = _create_full_character(client, token, "Agotado")
+    _wear_down(client, headers, cid)
+
+    with count_queries() as statements:
+        res = client.post(f'/api/character/{cid}/rest', headers=headers)
+    assert res.status_code == 200
+    assert res.get_json()["affected"] == {"characters": 1, "spells": 1, "abilities": 1, "conditions": 2}
+    assert not any(s.startswith('SELECT spells') or s.startswith('SELECT abilities') for s in statements)
+
+    sheet = client.get(f'/api/character/{cid}', headers=headers).get_json()["character"]
+    assert sheet["health_current"] == sheet["health_max"]
+    assert sheet["mana_current"] == sheet["mana_max"]
+    assert all(s["uses"] == s["uses_max"] for s in sheet["spells"])
+    assert not any(a["used"] for a in sheet["abilities"])
+    assert [c["name"] for c in sheet["conditions"]] == ["Maldito"]
+
+def test_long_rest_party(client, user_and_token, other_token):
+    user, token = user_and_token
+    headers = {"Authorization": f"Bearer {token}"}
+    other_headers = {"Authorization": f"Bearer {other_token}"}
+    first = _create_full_character(client, token, "Primero")
+    second = _create_full_character(client, token, "Segundo")
+    for cid in (first, second):
+        _wear_down(client, headers, cid)
+    outsider = client.post('/api/character', json={"name": "Ajeno", "race": "Orco", "goal": "-",
+                                                   "background": "-"}, headers=other_headers).get_json()["character_id"]
+    _wear_down(client, other_headers, outsider)
+
+    res = client.post('/api/character/rest', headers=headers)
+    assert res.status_code == 200
+    assert res.get_json()["affected"]["characters"] == 2
+    assert res.get_json()["affected"]["spells"] == 2
+
+    other_sheet = client.get(f'/api/character/{outsider}', headers=other_headers).get_json()["character"]
+    assert other_sheet["health_current"] == 1
+    assert client.post(f'/api/character/{outsider}/rest', headers=headers).status_code == 404
@@ -54,3 +54,25 @@ def test_delete_condition(client, user_and_token):
     res = client.delete(f'/api/condition/{condition_id}', headers={"Authorization": f"Bearer {token}"})
     assert res.status_code == 200
     assert res.get_json()["condition_id"] == condition_id
+
+def test_bulk_create_conditions(client, user_and_token):
+    user, token = user_and_token
+    headers = {"Authorization": f"Bearer {token}"}
+    cid = client.post('/api/character', json={
+        "name": "Maldito",
+        "race": "Humano",
+        "goal": "Curarse",
+        "background": "Viajero",
+        "stats": {"FUE": 1, "AGI": 1, "MEN": 1, "CAR": 1}
+    }, headers=headers).get_json()["character_id"]
+
+    res = client.post('/api/condition/bulk', json=[
+        {"character_id": cid, "name": "Envenenado", "description": "-1 FUE"},
+        {"character_id": cid, "name": "Maldición", "description": "Permanente", "temporary": False}
+    ], headers=headers)
+    assert res.status_code == 201
+    conditions = client.get(f'/api/condition/{cid}', headers=headers).get_json()["conditions"]
+    assert sorted(c["temporary"] for c in conditions) == [False, True]
+
+    res = client.post('/api/condition/bulk', json={"character_id": cid}, headers=headers)
+    assert res.status_code == 400
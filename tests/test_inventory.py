@@ -79,3 +79,77 @@ def test_delete_inventory_item(client, user_and_token):
     res = client.delete(f'/api/inventory/{iid}', headers={"Authorization": f"Bearer {token}"})
     assert res.status_code == 200
     assert res.get_json()["item_id"] == iid
+
+def test_inventory_ownership_single_query(client, user_and_token, other_token, count_queries):
+    user, token = user_and_token
+    character = client.post('/api/character', json={
+        "name": "Celoso",
+        "race": "Enano",
+        "goal": "Guardar su oro",
+        "background": "Minero",
+        "stats": {"FUE": 2, "AGI": 0, "MEN": 0, "CAR": 0}
+    }, headers={"Authorization": f"Bearer {token}"})
+    character_id = character.get_json()["character_id"]
+    item_id = client.post('/api/inventory', json={
+        "character_id": character_id,
+        "item": "Bolsa de oro",
+        "description": "Pesada"
+    }, headers={"Authorization": f"Bearer {token}"}).get_json()["item_id"]
+
+    res = client.delete(f'/api/inventory/{item_id}', headers={"Authorization": f"Bearer {other_token}"})
+    assert res.status_code == 403
+    res = client.delete('/api/inventory/9999', headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 404
+
+    with count_queries() as statements:
+        res = client.delete(f'/api/inventory/{item_id}', headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 200
+    assert len([s for s in statements if s.startswith('SELECT')]) == 1
+
+def test_bulk_inventory_import(client, user_and_token, count_queries):
+    user, token = user_and_token
+    headers = {"Authorization": f"Bearer {token}"}
+    character_id = client.post('/api/character', json={
+        "name": "Acumulador",
+        "race": "Mediano",
+        "goal": "Tenerlo todo",
+        "background": "Coleccionista",
+        "stats": {"FUE": 0, "AGI": 1, "MEN": 1, "CAR": 1}
+    }, headers=headers).get_json()["character_id"]
+
+    items = [{"character_id": character_id, "item": f"Objeto {i}", "description": "Importado",
+              "magical": i % 2 == 0} for i in range(100)]
+    with count_queries() as statements:
+        res = client.post('/api/inventory/bulk', json=items, headers=headers)
+    assert res.status_code == 201
+    item_ids = res.get_json()["item_ids"]
+    assert len(item_ids) == 100
+    assert len([s for s in statements if s.startswith('INSERT')]) == 1
+
+    listed = client.get(f'/api/inventory/{character_id}', headers=headers).get_json()["items"]
+    by_id = {item["id"]: item for item in listed}
+    assert [by_id[i]["item"] for i in item_ids] == [f"Objeto {i}" for i in range(100)]
+
+def test_bulk_inventory_rejects_invalid_batch(client, user_and_token, other_token):
+    user, token = user_and_token
+    headers = {"Authorization": f"Bearer {token}"}
+    character_id = client.post('/api/character', json={
+        "name": "Desordenado",
+        "race": "Humano",
+        "goal": "Ordenar",
+        "background": "Buhonero",
+        "stats": {"FUE": 0, "AGI": 1, "MEN": 1, "CAR": 1}
+    }, headers=headers).get_json()["character_id"]
+
+    res = client.post('/api/inventory/bulk', json=[
+        {"character_id": character_id, "item": "Cuerda", "description": "10 m"},
+        {"character_id": character_id, "item": "Antorcha"}
+    ], headers=headers)
+    assert res.status_code == 400
+    assert "Elemento 1" in res.get_json()["error"]
+
+    res = client.post('/api/inventory/bulk', json=[
+        {"character_id": character_id, "item": "Cuerda", "description": "10 m"}
+    ], headers={"Authorization": f"Bearer {other_token}"})
+    assert res.status_code == 404
+    assert client.get(f'/api/inventory/{character_id}', headers=headers).get_json()["items"] == []
@@ -51,3 +51,293 @@ def test_roll_invalid_stat(client, user_and_token):
                       headers={"Authorization": f"Bearer {token}"})
     assert roll.status_code == 400
     assert "no encontrada" in roll.get_json()["error"]
+
+
+def test_roll_batch_expressions(client, user_and_token):
+    user, token = user_and_token
+    res = client.post('/api/character', json={
+        "name": "Tahúr",
+        "race": "Mediano",
+        "goal": "Ganar apuestas",
+        "background": "Jugador",
+        "stats": {"FUE": 3, "AGI": 2, "MEN": 0, "CAR": 1}
+    }, headers={"Authorization": f"Bearer {token}"})
+    cid = res.get_json()["character_id"]
+
+    roll = client.post('/api/roll/batch', json={"character_id": cid, "rolls": [
+        {"expression": "2d6+FUE", "count": 50},
+        {"expression": "adv + agi", "difficulty": 10},
+        {"expression": "4d6kh3"},
+        {"expression": "1d6!", "count": 1000}
+    ]}, headers={"Authorization": f"Bearer {token}"})
+    assert roll.status_code == 200
+    results = roll.get_json()["results"]
+    assert all(5 <= total <= 15 for total in results[0]["totals"])
+    assert results[0]["resolved"] == "2d6+3"
+    assert results[1]["expression"] == "2d20kh1+AGI"
+    assert results[1]["successes"] in (0, 1)
+    assert len(results[2]["detail"][0]["rolls"]) == 4
+    assert len(results[2]["detail"][0]["kept"]) == 3
+    assert max(results[3]["totals"]) > 6
+
+
+def test_roll_batch_is_reproducible_with_seed(client, user_and_token):
+    user, token = user_and_token
+    headers = {"Authorization": f"Bearer {token}"}
+    body = {"seed": 1234, "rolls": [{"expression": "3d8+2", "count": 20}, {"expression": "dis"}]}
+    first = client.post('/api/roll/batch', json=body, headers=headers).get_json()
+    second = client.post('/api/roll/batch', json=body, headers=headers).get_json()
+    assert first["seed"] == 1234
+    assert first["results"] == second["results"]
+
+    unseeded = client.post('/api/roll/batch', json={"rolls": [{"expression": "1d20"}]}, headers=headers).get_json()
+    replay = client.post('/api/roll/batch', json={"seed": unseeded["seed"], "rolls": [{"expression": "1d20"}]},
+                         headers=headers)
+    assert replay.get_json()["results"] == unseeded["results"]
+
+
+def test_roll_batch_invalid_expression(client, user_and_token, other_token):
+    user, token = user_and_token
+    headers = {"Authorization": f"Bearer {token}"}
+    res = client.post('/api/roll/batch', json={"rolls": [{"expression": "2d6++1"}]}, headers=headers)
+    assert res.status_code == 400
+    res = client.post('/api/roll/batch', json={"rolls": [{"expression": "1d20+FUE"}]}, headers=headers)
+    assert res.status_code == 404
+    res = client.post('/api/roll/batch', json={"rolls": [{"expression": "1d20", "count": 10 ** 7}]}, headers=headers)
+    assert res.status_code == 400
+    assert client.post('/api/roll/batch', json=[1], headers=headers).status_code == 400
+    assert client.post('/api/roll/batch', json={"rolls": [{"expression": "1d20"}]}).status_code == 401
+    # Límites de trabajo: dados por petición, términos por expresión y tamaño de las constantes
+    many_dice = "+".join(["100d1000!"] * 10)
+    res = client.post('/api/roll/batch', json={"rolls": [{"expression": many_dice, "count": 100_000}]}, headers=headers)
+    assert res.status_code == 400 and "dados" in res.get_json()["error"]
+    res = client.post('/api/roll/batch', json={"rolls": [{"expression": "+".join(["1d6"] * 21)}]}, headers=headers)
+    assert res.status_code == 400
+    res = client.post('/api/roll/batch', json={"rolls": [{"expression": "1d20+99999999999999999999"}]}, headers=headers)
+    assert res.status_code == 400
+    res = client.post('/api/roll/batch', json={"rolls": [{"expression": "1d20", "count": True}]}, headers=headers)
+    assert res.status_code == 400
+
+    cid = client.post('/api/character', json={
+        "name": "Ajeno", "race": "Orco", "goal": "-", "background": "-",
+        "stats": {"FUE": 3, "AGI": 0, "MEN": 0, "CAR": 0}
+    }, headers={"Authorization": f"Bearer {other_token}"}).get_json()["character_id"]
+    res = client.post('/api/roll/batch', json={"character_id": cid, "rolls": [{"expression": "1d20+FUE"}]},
+                      headers=headers)
+    assert res.status_code == 404
+
+
+def test_roll_odds_against_difficulty(client, user_and_token):
+    user, token = user_and_token
+    res = client.post('/api/character', json={
+        "name": "Calculador",
+        "race": "Gnomo",
+        "goal": "Conocer sus opciones",
+        "background": "Matemático",
+        "stats": {"FUE": 0, "AGI": 2, "MEN": 3, "CAR": 0}
+    }, headers={"Authorization": f"Bearer {token}"})
+    cid = res.get_json()["character_id"]
+
+    odds = client.get(f'/api/roll/odds?character_id={cid}&stat=agi&difficulty=14',
+                      headers={"Authorization": f"Bearer {token}"})
+    assert odds.status_code == 200
+    result = odds.get_json()["result"]
+    assert result["resolved"] == "1d20+2"
+    assert abs(result["success_probability"] - 0.45) < 1e-9
+    assert result["min"] == 3 and result["max"] == 22
+    assert abs(sum(p for _, p in result["pmf"]) - 1) < 1e-9
+    assert result["percentiles"]["p50"] == 12
+
+
+def test_roll_odds_expressions(client, user_and_token):
+    user, token = user_and_token
+    headers = {"Authorization": f"Bearer {token}"}
+    advantage = client.get('/api/roll/odds?expression=adv&difficulty=20', headers=headers).get_json()["result"]
+    assert abs(advantage["success_probability"] - (1 - (19 / 20) ** 2)) < 1e-9
+
+    stats = client.get('/api/roll/odds?expression=4d6kh3', headers=headers).get_json()["result"]
+    assert abs(stats["mean"] - 12.2446) < 1e-3
+
+    exploding = client.get('/api/roll/odds?expression=1d6!', headers=headers).get_json()["result"]
+    assert abs(exploding["mean"] - 4.2) < 1e-6
+
+
+def test_roll_odds_rejects_large_expressions_before_computing(client, user_and_token, monkeypatch):
+    from back.misc import dice
+    user, token = user_and_token
+    headers = {"Authorization": f"Bearer {token}"}
+
+    def no_work(*args):
+        raise AssertionError("no debería llegar a convolucionar")
+    monkeypatch.setattr(dice, "_convolve", no_work)
+    expression = "10d1000%2B10d1000%2B2d1000"
+    assert client.get(f'/api/roll/odds?expression={expression}', headers=headers).status_code == 400
+
+def test_roll_odds_caches_only_small_distributions(client, user_and_token):
+    from back.misc.dice import odds_cache_info
+    user, token = user_and_token
+    headers = {"Authorization": f"Bearer {token}"}
+    before = odds_cache_info().currsize
+
+    large = client.get('/api/roll/odds?expression=10d1000', headers=headers).get_json()["result"]
+    assert (large["min"], large["max"]) == (10, 10000)
+    assert "pmf" not in large
+    assert odds_cache_info().currsize == before
+    client.get('/api/roll/odds?expression=3d17', headers=headers)
+    assert odds_cache_info().currsize == before + 1
+
+def test_roll_odds_errors(client, user_and_token, other_token):
+    user, token = user_and_token
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get('/api/roll/odds?expression=1d20%2BFUE', headers=headers).status_code == 404
+    assert client.get('/api/roll/odds?expression=1d', headers=headers).status_code == 400
+    assert client.get('/api/roll/odds?expression=100d1000kh50', headers=headers).status_code == 400
+    assert client.get('/api/roll/odds?expression=100d1000', headers=headers).status_code == 400
+    assert client.get('/api/roll/odds?expression=1d20').status_code == 401
+
+    cid = client.post('/api/character', json={
+        "name": "Ajeno", "race": "Orco", "goal": "-", "background": "-",
+        "stats": {"FUE": 3, "AGI": 0, "MEN": 0, "CAR": 0}
+    }, headers={"Authorization": f"Bearer {other_token}"}).get_json()["character_id"]
+    assert client.get(f'/api/roll/odds?character_id={cid}&stat=FUE', headers=headers).status_code == 404
+
+
+def _party(client, token):
+    ids = []
+    for name, agi in (("Explorador", 2), ("Bardo", 0)):
+        res = client.post('/api/character', json={
+            "name": name,
+            "race": "Humano",
+            "goal": "Sobrevivir al encuentro",
+            "background": "Aventurero",
+            "stats": {"FUE": 0, "AGI": agi, "MEN": 0, "CAR": 1}
+        }, headers={"Authorization": f"Bearer {token}"})
+        ids.append(res.get_json()["character_id"])
+    return ids
+
+
+def test_roll_simulate_party(client, user_and_token):
+    user, token = user_and_token
+    ids = _party(client, token)
+
+    headers = {"Authorization": f"Bearer {token}"}
+    body = {"character_ids": ids, "stat": "AGI", "difficulties": [12, 30], "trials": 300_000, "seed": 5}
+    res = client.post('/api/roll/simulate', json=body, headers=headers)
+    assert res.status_code == 200
+    result = res.get_json()["result"]
+    scout, bard = result["members"]
+    assert scout["expression"] == "1d20+2"
+    low, high = scout["checks"][0]["ci95"]
+    assert low <= 0.55 <= high
+    assert abs(bard["checks"][0]["rate"] - 0.45) < 0.01
+    assert result["party"]["all_succeed"][1]["successes"] == 0
+    assert abs(result["party"]["any_succeeds"][0]["rate"] - (1 - 0.45 * 0.55)) < 0.01
+
+    assert client.post('/api/roll/simulate', json=body, headers=headers).get_json()["result"] == result
+
+
+def test_roll_simulate_pool_matches_inline(app, client, user_and_token):
+    from back.misc import simulation
+    user, token = user_and_token
+    ids = _party(client, token)
+    headers = {"Authorization": f"Bearer {token}"}
+    body = {"character_ids": ids, "stat": "AGI", "difficulties": [10, 15], "trials": 600_000, "seed": 11}
+
+    app.config["SIMULATION_WORKERS"] = 2
+    inline = client.post('/api/roll/simulate', json=body, headers=headers).get_json()["result"]
+    app.config["SIMULATION_PARALLEL_THRESHOLD"] = 0
+    try:
+        pooled = client.post('/api/roll/simulate', json=body, headers=headers).get_json()["result"]
+        assert simulation._executor is not None
+    finally:
+        simulation.shutdown_executor()
+    assert pooled == inline
+
+def test_roll_simulate_validation(client, user_and_token, other_token):
+    user, token = user_and_token
+    ids = _party(client, token)
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.post('/api/roll/simulate', json={"character_ids": ids, "difficulties": [10]}).status_code == 401
+    res = client.post('/api/roll/simulate', json={"character_ids": [999], "difficulties": [10]}, headers=headers)
+    assert res.status_code == 404
+    res = client.post('/api/roll/simulate', json={"character_ids": ids, "difficulties": [10]},
+                      headers={"Authorization": f"Bearer {other_token}"})
+    assert res.status_code == 404
+    res = client.post('/api/roll/simulate', json={"character_ids": ids, "difficulties": [10], "trials": 0},
+                      headers=headers)
+    assert res.status_code == 400
+    res = client.post('/api/roll/simulate', json={"character_ids": ids, "difficulties": [10], "trials": 5_000_000},
+                      headers=headers)
+    assert res.status_code == 400
+    assert client.post('/api/roll/simulate', json=[1], headers=headers).status_code == 400
+    body = {"character_ids": ids, "difficulties": [10]}
+    assert client.post('/api/roll/simulate', json={**body, "expression": 5}, headers=headers).status_code == 400
+    assert client.post('/api/roll/simulate', json={**body, "stat": ["AGI"]}, headers=headers).status_code == 400
+    res = client.post('/api/roll/simulate', json={**body, "difficulties": list(range(21))}, headers=headers)
+    assert res.status_code == 400
+    # El límite es de trabajo total, no solo de tiradas
+    res = client.post('/api/roll/simulate', json={**body, "trials": 1_000_000, "expression": "10d6",
+                                                  "difficulties": [5, 10, 15]}, headers=headers)
+    assert res.status_code == 400 and "demasiado grande" in res.get_json()["error"]
+
+
+def test_simulate_cli(app, client, user_and_token):
+    user, token = user_and_token
+    ids = _party(client, token)
+
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['misc', 'simulate', '--character', str(ids[0]), '--stat', 'AGI',
+                                 '--difficulty', '10', '--trials', '1000', '--seed', '1'])
+    assert result.exit_code == 0, result.output
+    assert '"trials": 1000' in result.output
+
+    for trials in ('0', '-5', '10000001'):
+        result = runner.invoke(args=['misc', 'simulate', '--character', str(ids[0]), '--difficulty', '10',
+                                     '--trials', trials])
+        assert result.exit_code != 0 and '--trials' in result.output
+
+
+def test_roll_hot_path_uses_stat_cache(app, client, user_and_token, count_queries):
+    from back.models import db, Character
+    _, token = user_and_token
+    headers = {"Authorization": f"Bearer {token}"}
+    cid = client.post('/api/character', json={
+        "name": "Rápido", "race": "Elfo", "goal": "-", "background": "-",
+        "stats": {"FUE": 0, "AGI": 4, "MEN": 1, "CAR": 0}
+    }, headers=headers).get_json()["character_id"]
+
+    client.get(f'/api/roll?character_id={cid}&stat=AGI&difficulty=10')
+    with count_queries() as queries:
+        roll = client.get(f'/api/roll?character_id={cid}&stat=AGI&difficulty=10')
+    assert roll.get_json()["result"]["modifier"] == 4
+    assert queries == []
+
+    with app.app_context():
+        db.session.get(Character, cid).stat_agi = 6
+        db.session.commit()
+    roll = client.get(f'/api/roll?character_id={cid}&stat=AGI&difficulty=10')
+    assert roll.get_json()["result"]["modifier"] == 6
+
+    client.delete(f'/api/character/{cid}', headers=headers)
+    assert client.get(f'/api/roll?character_id={cid}&stat=AGI&difficulty=10').status_code == 404
+
+    app.config["METRICS_ENABLED"] = True
+    stats = client.get('/api/metrics').get_json()["caches"]["stats"]
+    assert stats["hits"] >= 1 and stats["misses"] >= 3
+    assert 0 < stats["hit_rate"] < 1
+
+
+def test_metrics_disabled_by_default(client):
+    assert client.get('/api/metrics').status_code == 404
+
+
+def test_roll_simulate_loads_cold_stats_in_one_query(app, client, user_and_token, count_queries):
+    user, token = user_and_token
+    ids = _party(client, token) + _party(client, token)
+    app.extensions['stat_cache'].clear()
+    with count_queries() as statements:
+        res = client.post('/api/roll/simulate', json={"character_ids": ids, "stat": "AGI", "difficulties": [10],
+                                                      "trials": 1000, "seed": 1},
+                          headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 200
+    assert len([statement for statement in statements if 'stat_fue' in statement]) == 1
@@ -0,0 +1,122 @@
+from sqlalchemy import select
+from back.models import db, User, Character, serialization_plan
+
+def test_serialization_plan_is_cached_and_hides_sensitive_fields(app):
+    plan = serialization_plan(User)
+    assert plan is serialization_plan(User)
+    assert 'password_hash' not in plan.columns
+
+    user = User(username='plan', email='plan@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.commit()
+    data = user.to_dict()
+    assert data['username'] == 'plan'
+    assert 'password_hash' not in data
+
+def test_to_dict_reloads_expired_columns(app):
+    character = Character(name='Plan', race='Elfo', background='-', goal='-')
+    db.session.add(character)
+    db.session.commit()
+    db.session.expire(character)
+
+    data = character.to_dict(include_relationships=True)
+    assert data['name'] == 'Plan'
+    base = (character.id - 1) * 4
+    assert data['stats'] == [{'id': base + position, 'name': name, 'value': 0, 'character_id': character.id}
+                             for position, name in enumerate(('FUE', 'AGI', 'MEN', 'CAR'), 1)]
+    assert 'stat_fue' not in data
+    assert 'user' not in data
+
+def test_to_dict_on_transient_instance(app):
+    data = Character(name='Nuevo').to_dict()
+    assert data['name'] == 'Nuevo'
+    assert data['id'] is None and data['race'] is None
+
+def _query_plan(query):
+    from sqlalchemy import text
+    sql = query.statement.compile(db.engine, compile_kwargs={"literal_binds": True})
+    rows = db.session.execute(text(f"EXPLAIN QUERY PLAN {sql}")).all()
+    return [row[-1] for row in rows]
+
+def test_hot_queries_use_indexes(app):
+    from back.models import (InventoryItem, Ability, Spell, JournalEntry, Decision,
+                             Condition, CharacterRelationship)
+
+    queries = [
+        Character.query.filter_by(user_id=1),
+        Character.query.filter_by(id=1, user_id=1),
+        CharacterRelationship.query.filter_by(source_id=1),
+        CharacterRelationship.query.filter_by(target_id=1),
+        Decision.query.filter_by(character_id=1).order_by(Decision.id.desc()),
+    ]
+    for model in (InventoryItem, Ability, Spell, Condition):
+        queries.append(model.query.filter_by(character_id=1))
+
+    for query in queries:
+        plan = _query_plan(query)
+        assert any('USING' in step and ('INDEX' in step or 'PRIMARY KEY' in step) for step in plan), plan
+        assert not any(step.startswith('SCAN') for step in plan), plan
+
+def test_journal_ordering_uses_composite_index(app):
+    from back.models import JournalEntry
+
+    plan = _query_plan(JournalEntry.query.filter_by(character_id=1).order_by(JournalEntry.created_at.desc()))
+    assert any('ix_journal_entries_character_id_created_at' in step for step in plan), plan
+    assert not any('TEMP B-TREE' in step for step in plan), plan
+
+def test_journal_keyset_page_uses_composite_index(app):
+    from datetime import datetime
+    from sqlalchemy import tuple_
+    from back.models import JournalEntry
+
+    query = (JournalEntry.query.filter_by(character_id=1)
+             .filter(tuple_(JournalEntry.created_at, JournalEntry.id) < tuple_(datetime(2024, 1, 1), 10))
+             .order_by(JournalEntry.created_at.desc(), JournalEntry.id.desc())
+             .limit(50))
+    plan = _query_plan(query)
+    assert any('ix_journal_entries_character_id_created_at' in step and 'created_at<' in step for step in plan), plan
+    assert not any('TEMP B-TREE' in step for step in plan), plan
+
+def test_owned_character_id_checks_database(app, count_queries):
+    from back.utils import owned_character_id
+    user = User(username='dueño', email='owner@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.flush()
+    character = Character(name='Propio', race='Elfo', background='-', goal='-', user_id=user.id)
+    db.session.add(character)
+    db.session.commit()
+    user_id, character_id = user.id, character.id
+
+    with count_queries() as statements:
+        assert owned_character_id(str(user_id), character_id) == character_id
+        assert owned_character_id(str(user_id), str(character_id)) == character_id
+        assert owned_character_id(str(user_id + 1), character_id) is None
+        assert owned_character_id(str(user_id), 'abc') is None
+    assert len(statements) == 3
+
+def test_owned_character_id_ignores_stale_identity_cache(app):
+    from sqlalchemy import delete, insert
+    from back.cache import get_identity
+    from back.utils import owned_character_id
+    user = User(username='antiguo', email='antiguo@example.com', password_hash='x')
+    other = User(username='nuevo', email='nuevo@example.com', password_hash='x')
+    db.session.add_all([user, other])
+    db.session.flush()
+    character = Character(name='Borrado', race='Elfo', background='-', goal='-', user_id=user.id)
+    db.session.add(character)
+    db.session.commit()
+    user_id, other_id, character_id = user.id, other.id, character.id
+    assert character_id in get_identity(user_id).character_ids
+
+    # Otro worker borra el personaje y SQLite da el mismo id al de otro usuario, sin invalidar esta caché
+    with db.engine.begin() as connection:
+        connection.execute(delete(Character).where(Character.id == character_id))
+        connection.execute(insert(Character).values(name='Ajeno', race='Elfo', background='-', goal='-',
+                                                    user_id=other_id))
+    assert db.session.scalar(select(Character.id).where(Character.user_id == other_id)) == character_id
+    assert character_id in get_identity(user_id).character_ids
+
+    for method in ('GET', 'HEAD', 'POST'):
+        with app.test_request_context(method=method):
+            assert owned_character_id(str(user_id), character_id) is None
+            assert owned_character_id(str(other_id), character_id) == character_id
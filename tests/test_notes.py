@@ -106,3 +106,153 @@ def test_delete_decision(client, user_and_token):
     res = client.delete(f'/api/decision/{decision_id}', headers={"Authorization": f"Bearer {token}"})
     assert res.status_code == 200
     assert res.get_json()["decision_id"] == decision_id
+
+def test_journal_keyset_pagination(client, user_and_token):
+    from back.models import db, JournalEntry
+    from datetime import datetime
+    user, token = user_and_token
+    headers = {"Authorization": f"Bearer {token}"}
+    char = client.post('/api/character', json={
+        "name": "Cronista",
+        "race": "Humano",
+        "goal": "Escribirlo todo",
+        "background": "Escriba",
+        "stats": {"FUE": 0, "AGI": 1, "MEN": 3, "CAR": 1}
+    }, headers=headers)
+    cid = char.get_json()["character_id"]
+
+    same_moment = datetime(2024, 5, 1, 12, 0, 0)
+    for i in range(5):
+        db.session.add(JournalEntry(character_id=cid, content=f"Entrada {i}", created_at=same_moment))
+    db.session.add(JournalEntry(character_id=cid, content="Más reciente", created_at=datetime(2024, 6, 1)))
+    db.session.commit()
+
+    full = client.get(f'/api/journal/{cid}', headers=headers).get_json()
+    assert "next_cursor" not in full
+    assert len(full["entries"]) == 6
+
+    seen, after = [], None
+    while True:
+        url = f'/api/journal/{cid}?limit=4' + (f'&after={after}' if after else '')
+        page = client.get(url, headers=headers).get_json()
+        seen.extend(e["id"] for e in page["entries"])
+        after = page["next_cursor"]
+        if not after:
+            break
+    assert seen == [e["id"] for e in full["entries"]]
+    assert full["entries"][0]["content"] == "Más reciente"
+
+def test_decision_keyset_pagination(client, user_and_token):
+    user, token = user_and_token
+    headers = {"Authorization": f"Bearer {token}"}
+    char = client.post('/api/character', json={
+        "name": "Indeciso",
+        "race": "Mediano",
+        "goal": "Elegir bien",
+        "background": "Granjero",
+        "stats": {"FUE": 0, "AGI": 1, "MEN": 1, "CAR": 1}
+    }, headers=headers)
+    cid = char.get_json()["character_id"]
+    ids = [client.post('/api/decision', json={"character_id": cid, "description": f"Opción {i}"},
+                       headers=headers).get_json()["decision_id"] for i in range(3)]
+
+    first = client.get(f'/api/decision/{cid}?limit=2', headers=headers).get_json()
+    assert [d["id"] for d in first["decisions"]] == ids[::-1][:2]
+    second = client.get(f'/api/decision/{cid}?limit=2&after={first["next_cursor"]}', headers=headers).get_json()
+    assert [d["id"] for d in second["decisions"]] == [ids[0]]
+    assert second["next_cursor"] is None
+
+def test_journal_invalid_cursor(client, user_and_token):
+    user, token = user_and_token
+    headers = {"Authorization": f"Bearer {token}"}
+    char = client.post('/api/character', json={
+        "name": "Perdido",
+        "race": "Elfo",
+        "goal": "Encontrar el camino",
+        "background": "Explorador",
+        "stats": {"FUE": 0, "AGI": 2, "MEN": 1, "CAR": 0}
+    }, headers=headers)
+    cid = char.get_json()["character_id"]
+
+    res = client.get(f'/api/journal/{cid}?limit=2&after=no-es-un-cursor', headers=headers)
+    assert res.status_code == 400
+    res = client.get(f'/api/journal/{cid}?limit=0', headers=headers)
+    assert res.status_code == 400
+    res = client.get(f'/api/journal/{cid}?limit=abc', headers=headers)
+    assert res.status_code == 400
+    assert res.get_json()["error"] == "limit inválido"
+    assert client.get(f'/api/decision/{cid}?limit=', headers=headers).status_code == 400
+
+
+def _search_character(client, token, name):
+    return client.post('/api/character', json={
+        "name": name, "race": "Humano", "goal": "-", "background": "-",
+        "stats": {"FUE": 0, "AGI": 1, "MEN": 1, "CAR": 1}
+    }, headers={"Authorization": f"Bearer {token}"}).get_json()["character_id"]
+
+def test_search_journal_and_decisions(client, user_and_token, other_token):
+    user, token = user_and_token
+    headers = {"Authorization": f"Bearer {token}"}
+    cid = _search_character(client, token, "Buscador")
+    client.post('/api/journal', json={"character_id": cid, "content": "Conocimos al herrero en la forja de Umbría"},
+                headers=headers)
+    client.post('/api/journal', json={"character_id": cid, "content": "El camino hacia el norte estaba nevado"},
+                headers=headers)
+    decision = client.post('/api/decision', json={"character_id": cid, "description": "Pagar al Herrero por la espada",
+                                                   "impact": "Nos quedamos sin oro"}, headers=headers).get_json()
+    other_cid = _search_character(client, other_token, "Ajeno")
+    client.post('/api/journal', json={"character_id": other_cid, "content": "Otro herrero distinto"},
+                headers={"Authorization": f"Bearer {other_token}"})
+
+    res = client.get('/api/search?q=herrero', headers=headers)
+    assert res.status_code == 200
+    results = res.get_json()["results"]
+    assert {r["type"] for r in results} == {"journal", "decisions"}
+    assert all(r["character_id"] == cid for r in results)
+    assert any("<mark>herrero</mark>" in r["snippet"] for r in results)
+
+    # Prefijos y acentos: "umbria" encuentra "Umbría"
+    results = client.get('/api/search?q=umbri&type=journal', headers=headers).get_json()["results"]
+    assert len(results) == 1 and "<mark>Umbría</mark>" in results[0]["snippet"]
+
+    client.delete(f'/api/decision/{decision["decision_id"]}', headers=headers)
+    results = client.get('/api/search?q=herrero', headers=headers).get_json()["results"]
+    assert [r["type"] for r in results] == ["journal"]
+
+def test_search_snippet_escapes_content(client, user_and_token):
+    user, token = user_and_token
+    headers = {"Authorization": f"Bearer {token}"}
+    cid = _search_character(client, token, "Escapado")
+    client.post('/api/journal', json={"character_id": cid,
+                                      "content": 'El bardo <script>alert("x")</script> cantó & bebió'}, headers=headers)
+
+    results = client.get('/api/search?q=script', headers=headers).get_json()["results"]
+    assert len(results) == 1
+    snippet = results[0]["snippet"]
+    assert "<script>" not in snippet
+    assert "&lt;<mark>script</mark>&gt;alert(&quot;x&quot;)&lt;/<mark>script</mark>&gt;" in snippet
+    assert "&amp; bebió" in snippet
+
+def test_search_validation(client, user_and_token, other_token):
+    user, token = user_and_token
+    headers = {"Authorization": f"Bearer {token}"}
+    other_cid = _search_character(client, other_token, "Ajeno")
+    assert client.get('/api/search?q=" OR *', headers=headers).status_code == 200
+    assert client.get('/api/search?q=', headers=headers).status_code == 400
+    assert client.get('/api/search?q=a&type=inventario', headers=headers).status_code == 400
+    assert client.get(f'/api/search?q=a&character_id={other_cid}', headers=headers).status_code == 404
+
+def test_rebuild_search_cli(app, client, user_and_token):
+    from back.models import db
+    from sqlalchemy import text
+    user, token = user_and_token
+    headers = {"Authorization": f"Bearer {token}"}
+    cid = _search_character(client, token, "Reindexado")
+    client.post('/api/journal', json={"character_id": cid, "content": "Una taberna llamada El Pozo"}, headers=headers)
+    db.session.execute(text("INSERT INTO journal_fts(journal_fts) VALUES ('delete-all')"))
+    db.session.commit()
+    assert client.get('/api/search?q=taberna', headers=headers).get_json()["results"] == []
+
+    result = app.test_cli_runner().invoke(args=['notes', 'rebuild-search'])
+    assert result.exit_code == 0 and "journal: 1" in result.output
+    assert len(client.get('/api/search?q=taberna', headers=headers).get_json()["results"]) == 1
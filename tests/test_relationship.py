@@ -1,3 +1,7 @@
+import json
+import pytest
+from back.models import db, CharacterRelationship
+
 def test_create_relationship(client, user_and_token):
     user, token = user_and_token
     # Crear dos personajes del mismo usuario
@@ -40,7 +44,62 @@ def test_get_relationships(client, user_and_token):
 
     res = client.get(f'/api/relationship/{cid}', headers={"Authorization": f"Bearer {token}"})
     assert res.status_code == 200
-    assert "relationships" in res.get_json()
+    assert res.get_json()["relationships_out"] == []
+    assert res.get_json()["relationships_in"] == []
+
+def test_get_relationships_both_directions_in_one_query(client, user_and_token, other_token, count_queries):
+    user, token = user_and_token
+    headers = {"Authorization": f"Bearer {token}"}
+    ids = [client.post('/api/character', json={
+        "name": name, "race": race, "goal": "g", "background": "b",
+        "stats": {"FUE": 1, "AGI": 1, "MEN": 1, "CAR": 1}
+    }, headers=headers).get_json()["character_id"] for name, race in (("Centro", "Humano"), ("Aliada", "Elfa"), ("Rival", "Orco"))]
+    center, ally, rival = ids
+    for source, target, relation_type in ((center, ally, "aliado"), (rival, center, "rival"), (ally, center, "aliado")):
+        client.post('/api/relationship', json={"source_id": source, "target_id": target, "relation_type": relation_type},
+                    headers=headers)
+    # Relación entrante desde un personaje ajeno: no debe aparecer
+    foreign = client.post('/api/character', json={
+        "name": "Ajeno", "race": "Enano", "goal": "g", "background": "b",
+        "stats": {"FUE": 1, "AGI": 1, "MEN": 1, "CAR": 1}
+    }, headers={"Authorization": f"Bearer {other_token}"}).get_json()["character_id"]
+    db.session.add(CharacterRelationship(source_id=foreign, target_id=center, relation_type="rival"))
+    db.session.commit()
+
+    client.get(f'/api/relationship/{center}', headers=headers)
+    with count_queries() as statements:
+        res = client.get(f'/api/relationship/{center}', headers=headers)
+    assert res.status_code == 200
+    assert len([s for s in statements if 'character_relationships' in s]) == 1
+    data = res.get_json()
+    assert [(r["target_id"], r["character"]["name"], r["character"]["race"]) for r in data["relationships_out"]] == \
+        [(ally, "Aliada", "Elfa")]
+    assert [(r["source_id"], r["character"]["name"]) for r in data["relationships_in"]] == \
+        [(rival, "Rival"), (ally, "Aliada")]
+
+    res = client.get(f'/api/relationship/{center}?relation_type=rival', headers=headers)
+    assert res.get_json()["relationships_out"] == []
+    assert [r["relation_type"] for r in res.get_json()["relationships_in"]] == ["rival"]
+
+def test_relationship_to_foreign_character(client, user_and_token, other_token):
+    user, token = user_and_token
+    headers = {"Authorization": f"Bearer {token}"}
+    body = {"goal": "g", "background": "b", "stats": {"FUE": 1, "AGI": 1, "MEN": 1, "CAR": 1}}
+    mine = client.post('/api/character', json={"name": "Mío", "race": "Humano", **body},
+                       headers=headers).get_json()["character_id"]
+    foreign = client.post('/api/character', json={"name": "Secreto", "race": "Elfo", **body},
+                          headers={"Authorization": f"Bearer {other_token}"}).get_json()["character_id"]
+
+    res = client.post('/api/relationship', json={"source_id": mine, "target_id": foreign, "relation_type": "espía"},
+                      headers=headers)
+    assert res.status_code == 403
+
+    # Aristas antiguas hacia personajes ajenos: se listan, pero sin los datos del otro personaje
+    db.session.add(CharacterRelationship(source_id=mine, target_id=foreign, relation_type="espía"))
+    db.session.commit()
+    listing = client.get(f'/api/relationship/{mine}', headers=headers).get_json()
+    assert [(r["target_id"], r["character"]) for r in listing["relationships_out"]] == [(foreign, None)]
+    assert "Secreto" not in json.dumps(listing)
 
 def test_delete_relationship(client, user_and_token):
     user, token = user_and_token
@@ -72,3 +131,127 @@ def test_delete_relationship(client, user_and_token):
     res = client.delete(f'/api/relationship/{rel_id}', headers={"Authorization": f"Bearer {token}"})
     assert res.status_code == 200
     assert res.get_json()["relationship_id"] == rel_id
+
+
+def _graph(client, token):
+    # A -aliado-> B -aliado-> C -rival-> D, B <-aliado- E; F aislado con F -aliado-> G
+    headers = {"Authorization": f"Bearer {token}"}
+    ids = {}
+    for name in "ABCDEFG":
+        ids[name] = client.post('/api/character', json={
+            "name": name, "race": "Humano", "goal": "-", "background": "-"
+        }, headers=headers).get_json()["character_id"]
+    for source, target, relation_type in (("A", "B", "aliado"), ("B", "C", "aliado"), ("C", "D", "rival"),
+                                          ("E", "B", "aliado"), ("F", "G", "aliado")):
+        client.post('/api/relationship', json={"source_id": ids[source], "target_id": ids[target],
+                                               "relation_type": relation_type}, headers=headers)
+    return ids, headers
+
+@pytest.mark.parametrize("use_index", [True, False])
+def test_relationship_graph_queries(app, client, user_and_token, use_index):
+    app.config["RELATIONSHIP_GRAPH_INDEX"] = use_index
+    _, token = user_and_token
+    ids, headers = _graph(client, token)
+    names = {cid: name for name, cid in ids.items()}
+
+    res = client.get(f'/api/relationship/graph/path?from={ids["A"]}&to={ids["D"]}', headers=headers)
+    assert res.status_code == 200
+    data = res.get_json()
+    assert [node["name"] for node in data["path"]] == ["A", "B", "C", "D"]
+    assert data["length"] == 3 and [e["relation_type"] for e in data["edges"]] == ["aliado", "aliado", "rival"]
+
+    # Solo aliados: D queda fuera; sin dirección E y A están conectados a través de B
+    res = client.get(f'/api/relationship/graph/path?from={ids["A"]}&to={ids["D"]}&relation_type=aliado', headers=headers)
+    assert res.status_code == 404
+    res = client.get(f'/api/relationship/graph/path?from={ids["A"]}&to={ids["E"]}', headers=headers)
+    assert [names[node["id"]] for node in res.get_json()["path"]] == ["A", "B", "E"]
+    res = client.get(f'/api/relationship/graph/path?from={ids["A"]}&to={ids["E"]}&direction=out', headers=headers)
+    assert res.status_code == 404
+
+    res = client.get(f'/api/relationship/graph/{ids["A"]}/neighborhood?depth=2&direction=out', headers=headers)
+    nodes = {names[node["id"]]: node["distance"] for node in res.get_json()["nodes"]}
+    assert nodes == {"A": 0, "B": 1, "C": 2}
+    assert {(names[e["source_id"]], names[e["target_id"]]) for e in res.get_json()["edges"]} == {("A", "B"), ("B", "C")}
+
+    res = client.get(f'/api/relationship/graph/{ids["B"]}/neighborhood?depth=1', headers=headers)
+    assert {names[node["id"]] for node in res.get_json()["nodes"]} == {"A", "B", "C", "E"}
+
+    res = client.get('/api/relationship/graph/components', headers=headers)
+    components = [sorted(names[cid] for cid in c["character_ids"]) for c in res.get_json()["components"]]
+    assert components == [["A", "B", "C", "D", "E"], ["F", "G"]]
+    res = client.get('/api/relationship/graph/components?relation_type=rival', headers=headers)
+    assert res.get_json()["components"] == [{"size": 2, "character_ids": [ids["C"], ids["D"]]}]
+
+def test_relationship_graph_index_invalidated_on_write(app, client, user_and_token, count_queries):
+    _, token = user_and_token
+    ids, headers = _graph(client, token)
+    url = f'/api/relationship/graph/path?from={ids["A"]}&to={ids["G"]}'
+    assert client.get(url, headers=headers).status_code == 404
+
+    # El índice no se recarga: solo se comprueba que los dos extremos son del usuario
+    with count_queries() as statements:
+        client.get(url, headers=headers)
+    assert statements and all('character_relationships' not in statement for statement in statements)
+
+    client.post('/api/relationship', json={"source_id": ids["D"], "target_id": ids["F"], "relation_type": "deuda"},
+                headers=headers)
+    res = client.get(url, headers=headers)
+    assert res.status_code == 200 and res.get_json()["length"] == 5
+
+    relationship_id = res.get_json()["edges"][3]["id"]
+    client.delete(f'/api/relationship/{relationship_id}', headers=headers)
+    assert client.get(url, headers=headers).status_code == 404
+
+def test_relationship_graph_index_sees_writes_from_other_workers(app, client, user_and_token):
+    from sqlalchemy import insert, delete, update
+    from back.models import Character
+    _, token = user_and_token
+    ids, headers = _graph(client, token)
+    url = f'/api/relationship/graph/path?from={ids["A"]}&to={ids["G"]}'
+    assert client.get(url, headers=headers).status_code == 404
+
+    # Escrituras hechas por otro proceso: no pasan por la invalidación de esta caché
+    with db.engine.begin() as connection:
+        relationship_id = connection.execute(insert(CharacterRelationship).values(
+            source_id=ids["D"], target_id=ids["F"], relation_type="deuda")).inserted_primary_key[0]
+        connection.execute(update(Character).where(Character.id.in_([ids["D"], ids["F"]]))
+                           .values(version=Character.version + 1))
+    assert client.get(url, headers=headers).get_json()["length"] == 5
+
+    with db.engine.begin() as connection:
+        connection.execute(delete(CharacterRelationship).where(CharacterRelationship.id == relationship_id))
+        connection.execute(update(Character).where(Character.id.in_([ids["D"], ids["F"]]))
+                           .values(version=Character.version + 1))
+    assert client.get(url, headers=headers).status_code == 404
+
+def test_relationship_graph_validation(client, user_and_token, other_token):
+    _, token = user_and_token
+    ids, headers = _graph(client, token)
+    other = {"Authorization": f"Bearer {other_token}"}
+    assert client.get(f'/api/relationship/graph/path?from={ids["A"]}&to={ids["B"]}', headers=other).status_code == 404
+    assert client.get(f'/api/relationship/graph/path?from={ids["A"]}', headers=headers).status_code == 400
+    assert client.get(f'/api/relationship/graph/{ids["A"]}/neighborhood?depth=99', headers=headers).status_code == 400
+    assert client.get(f'/api/relationship/graph/{ids["A"]}/neighborhood?direction=x', headers=headers).status_code == 400
+    assert client.get('/api/relationship/graph/components', headers=other).get_json()["components"] == []
+
+@pytest.mark.parametrize("use_index", [True, False])
+def test_relationship_graph_skips_foreign_characters(app, client, user_and_token, other_token, use_index):
+    app.config["RELATIONSHIP_GRAPH_INDEX"] = use_index
+    _, token = user_and_token
+    ids, headers = _graph(client, token)
+    foreign = client.post('/api/character', json={
+        "name": "Secreto", "race": "Elfo", "goal": "g", "background": "b",
+        "stats": {"FUE": 0, "AGI": 0, "MEN": 0, "CAR": 0}
+    }, headers={"Authorization": f"Bearer {other_token}"}).get_json()["character_id"]
+    # Arista antigua hacia un personaje ajeno, anterior a la comprobación de dueño al crear relaciones
+    db.session.add(CharacterRelationship(source_id=ids["A"], target_id=foreign, relation_type="aliado"))
+    db.session.commit()
+
+    res = client.get(f'/api/relationship/graph/{ids["A"]}/neighborhood?depth=3', headers=headers)
+    assert res.status_code == 200
+    assert foreign not in [node["id"] for node in res.get_json()["nodes"]]
+    assert "Secreto" not in json.dumps(res.get_json())
+    res = client.get(f'/api/relationship/graph/path?from={ids["A"]}&to={foreign}', headers=headers)
+    assert res.status_code == 404
+    components = client.get('/api/relationship/graph/components', headers=headers).get_json()["components"]
+    assert all(foreign not in component["character_ids"] for component in components)
@@ -87,3 +87,122 @@ def test_delete_spell(client, user_and_token):
     res = client.delete(f'/api/spell/{sid}', headers={"Authorization": f"Bearer {token}"})
     assert res.status_code == 200
     assert res.get_json()["spell_id"] == sid
+
+def test_update_spell_if_match(client, user_and_token):
+    user, token = user_and_token
+    headers = {"Authorization": f"Bearer {token}"}
+    cid = client.post('/api/character', json={
+        "name": "Cauteloso",
+        "race": "Elfo",
+        "goal": "No pisar cambios ajenos",
+        "background": "Archivista",
+        "stats": {"FUE": 0, "AGI": 1, "MEN": 3, "CAR": 1}
+    }, headers=headers).get_json()["character_id"]
+    sid = client.post('/api/spell', json={
+        "character_id": cid, "name": "Escudo", "type": "Defensivo",
+        "description": "Protege", "uses": 2, "uses_max": 2
+    }, headers=headers).get_json()["spell_id"]
+    etag = client.get(f'/api/character/{cid}', headers=headers).headers["ETag"]
+
+    res = client.put(f'/api/spell/{sid}', json={"uses": 1}, headers={**headers, "If-Match": etag})
+    assert res.status_code == 200
+    res = client.put(f'/api/spell/{sid}', json={"uses": 0}, headers={**headers, "If-Match": etag})
+    assert res.status_code == 412
+
+def test_bulk_create_spells(client, user_and_token):
+    user, token = user_and_token
+    headers = {"Authorization": f"Bearer {token}"}
+    cid = client.post('/api/character', json={
+        "name": "Erudito",
+        "race": "Elfo",
+        "goal": "Aprenderlo todo",
+        "background": "Bibliotecario",
+        "stats": {"FUE": 0, "AGI": 1, "MEN": 3, "CAR": 1}
+    }, headers=headers).get_json()["character_id"]
+
+    res = client.post('/api/spell/bulk', json=[
+        {"character_id": cid, "name": "Luz", "type": "Utilidad", "description": "Ilumina", "uses": 3, "uses_max": 3},
+        {"character_id": cid, "name": "Rayo", "type": "Ofensivo", "description": "Daño", "uses": 1, "uses_max": 1}
+    ], headers=headers)
+    assert res.status_code == 201
+    spell_ids = res.get_json()["spell_ids"]
+    spells = client.get(f'/api/spell/{cid}', headers=headers).get_json()["spells"]
+    assert [s["name"] for s in sorted(spells, key=lambda s: spell_ids.index(s["id"]))] == ["Luz", "Rayo"]
+
+def _caster(client, headers, name):
+    cid = client.post('/api/character', json={
+        "name": name,
+        "race": "Elfo",
+        "goal": "Lanzar conjuros",
+        "background": "Aprendiz",
+        "stats": {"FUE": 0, "AGI": 1, "MEN": 3, "CAR": 1}
+    }, headers=headers).get_json()["character_id"]
+    return client.post('/api/spell/bulk', json=[
+        {"character_id": cid, "name": "Misil", "type": "Ofensivo", "description": "Daño", "uses": 3, "uses_max": 3},
+        {"character_id": cid, "name": "Escudo", "type": "Defensivo", "description": "Protege", "uses": 1, "uses_max": 1}
+    ], headers=headers).get_json()["spell_ids"]
+
+def test_use_spell_is_single_conditional_update(client, user_and_token, count_queries):
+    user, token = user_and_token
+    headers = {"Authorization": f"Bearer {token}"}
+    missile, shield = _caster(client, headers, "Evocador")
+
+    with count_queries() as statements:
+        res = client.post(f'/api/spell/use/{missile}', json={"count": 2}, headers=headers)
+    assert res.status_code == 200
+    assert res.get_json()["remaining_uses"] == 1
+    assert not any(s.startswith('SELECT') for s in statements)
+
+    res = client.post(f'/api/spell/use/{missile}', json={"count": 2}, headers=headers)
+    assert res.status_code == 400
+    res = client.post(f'/api/spell/use/{shield}', headers=headers)
+    assert res.get_json()["remaining_uses"] == 0
+    assert client.post(f'/api/spell/use/{shield}', headers=headers).status_code == 400
+
+def test_use_spell_ownership(client, user_and_token, other_token):
+    user, token = user_and_token
+    missile, _ = _caster(client, {"Authorization": f"Bearer {token}"}, "Celoso")
+
+    res = client.post(f'/api/spell/use/{missile}', headers={"Authorization": f"Bearer {other_token}"})
+    assert res.status_code == 403
+    res = client.post('/api/spell/use/9999', headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 404
+
+def test_use_several_spells_in_one_call(client, user_and_token):
+    user, token = user_and_token
+    headers = {"Authorization": f"Bearer {token}"}
+    missile, shield = _caster(client, headers, "Combinador")
+
+    res = client.post('/api/spell/use', json={"spells": [
+        {"spell_id": missile, "count": 2}, {"spell_id": shield}
+    ]}, headers=headers)
+    assert res.status_code == 200
+    assert res.get_json()["remaining_uses"] == {str(missile): 1, str(shield): 0}
+
+    res = client.post('/api/spell/use', json={"spells": [
+        {"spell_id": missile}, {"spell_id": shield}
+    ]}, headers=headers)
+    assert res.status_code == 400
+    assert res.get_json()["spell_id"] == shield
+    # El lote falló entero: el misil conserva su uso restante
+    res = client.post(f'/api/spell/use/{missile}', headers=headers)
+    assert res.get_json()["remaining_uses"] == 0
+
+def test_use_spells_rejects_malformed_body(client, user_and_token):
+    user, token = user_and_token
+    headers = {"Authorization": f"Bearer {token}"}
+
+    assert client.post('/api/spell/use', json=[{"spell_id": 1}], headers=headers).status_code == 400
+    assert client.post('/api/spell/use', json={"spells": 3}, headers=headers).status_code == 400
+    for body in ([1], "x"):
+        assert client.post('/api/spell/use/1', json=body, headers=headers).status_code == 400
+
+def test_use_spells_rejects_boolean_count(client, user_and_token):
+    user, token = user_and_token
+    headers = {"Authorization": f"Bearer {token}"}
+    missile, shield = _caster(client, headers, "Booleano")
+
+    res = client.post('/api/spell/use', json={"spells": [{"spell_id": missile, "count": True}]}, headers=headers)
+    assert res.status_code == 400
+    res = client.post('/api/spell/use', json={"spells": [{"spell_id": True}]}, headers=headers)
+    assert res.status_code == 400